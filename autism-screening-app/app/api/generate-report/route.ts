@@ -24,7 +24,7 @@ interface ScreeningResult {
   aq10_total: number
   social_score: number
   attention_score: number
-  contributing_factors: { feature: string; importance: number; direction: string }[]
+  contributing_factors: { feature: string; importance: number; direction: string; effect?: string }[]
   formatted_answers?: { question: string; answer: string }[]
   physical_score?: number
   physical_reason?: string
@@ -133,7 +133,7 @@ LATEST SCREENING RESULTS:
 - Speech Assessment: ${latestScreening.speech_score || 'N/A'}/5 - ${latestScreening.speech_reason || 'Not assessed'}
 
 TOP CONTRIBUTING FACTORS:
-${latestScreening.contributing_factors.slice(0, 5).map(f => `- ${f.feature}: ${f.importance.toFixed(1)}% (${f.direction})`).join('\n')}
+${latestScreening.contributing_factors.slice(0, 5).map(f => `- ${f.feature}: ${f.importance.toFixed(1)}% (${f.effect || f.direction})`).join('\n')}
 
 SCREENING HISTORY:
 ${screenings.length} screenings completed. ${screenings.length > 1 ? `Previous risk levels: ${screenings.slice(1).map(s => s.risk_level).join(', ')}` : 'This is the first screening.'}
@@ -32,6 +32,7 @@ interface ScreeningResult {
     feature: string
     importance: number
     direction: string
+    effect?: string
   }[]
   timestamp?: string
   createdAt?: string
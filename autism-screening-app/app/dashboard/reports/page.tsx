@@ -45,7 +45,7 @@ interface ReportData {
     physicalReason?: string
     speechScore?: number
     speechReason?: string
-    contributingFactors: { feature: string; importance: number; direction: string }[]
+    contributingFactors: { feature: string; importance: number; direction: string; effect?: string }[]
     demographics?: { age?: number; gender?: string }
   }
   screeningHistory: {
@@ -134,7 +134,7 @@ ${report.latestScreening.physicalScore ? `- Physical Score: ${report.latestScree
 ${report.latestScreening.speechScore ? `- Speech Score: ${report.latestScreening.speechScore}/5` : ''}
 
 Top Contributing Factors:
-${report.latestScreening.contributingFactors.slice(0, 5).map(f => `- ${f.feature}: ${f.importance.toFixed(1)}% (${f.direction})`).join('\n')}
+${report.latestScreening.contributingFactors.slice(0, 5).map(f => `- ${f.feature}: ${f.importance.toFixed(1)}% (${f.effect || f.direction})`).join('\n')}
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
@@ -504,7 +504,7 @@ for proper evaluation and diagnosis.
                           variant={factor.direction === "positive" ? "default" : "secondary"}
                           className="text-xs"
                         >
-                          {factor.direction}
+                          {factor.effect || factor.direction}
                         </Badge>
                       </div>
                     </div>
@@ -5,16 +5,19 @@ Provides REST API endpoints for ML predictions and LLM integration
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Optional, List
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Optional, List
 import os
+import hmac
 import json
-import base64
-import httpx
-from fastapi import FastAPI, HTTPException, UploadFile, File
+import logging
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 from pathlib import Path
-import re
+import asyncio
+import time
 
 # Load environment variables - check multiple locations
 script_dir = Path(__file__).resolve().parent
@@ -22,20 +25,43 @@ env_path = script_dir / '.env'
 env_local_path = script_dir.parent / '.env.local'
 root_env_path = script_dir.parent.parent / '.env'
 
-if env_local_path.exists():
-    print(f"Loading env from: {env_local_path}")
-    load_dotenv(env_local_path)
-elif env_path.exists():
-    print(f"Loading env from: {env_path}")
-    load_dotenv(env_path)
-elif root_env_path.exists():
-    print(f"Loading env from: {root_env_path}")
-    load_dotenv(root_env_path)
+loaded_env_path = next((p for p in (env_local_path, env_path, root_env_path) if p.exists()), None)
+if loaded_env_path is not None:
+    load_dotenv(loaded_env_path)
 else:
-    print("No .env file found, using system environment")
     load_dotenv()  # Try default locations
 
-from train import load_model, predict, engineer_features, AQ10_QUESTIONS
+# Logging is configured after the .env is read so LOG_LEVEL / LOG_FORMAT can come from it
+from logging_config import configure_logging
+configure_logging()
+logger = logging.getLogger(__name__)
+if loaded_env_path is not None:
+    logger.info("Loaded environment file", extra={"env_file": str(loaded_env_path)})
+else:
+    logger.info("No .env file found, using system environment")
+
+from features import AQ10_QUESTIONS
+from serving import load_serving_model, predict, predict_many, predict_batch, predict_columns, result_rows, warm_up
+from columnar import (
+    ARROW_STREAM, JSON, NDJSON, ArrowResultStream, ColumnarError, ColumnarValidator, ndjson_lines, read_arrow_columns
+)
+from model_registry import (
+    ShadowScorer, current_version, list_versions, resolve_model_dir, set_current_version
+)
+from drift import DriftMonitor
+from inference import InferenceExecutor, ExecutorSaturated
+from batching import MicroBatcher
+from provider_client import ProviderClient
+from video_analysis import (
+    PROMPT_VERSION, UploadTooLarge, VideoRequestBody, build_analysis_prompt, prompt_fingerprint,
+    spool_video_upload, upload_sha256, parse_analysis_text
+)
+from kb_index import VIDEO_ANALYSIS_QUERY, load_or_build_index, estimate_tokens
+from video_cache import VideoResultCache, cache_key
+from video_jobs import VideoJobQueue, JobQueueFull, TERMINAL_STATUSES
+from video_preprocess import VideoPreprocessor, PartsRequestBody, PreprocessingError
+from metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware, WorkerMetrics, observe_stage, stage_timer
+from profiling import Profiler, ProfilingMiddleware
 
 app = FastAPI(
     title="ASD Screening API",
@@ -51,34 +77,271 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Request counts, latency histograms and in-flight gauge for GET /metrics
+app.add_middleware(MetricsMiddleware)
+# Set at startup in serve.py workers: which worker this is, and the snapshots that let /metrics cover all of them
+serve_worker = None
+worker_metrics = None
+worker_metrics_task = None
 
-# Load model on startup
+# Load model on startup (in the background, so the process is live before it is ready)
 MODEL_DIR = "models"
 model_artifacts = None
+model_version = None
+model_load_error = None
+model_load_task = None
+# (version, artifacts) loaded by serve.py before it forks workers; activate_model takes it instead of loading
+preloaded_model = None
+
+# Versioned models (model_registry.py) are swapped in through /admin/models or, with MODEL_WATCH=1,
+# whenever models/CURRENT names a new version; MODEL_SHADOW_* scores live traffic against a candidate
+MODEL_WATCH = os.getenv("MODEL_WATCH", "0") == "1"
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "5"))
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN") or None
+MODEL_SHADOW_MAX_PENDING = int(os.getenv("MODEL_SHADOW_MAX_PENDING", "8"))
+model_reload_lock = asyncio.Lock()
+model_reloads = {"succeeded": 0, "failed": 0, "last_error": None, "last_seconds": None}
+model_watch_task = None
+shadow_scorer = None
+
+# Live input/probability distributions against the served model's training profile (DRIFT_* env vars)
+DRIFT_MONITOR = os.getenv("DRIFT_MONITOR", "1") == "1"
+drift_monitor = None
+
+# Serve probabilities from the precomputed score table (see score_table.py) when within tolerance
+USE_SCORE_TABLE = os.getenv("SCORE_TABLE", "0") == "1"
+SCORE_TABLE_TOLERANCE = float(os.getenv("SCORE_TABLE_TOLERANCE", "0.05"))
+# 'compiled' scores with the numpy tree evaluator in tree_engine.py instead of LightGBM
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "lightgbm")
+MODEL_LOAD_KWARGS = {
+    'use_score_table': USE_SCORE_TABLE,
+    'score_table_tolerance': SCORE_TABLE_TOLERANCE,
+    'engine': INFERENCE_ENGINE
+}
+
+# Maximum rows scored per vectorized call in /batch-predict (caps peak memory)
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "2048"))
+
+# Model calls run here instead of on the event loop (INFERENCE_* env vars)
+inference_executor = InferenceExecutor.from_env()
+
+# Shared connection pool for the video analysis provider (AI_PROVIDER_* env vars) and upload cap
+provider_client = ProviderClient.from_env()
+# Content-addressed /analyze-video results (VIDEO_CACHE* env vars)
+video_cache = VideoResultCache.from_env(MODEL_DIR) if os.getenv("VIDEO_CACHE", "1") == "1" else None
+VIDEO_MAX_BYTES = int(os.getenv("VIDEO_MAX_MB", "256")) * 1024 * 1024
+# Optionally send sampled frames + compressed audio instead of the raw video (VIDEO_PREPROCESS_* env vars)
+video_preprocessor = VideoPreprocessor.from_env() if os.getenv("VIDEO_PREPROCESS", "0") == "1" else None
+VIDEO_IN_FLIGHT = REGISTRY.gauge("asd_video_analyses_in_flight", "Video analyses waiting on preprocessing or the provider")
+
+# Opt-in merging of concurrent /predict calls into one model call (PREDICT_BATCH_* env vars)
+PREDICT_BATCHING = os.getenv("PREDICT_BATCHING", "0") == "1"
+predict_batcher = None
+
+# Opt-in stack sampling of a fraction of requests (PROFILE_* env vars); not installed at all when off
+profiler = Profiler.from_env(MODEL_DIR) if os.getenv("PROFILING", "0") == "1" else None
+if profiler is not None:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
 
 
 @app.on_event("startup")
 async def startup_event():
-    global model_artifacts
+    global model_load_task, serve_worker, worker_metrics, worker_metrics_task
+    serve_worker = os.getenv("SERVE_WORKER")
+    worker_metrics = WorkerMetrics.from_env(REGISTRY)
+    if worker_metrics is not None:
+        worker_metrics_task = asyncio.create_task(write_worker_metrics())
+    provider_client.start()
+    video_jobs.start()
     if os.path.exists(MODEL_DIR):
+        model_load_task = asyncio.create_task(load_model_in_background())
+    else:
+        logger.warning("Model directory not found. Run train.py first.", extra={"model_dir": MODEL_DIR})
+
+
+async def load_model_in_background():
+    """Load the serving artifact off the event loop, then start inference (and the CURRENT watcher)"""
+    global model_load_error, model_watch_task
+    try:
+        await activate_model()
+    except Exception as e:
+        model_load_error = str(e)
+        logger.warning("Could not load model, run train.py first to create it", extra={"error": str(e)})
+    if MODEL_WATCH:
+        model_watch_task = asyncio.create_task(watch_current_version())
+    shadow_version = os.getenv("MODEL_SHADOW_VERSION")
+    if shadow_version and model_artifacts is not None:
         try:
-            model_artifacts = load_model(MODEL_DIR)
-            print("Model loaded successfully")
+            await start_shadow(shadow_version, float(os.getenv("MODEL_SHADOW_RATE", "0.1")))
         except Exception as e:
-            print(f"Warning: Could not load model: {e}")
-            print("Run train.py first to create the model")
-    else:
-        print("Warning: Model directory not found. Run train.py first.")
+            logger.warning("Could not start shadow scoring", extra={"version": shadow_version, "error": str(e)})
+
+
+async def write_worker_metrics():
+    """Refresh this worker's metrics snapshot for the other workers' /metrics"""
+    while True:
+        try:
+            await asyncio.to_thread(worker_metrics.write)
+        except OSError as e:
+            logger.warning("Could not write metrics snapshot", extra={"error": str(e)})
+        await asyncio.sleep(worker_metrics.interval)
+
+
+def worker_info() -> dict:
+    """Which process answered, since each serve.py worker keeps its own stats"""
+    return {"index": serve_worker, "pid": os.getpid()}
+
+
+def load_and_warm(directory: str) -> dict:
+    """Load one model version and score the warm-up inputs with it (blocking)"""
+    artifacts = load_serving_model(directory, **MODEL_LOAD_KWARGS)
+    warm_up(artifacts)
+    return artifacts
+
+
+def preload_model():
+    """Load and warm the CURRENT version now, for worker processes forked afterwards to share (blocking)"""
+    global preloaded_model
+    version = current_version(MODEL_DIR)
+    preloaded_model = (version, load_and_warm(resolve_model_dir(MODEL_DIR, version)))
+    return version
+
+
+async def activate_model(version: str = None) -> dict:
+    """
+    Load `version` (default: the one models/CURRENT names) in the background,
+    warm it up and swap it in. Requests already being scored finish on the
+    previous model; if anything fails the previous model keeps serving.
+    """
+    async with model_reload_lock:
+        return await swap_model(version)
+
+
+async def swap_model(version: str = None) -> dict:
+    """activate_model's work; the caller holds model_reload_lock"""
+    global model_artifacts, model_version, model_load_error, predict_batcher, drift_monitor, preloaded_model
+    version = version or current_version(MODEL_DIR)
+    previous = model_version
+    start = time.perf_counter()
+    preloaded, preloaded_model = preloaded_model, None
+    try:
+        directory = resolve_model_dir(MODEL_DIR, version)
+        if preloaded is not None and preloaded[0] == version:
+            artifacts = preloaded[1]
+        else:
+            artifacts = await run_in_threadpool(load_and_warm, directory)
+        if model_artifacts is None:
+            inference_executor.start(artifacts, directory, **MODEL_LOAD_KWARGS)
+            if PREDICT_BATCHING:
+                predict_batcher = MicroBatcher.from_env(run_predict_many)
+        else:
+            await run_in_threadpool(inference_executor.swap, artifacts, directory, warm_up, **MODEL_LOAD_KWARGS)
+    except Exception as e:
+        model_reloads["failed"] += 1
+        model_reloads["last_error"] = f"{version}: {e}"
+        logger.warning("Could not load model version", extra={"version": version, "error": str(e)})
+        raise
+    model_artifacts, model_version, model_load_error = artifacts, version, None
+    # A new model brings its own reference profile, so its window starts empty
+    drift_monitor = new_drift_monitor(artifacts)
+    seconds = round(time.perf_counter() - start, 3)
+    model_reloads["succeeded"] += 1
+    model_reloads["last_seconds"] = seconds
+    logger.info("Model loaded", extra={
+        "version": version, "previous": previous, "seconds": seconds,
+        "engine": INFERENCE_ENGINE, "executor": inference_executor.kind
+    })
+    return {"version": version, "previous": previous, "seconds": seconds}
+
+
+def new_drift_monitor(artifacts: dict):
+    """Drift monitor for a model's profile, or None when monitoring is off or the model has no profile"""
+    profile = artifacts.get('drift_profile')
+    if not DRIFT_MONITOR or profile is None:
+        return None
+    return DriftMonitor.from_env(profile)
+
+
+async def watch_current_version():
+    """Swap in the version models/CURRENT names whenever it changes (a failed version is not retried)"""
+    failed_version = None
+    while True:
+        await asyncio.sleep(MODEL_WATCH_INTERVAL)
+        if current_version(MODEL_DIR) in (None, model_version, failed_version):
+            continue
+        async with model_reload_lock:
+            # Read again under the lock: a reload that held it may have moved CURRENT and the model together
+            version = current_version(MODEL_DIR)
+            if version is None or version in (model_version, failed_version):
+                continue
+            try:
+                await swap_model(version)
+            except Exception:
+                failed_version = version
+
+
+async def start_shadow(version: str, sample_rate: float) -> dict:
+    """Load a candidate version and start scoring sampled live requests with it"""
+    global shadow_scorer
+    artifacts = await run_in_threadpool(load_and_warm, resolve_model_dir(MODEL_DIR, version))
+    previous, shadow_scorer = shadow_scorer, ShadowScorer(
+        version, artifacts, sample_rate=sample_rate, max_pending=MODEL_SHADOW_MAX_PENDING
+    )
+    if previous is not None:
+        previous.close()
+    logger.info("Shadow scoring started", extra={"version": version, "sample_rate": sample_rate})
+    return shadow_scorer.stats()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if model_watch_task is not None:
+        model_watch_task.cancel()
+    if worker_metrics_task is not None:
+        worker_metrics_task.cancel()
+    if shadow_scorer is not None:
+        shadow_scorer.close()
+    inference_executor.shutdown()
+    await video_jobs.shutdown()
+    await provider_client.close()
+
+
+async def run_inference(fn, *args):
+    """Run fn(model_artifacts, *args) on the inference executor, mapping overload to HTTP errors"""
+    try:
+        return await inference_executor.run(fn, *args)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Inference timed out after {inference_executor.timeout:.0f}s"
+        )
+
+
+async def run_predict_many(rows: list) -> list:
+    """Score a merged micro-batch of /predict rows"""
+    return await run_inference(predict_many, rows)
 
-# Load Knowledge Base
+# Load Knowledge Base: only the passages relevant to video analysis go into the prompt,
+# retrieved with a BM25 index cached next to the model (KB_* env vars)
+KB_TOP_K = int(os.getenv("KB_TOP_K", "8"))
+KB_TOKEN_BUDGET = int(os.getenv("KB_TOKEN_BUDGET", "1600"))
 try:
     kb_path = script_dir.parent.parent / "KNOWLEDGE_BASE.txt"
-    with open(kb_path, "r", encoding="utf-8") as f:
-        knowledge_base_content = f.read()
-    print(f"Loaded Knowledge Base: {len(knowledge_base_content)} chars")
+    kb_index = load_or_build_index(str(kb_path), MODEL_DIR)
+    knowledge_base_content = kb_index.context(
+        os.getenv("KB_QUERY", VIDEO_ANALYSIS_QUERY), KB_TOP_K, KB_TOKEN_BUDGET
+    )
+    logger.info("Loaded knowledge base", extra={
+        "passages": kb_index.meta['passages'], "prompt_tokens": estimate_tokens(knowledge_base_content)
+    })
 except Exception as e:
-    print(f"Warning: Could not load KNOWLEDGE_BASE.txt: {e}")
+    logger.warning("Could not load KNOWLEDGE_BASE.txt", extra={"error": str(e)})
     knowledge_base_content = "Analyze based on standard clinical autism criteria."
+analysis_prompt = build_analysis_prompt(knowledge_base_content)
+# The cache key covers the exact prompt text, so retrieval settings changes invalidate old results
+prompt_cache_version = f"{PROMPT_VERSION}+{prompt_fingerprint(analysis_prompt)}"
 
 class ScreeningInput(BaseModel):
     """Input schema for ASD screening questionnaire"""
@@ -131,12 +394,217 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up and the event loop is responsive"""
     return {
         "status": "healthy",
         "model_loaded": model_artifacts is not None
     }
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: the model is loaded and predictions can be served"""
+    if model_artifacts is None:
+        status = "failed" if model_load_error else "loading"
+        raise HTTPException(status_code=503, detail={"status": status, "error": model_load_error})
+    return {
+        "status": "ready",
+        "model_loaded": True
+    }
+
+
+@app.get("/inference-stats")
+async def inference_stats():
+    """Queue and batching counters for the inference path"""
+    return {
+        "worker": worker_info(),
+        "model": {"version": model_version, "reloads": model_reloads},
+        "shadow": shadow_scorer.stats() if shadow_scorer is not None else None,
+        "drift": drift_monitor.stats() if drift_monitor is not None else None,
+        "executor": inference_executor.stats(),
+        "batcher": predict_batcher.stats() if predict_batcher is not None else None,
+        "provider": provider_client.stats(),
+        "video_cache": video_cache.stats() if video_cache is not None else None,
+        "video_jobs": await video_jobs.stats(),
+        "video_preprocessing": video_preprocessor.stats() if video_preprocessor is not None else None,
+        "profiler": profiler.stats() if profiler is not None else None
+    }
+
+
+@app.get("/drift")
+async def drift_report():
+    """PSI / KS of recent inputs and probabilities against the served model's training profile"""
+    monitor = drift_monitor
+    if monitor is None:
+        if not DRIFT_MONITOR:
+            raise HTTPException(status_code=404, detail="Drift monitoring is disabled (DRIFT_MONITOR=0)")
+        raise HTTPException(
+            status_code=404,
+            detail="The served model has no drift profile (retrain, or run python drift.py to write one)"
+        )
+    return {"model_version": model_version, "worker": worker_info(), **await run_in_threadpool(monitor.report)}
+
+
+def require_profile_admin(request: Request):
+    """404 when profiling is off, 403 without the admin token (or, with none set, from a non-loopback client)"""
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILING=1)")
+    client_host = request.client.host if request.client else None
+    if not profiler.authorized(request.headers.get("x-admin-token"), client_host):
+        raise HTTPException(status_code=403, detail="Profile access requires X-Admin-Token")
+
+
+@app.get("/admin/profiles")
+async def list_profiles(request: Request, route: Optional[str] = None, limit: int = 100):
+    """Stored request profiles, newest first"""
+    require_profile_admin(request)
+    return {"profiles": await asyncio.to_thread(profiler.store.list, route, limit)}
+
+
+@app.get("/admin/profiles/merged")
+async def merged_profiles(request: Request, route: Optional[str] = None, limit: int = 100):
+    """The newest profiles' folded stacks added together (e.g. all recent /predict samples)"""
+    require_profile_admin(request)
+    return PlainTextResponse(await asyncio.to_thread(profiler.store.merged, route, limit))
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def download_profile(request: Request, profile_id: str):
+    """One profile as folded stacks (flamegraph.pl, inferno, speedscope)"""
+    require_profile_admin(request)
+    path = profiler.store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+
+
+def require_model_admin(request: Request):
+    """403 without MODEL_ADMIN_TOKEN (or, with none set, from a non-loopback client)"""
+    token = request.headers.get("x-admin-token")
+    if MODEL_ADMIN_TOKEN:
+        allowed = token is not None and hmac.compare_digest(token, MODEL_ADMIN_TOKEN)
+    else:
+        allowed = request.client is not None and request.client.host in ('127.0.0.1', '::1', 'localhost')
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Model administration requires X-Admin-Token")
+
+
+def check_model_version(version: str):
+    """400 for a malformed version name, 404 for one that is not stored"""
+    try:
+        resolve_model_dir(MODEL_DIR, version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/admin/models")
+async def list_models(request: Request):
+    """Stored model versions, the one being served and shadow scoring results"""
+    require_model_admin(request)
+    return {
+        "active": model_version,
+        "current": current_version(MODEL_DIR),
+        "versions": await asyncio.to_thread(list_versions, MODEL_DIR),
+        "reloads": model_reloads,
+        "worker": worker_info(),
+        "shadow": shadow_scorer.stats() if shadow_scorer is not None else None
+    }
+
+
+@app.post("/admin/models/reload")
+async def reload_model(request: Request, version: Optional[str] = None):
+    """Load, warm up and swap in a version (default: models/CURRENT); a given version also becomes CURRENT"""
+    require_model_admin(request)
+    if version is not None:
+        check_model_version(version)
+    async with model_reload_lock:
+        # CURRENT moves first (and moves back if the load fails), so a watcher never finds this
+        # process serving a version that CURRENT does not name yet and swaps the old one back in
+        previous_current = current_version(MODEL_DIR)
+        if version is not None:
+            await asyncio.to_thread(set_current_version, MODEL_DIR, version)
+        try:
+            return await swap_model(version)
+        except Exception as e:
+            if version is not None:
+                await asyncio.to_thread(set_current_version, MODEL_DIR, previous_current)
+            raise HTTPException(
+                status_code=500, detail=f"Could not load {version or 'CURRENT'}: {e}; still serving {model_version}"
+            )
+
+
+@app.post("/admin/models/shadow")
+async def start_shadow_scoring(request: Request, version: str, sample_rate: float = 0.1):
+    """Score a sampled fraction of live requests with a candidate version, off the request path"""
+    require_model_admin(request)
+    check_model_version(version)
+    if not 0.0 < sample_rate <= 1.0:
+        raise HTTPException(status_code=400, detail="sample_rate must be in (0, 1]")
+    try:
+        return await start_shadow(version, sample_rate)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load {version}: {e}")
+
+
+@app.delete("/admin/models/shadow")
+async def stop_shadow_scoring(request: Request):
+    """Stop shadow scoring, returning its final disagreement stats"""
+    global shadow_scorer
+    require_model_admin(request)
+    if shadow_scorer is None:
+        raise HTTPException(status_code=404, detail="Shadow scoring is not running")
+    scorer, shadow_scorer = shadow_scorer, None
+    scorer.close()
+    return scorer.stats()
+
+
+def register_component_metrics():
+    """Expose the components' stats() counters as scrape-time metrics"""
+    REGISTRY.callback("asd_model_loaded", "1 once the model is loaded", lambda: int(model_artifacts is not None))
+    REGISTRY.callback("asd_model_version_info", "1 for the model version being served",
+                      lambda: {(model_version or "unversioned",): 1} if model_artifacts is not None else None,
+                      ("version",))
+    REGISTRY.callback("asd_model_reloads_total", "Model version loads by outcome", lambda: {
+        ("succeeded",): model_reloads["succeeded"], ("failed",): model_reloads["failed"],
+    }, ("outcome",), kind="counter")
+    REGISTRY.callback("asd_drift_psi", "PSI of live inputs and probabilities against the training profile",
+                      lambda: drift_monitor.psi() if drift_monitor is not None else None, ("column",))
+    REGISTRY.callback("asd_drift_window_rows", "Rows in the drift monitor's window",
+                      lambda: drift_monitor.stats()["window_rows"] if drift_monitor is not None else None)
+    REGISTRY.callback("asd_inference_pending", "Model calls running or queued on the inference executor",
+                      lambda: inference_executor.pending)
+    REGISTRY.callback("asd_inference_rejected_total", "Model calls shed because the inference queue was full",
+                      lambda: inference_executor.rejected, kind="counter")
+    REGISTRY.callback("asd_inference_timed_out_total", "Model calls that exceeded INFERENCE_TIMEOUT",
+                      lambda: inference_executor.timed_out, kind="counter")
+    REGISTRY.callback("asd_batcher_pending_rows", "/predict rows waiting to be merged into a batch",
+                      lambda: predict_batcher.pending_rows if predict_batcher is not None else None)
+    REGISTRY.callback("asd_provider_requests_total", "AI provider requests by outcome", lambda: {
+        ("sent",): provider_client.requests, ("retried",): provider_client.retries,
+        ("failed",): provider_client.failures,
+    }, ("outcome",), kind="counter")
+    REGISTRY.callback("asd_video_cache_hit_ratio", "Share of video cache lookups answered without a provider call",
+                      lambda: video_cache.stats()["hit_rate"] if video_cache is not None else None)
+    REGISTRY.callback("asd_video_cache_lookups_total", "Video cache lookups by result", lambda: {
+        ("hit",): video_cache.hits, ("miss",): video_cache.misses, ("coalesced",): video_cache.coalesced,
+    } if video_cache is not None else None, ("result",), kind="counter")
+    REGISTRY.callback("asd_video_jobs_pending", "Queued video analysis jobs", lambda: video_jobs.pending())
+
+
+register_component_metrics()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of request, stage and component metrics"""
+    if worker_metrics is not None:
+        return PlainTextResponse(await asyncio.to_thread(worker_metrics.render), media_type=CONTENT_TYPE)
+    # Off the event loop: the video job callback reads the SQLite store
+    return PlainTextResponse(await asyncio.to_thread(REGISTRY.render), media_type=CONTENT_TYPE)
+
+
 @app.get("/questions")
 async def get_questions():
     """Get the AQ-10 questionnaire questions"""
@@ -159,8 +627,18 @@ async def make_prediction(input_data: ScreeningInput):
         # Convert to dict
         input_dict = input_data.model_dump()
         
-        # Make prediction
-        result = predict(model_artifacts, input_dict)
+        # Make prediction (merged with concurrent requests when batching is on)
+        if predict_batcher is not None:
+            try:
+                result = await predict_batcher.submit(input_dict)
+            except ExecutorSaturated as e:
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        else:
+            result = await run_inference(predict, input_dict)
+        if shadow_scorer is not None:
+            shadow_scorer.offer([input_dict], [result['probability']])
+        if drift_monitor is not None:
+            drift_monitor.observe(input_dict, result['probability'])
         
         # Generate basic recommendations based on risk level
         recommendations = generate_recommendations(result)
@@ -176,6 +654,8 @@ async def make_prediction(input_data: ScreeningInput):
             recommendations=recommendations
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -269,163 +749,438 @@ def generate_recommendations(result: dict) -> List[str]:
     return recommendations
 
 
-@app.post("/batch-predict")
-async def batch_prediction(inputs: List[ScreeningInput]):
-    """Make predictions for multiple samples (for test set evaluation)"""
+def format_validation_error(error: ValidationError) -> str:
+    """Flatten a pydantic ValidationError into a single readable line"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'input'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+def validate_batch_inputs(inputs: list, start: int = 0, stop: int = None):
+    """Validate raw batch rows [start, stop), returning (valid indices, valid rows, {index: error})"""
+    valid_indices = []
+    valid_rows = []
+    errors = {}
+    for i in range(start, len(inputs) if stop is None else stop):
+        try:
+            valid_rows.append(ScreeningInput.model_validate(inputs[i]).model_dump())
+            valid_indices.append(i)
+        except ValidationError as e:
+            errors[i] = format_validation_error(e)
+    return valid_indices, valid_rows, errors
+
+
+def validate_batch_columns(columns: dict, start: int, stop: int):
+    """validate_batch_inputs for a column-oriented batch: (valid indices, valid values as columns, {index: error})"""
+    valid_indices, values, invalid = columnar_validator.validate(columns, start, stop)
+    return valid_indices, values, {i: format_validation_error(e) for i, e in invalid}
+
+
+# Column-oriented batches are checked as whole arrays with ScreeningInput's rules (columnar.py)
+columnar_validator = ColumnarValidator(ScreeningInput)
+
+BATCH_PREDICT_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            JSON: {
+                "schema": {
+                    "oneOf": [
+                        {"type": "array", "items": {"$ref": "#/components/schemas/ScreeningInput"}},
+                        {"type": "object", "description": "One array per ScreeningInput field",
+                         "additionalProperties": {"type": "array", "items": {}}}
+                    ]
+                }
+            },
+            ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}}
+        }
+    },
+    "responses": {
+        "200": {
+            "description": "{\"results\": [...]} by default; one result per line or Arrow record batches when "
+                           "Accept asks for application/x-ndjson or application/vnd.apache.arrow.stream",
+            "content": {JSON: {}, NDJSON: {}, ARROW_STREAM: {}}
+        }
+    }
+}
+
+
+async def read_batch(request: Request) -> tuple:
+    """("rows", list of row objects) or ("columns", name -> array) from a JSON or Arrow body, and the row count"""
+    body = await request.body()
+    content_type = request.headers.get("content-type", JSON).split(";")[0].strip().lower()
+    try:
+        if content_type == ARROW_STREAM:
+            payload = await run_in_threadpool(read_arrow_columns, body)
+        else:
+            payload = await run_in_threadpool(json.loads, body)
+        if isinstance(payload, list):
+            return "rows", payload, len(payload)
+        return "columns", payload, columnar_validator.count_rows(payload)
+    except RuntimeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ColumnarError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid JSON body: {e}")
+
+
+async def score_batch_chunks(kind: str, payload, n_rows: int, return_details: bool, explain: bool,
+                             as_columns: bool = False, streaming: bool = False):
+    """
+    Validate and score BATCH_CHUNK_SIZE input rows at a time, yielding
+    (start, stop, scored indices, their results, {index: error}) in input
+    order. Results are row dicts, or score_matrix columns with as_columns.
+    Once a streamed response has started, overload and timeouts can no
+    longer become HTTP errors and are reported on the chunk's rows instead.
+    """
+    for start in range(0, n_rows, BATCH_CHUNK_SIZE):
+        stop = min(start + BATCH_CHUNK_SIZE, n_rows)
+        if kind == "rows":
+            indices, valid, errors = await run_in_threadpool(validate_batch_inputs, payload, start, stop)
+        else:
+            indices, valid, errors = await run_in_threadpool(validate_batch_columns, payload, start, stop)
+        results = None
+        if indices:
+            try:
+                if kind == "rows":
+                    results = await run_inference(predict_batch, valid, return_details, explain)
+                    if as_columns:
+                        results = {name: [row[name] for row in results] for name in results[0]}
+                else:
+                    results = await run_inference(predict_columns, valid, return_details, explain, not as_columns)
+            except HTTPException as e:
+                if not streaming or start == 0:
+                    raise
+                errors.update((i, str(e.detail)) for i in indices)
+                indices = []
+            except Exception as e:
+                errors.update((i, str(e)) for i in indices)
+                indices = []
+            if indices and shadow_scorer is not None and start == 0:
+                offer_shadow(kind, valid, results)
+            if indices and drift_monitor is not None:
+                await run_in_threadpool(observe_drift, drift_monitor, kind, valid, results)
+        yield start, stop, indices, results, errors
+
+
+def observe_drift(monitor: DriftMonitor, kind: str, valid, results):
+    """Count one scored chunk's inputs and probabilities in the drift monitor"""
+    if isinstance(results, dict):
+        probabilities = results["probability"]
+    else:
+        probabilities = [result["probability"] for result in results]
+    if kind == "columns":
+        monitor.observe_columns(valid, probabilities)
+    else:
+        monitor.observe_rows(valid, probabilities)
+
+
+def offer_shadow(kind: str, valid, results):
+    """Hand the first chunk's scored rows to the shadow scorer"""
+    n_rows = shadow_scorer.max_rows
+    if kind == "columns":
+        valid = result_rows({name: values[:n_rows] for name, values in valid.items()})
+    if isinstance(results, dict):
+        probabilities = list(results["probability"][:n_rows])
+    else:
+        probabilities = [result["probability"] for result in results[:n_rows]]
+    shadow_scorer.offer(valid[:n_rows], probabilities)
+
+
+def chunk_rows(start: int, stop: int, indices: list, results: list, errors: dict) -> list:
+    """One chunk's result dicts in input order, errors included"""
+    rows = [None] * (stop - start)
+    for i, result in zip(indices, results or ()):
+        rows[i - start] = result
+    for i, error in errors.items():
+        rows[i - start] = {"index": i, "error": error}
+    return rows
+
+
+@app.post("/batch-predict", openapi_extra=BATCH_PREDICT_OPENAPI)
+async def batch_prediction(request: Request, return_details: bool = False, explain: bool = False):
+    """
+    Make predictions for multiple samples (for test set evaluation).
+    The body is a JSON array of rows, a JSON object of column arrays or an
+    Arrow IPC stream; Accept: application/x-ndjson or
+    application/vnd.apache.arrow.stream streams the results back per chunk.
+    """
     
     if model_artifacts is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
-    results = []
-    for input_data in inputs:
+    kind, payload, n_rows = await read_batch(request)
+    accept = request.headers.get("accept", "")
+    output = next((media for media in (NDJSON, ARROW_STREAM) if media in accept), JSON)
+    
+    if output == JSON:
+        # Errors are reported at their original index; rows are scored one vectorized call per chunk
+        results = []
+        async for start, stop, indices, chunk_results, errors in score_batch_chunks(
+                kind, payload, n_rows, return_details, explain):
+            results.extend(chunk_rows(start, stop, indices, chunk_results, errors))
+        return await run_in_threadpool(JSONResponse, {"results": results})
+    
+    arrow = None
+    if output == ARROW_STREAM:
         try:
-            input_dict = input_data.model_dump()
-            result = predict(model_artifacts, input_dict)
-            results.append({
-                "prediction": result['prediction'],
-                "probability": result['probability']
-            })
-        except Exception as e:
-            results.append({
-                "error": str(e)
-            })
+            arrow = ArrowResultStream(return_details, explain)
+        except RuntimeError as e:
+            raise HTTPException(status_code=406, detail=str(e))
+    chunks = score_batch_chunks(kind, payload, n_rows, return_details, explain,
+                                as_columns=arrow is not None, streaming=True)
+    # The first chunk is scored before the response starts, so overload still maps to 503/504
+    first = await anext(chunks, None)
     
-    return {"results": results}
+    async def stream():
+        if arrow is not None:
+            yield arrow.start()
+        chunk = first
+        while chunk is not None:
+            if arrow is not None:
+                yield await run_in_threadpool(arrow.batch, *chunk)
+            else:
+                yield await run_in_threadpool(ndjson_lines, chunk_rows(*chunk))
+            chunk = await anext(chunks, None)
+        if arrow is not None:
+            yield arrow.end()
+    
+    return StreamingResponse(stream(), media_type=output)
+
 
+async def request_video_analysis(file, mime_type: str, model_name: str, api_key: str, set_stage):
+    """Send the spooled video to the provider; returns (result, cacheable)"""
+    # Prepare request to AI Pipe (serving Gemini)
+    path = f"/models/{model_name}:generateContent"
+    
+    # Request body is streamed: JSON prefix, base64 chunks read from the spooled file, JSON suffix
+    body = VideoRequestBody(analysis_prompt, mime_type, file)
+    preprocessed = None
+    if video_preprocessor is not None:
+        await set_stage("preprocessing")
+        try:
+            with stage_timer("preprocess"):
+                preprocessed = await video_preprocessor.run_upload_async(file)
+        except PreprocessingError as e:
+            logger.warning("Video preprocessing failed, sending the original video", extra={"error": str(e)})
+    report = None
+    if preprocessed is not None:
+        raw_length = body.content_length
+        body = PartsRequestBody(analysis_prompt + video_preprocessor.prompt_note(preprocessed), preprocessed.parts)
+        report = {
+            "frames": len(preprocessed.frames),
+            "audio": preprocessed.audio is not None,
+            "video_bytes": preprocessed.input_bytes,
+            "original_request_bytes": raw_length,
+            "request_bytes": body.content_length,
+            "bytes_saved": raw_length - body.content_length,
+            "reduction": round(1 - body.content_length / raw_length, 4),
+            "preprocess_ms": round(preprocessed.seconds * 1000, 1),
+        }
+    headers = {
+        "Content-Type": "application/json",
+        "Content-Length": str(body.content_length),
+        "Authorization": f"Bearer {api_key}"
+    }
 
-@app.post("/analyze-video")
-async def analyze_video(file: UploadFile = File(...)):
+    # Video processing might take a bit of time (AI_PROVIDER_READ_TIMEOUT); 429/5xx are retried
+    await set_stage("analyzing")
+    provider_start = time.perf_counter()
+    try:
+        response = await provider_client.post(path, headers=headers, content=body.chunks)
+    finally:
+        if preprocessed is not None:
+            preprocessed.cleanup()
+    # The round trip includes streaming the body, so it also contains the encode time
+    provider_seconds = time.perf_counter() - provider_start
+    observe_stage("provider", provider_seconds)
+    observe_stage("encode", body.encode_seconds)
+    if report is not None:
+        report["provider_ms"] = round(provider_seconds * 1000, 1)
+        logger.info("Video preprocessing", extra=report)
+    
+    if response.status_code != 200:
+        logger.warning("AI provider error", extra={"status_code": response.status_code, "body": response.text})
+        raise HTTPException(status_code=response.status_code, detail=f"AI Provider Error: {response.text}")
+        
+    with stage_timer("parse"):
+        result = response.json()
+    
+        # Extract text from Gemini response structure
+        try:
+            analysis_text = result["candidates"][0]["content"]["parts"][0]["text"]
+            logger.debug("AI provider response", extra={"text": analysis_text})
+
+            data = parse_analysis_text(analysis_text)
+            if report is not None:
+                data["preprocessing"] = report
+            return data, True
+
+        except (KeyError, IndexError, TypeError) as e:
+            logger.warning("Unexpected AI provider response structure", extra={"error": str(e), "response": result})
+            # Return default zero structure instead of partial_error to avoid frontend "No data"
+            return {
+                "physical_score": 0,
+                "physical_reason": f"Error parsing AI response: {str(e)}",
+                "speech_score": 0,
+                "speech_reason": "Error parsing AI response."
+            }, False
+
+
+async def analyze_spooled_video(file, mime_type: str, set_stage=None) -> dict:
+    """Analyze an uploaded video, going through the result cache when it is enabled"""
+    api_key = os.getenv("AIPIPE_API_KEY")
+    if not api_key:
+         raise HTTPException(status_code=500, detail="AIPIPE_API_KEY not configured in environment")
+    if set_stage is None:
+        async def set_stage(stage):
+            pass
+
+    # Get model from env or default to gemini-1.5-flash
+    model_name = os.getenv("AI_MODEL", "gemini-1.5-flash")
+
+    async def analyze():
+        VIDEO_IN_FLIGHT.inc()
+        try:
+            return await request_video_analysis(file, mime_type, model_name, api_key, set_stage)
+        finally:
+            VIDEO_IN_FLIGHT.dec()
+
+    if video_cache is None:
+        result, _ = await analyze()
+        return result
+
+    # Same bytes + model + prompt version -> same answer; identical concurrent uploads share one call
+    await set_stage("hashing")
+    with stage_timer("hash"):
+        video_hash = await upload_sha256(file)
+    prompt_version = prompt_cache_version
+    if video_preprocessor is not None:
+        prompt_version = f"{prompt_cache_version}+{video_preprocessor.signature}"
+    return await video_cache.get_or_compute(
+        cache_key(video_hash, model_name, prompt_version), analyze,
+        video_sha256=video_hash, model=model_name, prompt_version=prompt_version
+    )
+
+
+# Queued /analyze-video/jobs uploads, persisted in SQLite (VIDEO_JOB* env vars)
+video_jobs = VideoJobQueue.from_env(MODEL_DIR, analyze_spooled_video)
+
+VIDEO_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
+
+
+async def receive_video_upload(request: Request):
+    """Spool the upload to disk in chunks, rejecting it as soon as it passes the size cap"""
+    start = time.perf_counter()
+    try:
+        upload = await spool_video_upload(request, VIDEO_MAX_BYTES)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    observe_stage("upload_read", time.perf_counter() - start)
+    return upload
+
+
+@app.post("/analyze-video", openapi_extra=VIDEO_UPLOAD_OPENAPI)
+async def analyze_video(request: Request):
     """
     Analyze a video file for signs of autism using Gemini 1.5 Flash via AI Pipe.
     """
-    api_key = os.getenv("AIPIPE_API_KEY")
-    if not api_key:
+    if not os.getenv("AIPIPE_API_KEY"):
          raise HTTPException(status_code=500, detail="AIPIPE_API_KEY not configured in environment")
 
-    # Limit file size (optional safety check, e.g. 25MB)
-    # content_length = request.headers.get('content-length')
-    
+    file = await receive_video_upload(request)
     try:
-        # Read file content
-        content = await file.read()
-        
-        # Encode to base64
-        video_b64 = base64.b64encode(content).decode("utf-8")
-        
         # Determine mime type
         mime_type = file.content_type or "video/mp4"
-        
-        # Get model from env or default to gemini-1.5-flash
-        model_name = os.getenv("AI_MODEL", "gemini-1.5-flash")
-
-        # Prepare request to AI Pipe (serving Gemini)
-        url = f"https://aipipe.org/geminiv1beta/models/{model_name}:generateContent"
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        
-        prompt = """
-        You are an expert clinical autism specialist.
-    
-    Use the following CLINICAL KNOWLEDGE BASE to guide your analysis:
-    \"\"\"
-    {knowledge_base_content}
-    \"\"\"
-
-    Analyze the video for TWO distinct modalities based on the knowledge base:
-    1. **Physical Behavior**: Facial expressions, eye contact (or lack thereof), hand flapping, rocking, body language.
-    2. **Speech & Audio**: Tone fairness, prosody (monotone vs expressive), speech rate, response latency, echolalia.
-    
-    Provide EXACTLY four outputs:
-    1. **Physical Score**: Risk score 1-100 based on VISUALS (1=typical, 100=high autism traits).
-    2. **Physical Reason**: Concise explanation of the visual signs, referencing terms from the Knowledge Base (e.g. "visual stimming", "ocular behaviors").
-    3. **Speech Score**: Risk score 1-100 based on AUDIO (1=typical, 100=high autism traits).
-    4. **Speech Reason**: Concise explanation of the auditory signs, referencing terms from the Knowledge Base (e.g. "monotone prosody", "echolalia").
+        return await analyze_spooled_video(file, mime_type)
     
-    Format your response exactly like this:
-    Physical Score: [Number]
-    Physical Reason: [Text]
-    Speech Score: [Number]
-    Speech Reason: [Text]
-    
-    If the video is unclear or no person/audio is present, return 0 for scores and "Unable to analyze" for reasons.
-    """
-
-        payload = {
-            "contents": [{
-                "parts": [
-                    {"text": prompt},
-                    {
-                        "inline_data": {
-                            "mime_type": mime_type,
-                            "data": video_b64
-                        }
-                    }
-                ]
-            }]
-        }
-
-        async with httpx.AsyncClient() as client:
-            # Video processing might take a bit of time
-            response = await client.post(url, headers=headers, json=payload, timeout=120.0)
-            
-            if response.status_code != 200:
-                print(f"AI Pipe Error: {response.text}")
-                raise HTTPException(status_code=response.status_code, detail=f"AI Provider Error: {response.text}")
-                
-            result = response.json()
-            
-            # Extract text from Gemini response structure
-            try:
-                analysis_text = result["candidates"][0]["content"]["parts"][0]["text"]
-                print(f"Gemini Raw Response: {analysis_text}") # Debug log
-
-                # Robust parsing with Regex
-                data = {
-                    "physical_score": 0,
-                    "physical_reason": "Analysis failed to extract physical reason.",
-                    "speech_score": 0,
-                    "speech_reason": "Analysis failed to extract speech reason."
-                }
-                
-                # Regex patterns (case insensitive)
-                # Matches: "Physical Score: 50" or "**Physical Score**: 50" or "1. Physical Score: 50"
-                p_score = re.search(r"physical\s+score\**\s*:\s*(\d+)", analysis_text, re.IGNORECASE)
-                s_score = re.search(r"speech\s+score\**\s*:\s*(\d+)", analysis_text, re.IGNORECASE)
-                
-                if p_score:
-                    data["physical_score"] = int(p_score.group(1))
-                
-                if s_score:
-                    data["speech_score"] = int(s_score.group(1))
-                    
-                # Extract reasons (capture everything after "Reason:" until next line or end)
-                p_reason = re.search(r"physical\s+reason\**\s*:\s*(.+?)(?=\n|speech|$)", analysis_text, re.IGNORECASE | re.DOTALL)
-                s_reason = re.search(r"speech\s+reason\**\s*:\s*(.+?)(?=$)", analysis_text, re.IGNORECASE | re.DOTALL)
-                
-                if p_reason:
-                    data["physical_reason"] = p_reason.group(1).strip()
-                if s_reason:
-                    data["speech_reason"] = s_reason.group(1).strip()
-
-                return data
-
-            except (KeyError, IndexError, TypeError) as e:
-                print(f"Parsing Error: {str(e)}")
-                print(f"Unexpected response structure: {result}")
-                # Return default zero structure instead of partial_error to avoid frontend "No data"
-                return {
-                    "physical_score": 0,
-                    "physical_reason": f"Error parsing AI response: {str(e)}",
-                    "speech_score": 0,
-                    "speech_reason": "Error parsing AI response."
-                }
-                
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Video analysis failed: {str(e)}")
+        logger.exception("Video analysis failed")
         raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
+    finally:
+        await file.close()
+
+
+@app.post("/analyze-video/jobs", status_code=202, openapi_extra=VIDEO_UPLOAD_OPENAPI)
+async def submit_video_job(request: Request):
+    """Queue a video for analysis and return a job id to poll (GET /jobs/{id}) or stream"""
+    if not os.getenv("AIPIPE_API_KEY"):
+         raise HTTPException(status_code=500, detail="AIPIPE_API_KEY not configured in environment")
+
+    file = await receive_video_upload(request)
+    try:
+        job = await video_jobs.submit(file, file.content_type or "video/mp4")
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    finally:
+        await file.close()
+
+    job["status_url"] = f"/jobs/{job['job_id']}"
+    job["events_url"] = f"/jobs/{job['job_id']}/events"
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def get_video_job(job_id: str):
+    """Current stage and, once finished, the result or error of a video job"""
+    job = await video_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_video_job(job_id: str):
+    """Server-sent events with the job state on every change, ending when it finishes"""
+    if await video_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        listener = video_jobs.subscribe(job_id)
+        try:
+            job = await video_jobs.get(job_id)
+            yield f"event: {job['stage']}\ndata: {json.dumps(job)}\n\n"
+            last_write = time.monotonic()
+            while job['status'] not in TERMINAL_STATUSES:
+                try:
+                    update = await asyncio.wait_for(listener.get(), timeout=video_jobs.poll_seconds)
+                except asyncio.TimeoutError:
+                    # Another worker process may be running the job: its changes only reach the store
+                    update = await video_jobs.get(job_id)
+                    if update is None:
+                        break
+                    if (update['status'], update['stage']) == (job['status'], job['stage']):
+                        if time.monotonic() - last_write >= 15:
+                            # Keep idle proxies from closing the stream
+                            yield ": keep-alive\n\n"
+                            last_write = time.monotonic()
+                        continue
+                job = update
+                yield f"event: {job['stage']}\ndata: {json.dumps(job)}\n\n"
+                last_write = time.monotonic()
+        finally:
+            video_jobs.unsubscribe(job_id, listener)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 if __name__ == "__main__":
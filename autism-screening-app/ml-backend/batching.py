@@ -0,0 +1,124 @@
+"""
+Dynamic micro-batching for concurrent single-row predictions
+Requests arriving within a short window are merged into one vectorized
+model call and each caller gets back its own row
+"""
+
+import asyncio
+import os
+import time
+
+from inference import ExecutorSaturated
+
+
+class MicroBatcher:
+    """
+    Collects submitted rows for up to max_wait_ms or max_batch_size rows,
+    whichever comes first, then hands the merged batch to run_batch.
+
+    run_batch is an async callable taking a list of rows and returning one
+    result per row in the same order. At most max_queue rows may be
+    waiting or in flight; beyond that submit raises ExecutorSaturated.
+    """
+
+    def __init__(self, run_batch, max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0, max_queue: int = 1024):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self._buffer = []
+        self._timer = None
+        self._tasks = set()
+        self.pending_rows = 0
+        self.rejected = 0
+        self.batches = 0
+        self.rows = 0
+        self.flushed_on_size = 0
+        self.flushed_on_timeout = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    @classmethod
+    def from_env(cls, run_batch) -> 'MicroBatcher':
+        """Build a batcher from PREDICT_BATCH_* environment variables"""
+        return cls(
+            run_batch,
+            max_batch_size=int(os.getenv("PREDICT_BATCH_MAX_SIZE", "32")),
+            max_wait_ms=float(os.getenv("PREDICT_BATCH_MAX_WAIT_MS", "5")),
+            max_queue=int(os.getenv("PREDICT_BATCH_MAX_QUEUE", "1024")),
+        )
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_queue": self.max_queue,
+            "pending_rows": self.pending_rows,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "rows": self.rows,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "flushed_on_size": self.flushed_on_size,
+            "flushed_on_timeout": self.flushed_on_timeout,
+            "mean_queue_wait_ms": self.queue_wait_total / self.rows * 1000 if self.rows else 0.0,
+            "max_queue_wait_ms": self.queue_wait_max * 1000,
+        }
+
+    async def submit(self, row):
+        """Queue one row and wait for its result"""
+        if self.pending_rows >= self.max_queue:
+            self.rejected += 1
+            raise ExecutorSaturated(f"Prediction batch queue is full ({self.pending_rows} pending)")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._buffer.append((row, future, time.perf_counter()))
+        self.pending_rows += 1
+
+        if len(self._buffer) >= self.max_batch_size:
+            self.flushed_on_size += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush_on_timeout)
+
+        return await future
+
+    def _flush_on_timeout(self):
+        self._timer = None
+        if self._buffer:
+            self.flushed_on_timeout += 1
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._buffer = self._buffer, []
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: list):
+        now = time.perf_counter()
+        for _, _, enqueued in batch:
+            wait = now - enqueued
+            self.queue_wait_total += wait
+            self.queue_wait_max = max(self.queue_wait_max, wait)
+        self.batches += 1
+        self.rows += len(batch)
+
+        try:
+            results = await self.run_batch([row for row, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                # Callers that disconnected have already cancelled their future
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.pending_rows -= len(batch)
@@ -0,0 +1,53 @@
+"""
+Wall-clock scaling of the cross-validated hyperparameter search
+Runs the same search (same configs, same cached folds) with 1, 2, 4, ...
+worker processes up to the core count and reports time and speedup
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import warnings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import pandas as pd
+
+from train import engineer_features, get_feature_columns
+from tuning import search
+
+DEFAULT_DATA = os.path.join(BACKEND_DIR, '..', '..', 'dataset', 'train.csv')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--strategy', choices=['random', 'halving'], default='random')
+    parser.add_argument('--trials', type=int, default=16)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    warnings.filterwarnings('ignore', message='.*eval_set.*')
+    features = engineer_features(pd.read_csv(args.data))
+    X = features[get_feature_columns()].values
+    y = features['Class/ASD'].values
+
+    worker_counts = sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i <= args.max_workers], args.max_workers})
+    print(f"{args.strategy} search, {args.trials} configs x {args.folds} folds, {os.cpu_count()} cores")
+    baseline = None
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for workers in worker_counts:
+            result = search(X, y, strategy=args.strategy, n_trials=args.trials, n_folds=args.folds,
+                            workers=workers, cache_dir=cache_dir)
+            baseline = baseline or result['wall_seconds']
+            print(f"workers={workers:3d}  wall {result['wall_seconds']:7.2f}s  "
+                  f"speedup vs 1 worker {baseline / result['wall_seconds']:5.2f}x  "
+                  f"best CV AUC {result['best']['auc_mean']:.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Drift monitor cost, memory and detection
+Times DriftMonitor.observe per /predict row and observe_rows / observe_columns
+per batch row, checks that memory stays flat over a million rows and that a
+short window forgets old traffic, then replays traffic scenarios (held-out
+rows, synthetic rows, older patients, only ASD cases) against a profile of
+train.csv and prints the overall status and the columns flagged
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from drift import DriftMonitor, build_profile
+from serving import load_serving_model, predict_batch
+from synthetic import REQUEST_COLUMNS, SyntheticRows
+from train import ensure_features
+
+DEFAULT_DATA = os.path.join(BACKEND_DIR, '..', '..', 'dataset', 'train.csv')
+
+
+def columns_of(rows: list) -> dict:
+    """Validated-column form of request rows, as columnar.ColumnarValidator returns it"""
+    return {name: np.asarray([row[name] for row in rows], dtype=object if isinstance(rows[0][name], str) else np.float64)
+            for name in rows[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--model-dir', default=os.path.join(BACKEND_DIR, 'models'))
+    parser.add_argument('--rows', type=int, default=5000, help='Rows replayed per scenario')
+    parser.add_argument('--memory-rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore', category=UserWarning)
+    model_artifacts = load_serving_model(args.model_dir)
+    feature_cols = model_artifacts['feature_cols']
+    df = pd.read_csv(args.data)
+    train_df, validation_df = train_test_split(df, test_size=0.2, stratify=df['Class/ASD'], random_state=42)
+    features = ensure_features(df)
+    validation_rows = validation_df[REQUEST_COLUMNS].to_dict('records')
+    held_out = [result['probability'] for result in predict_batch(model_artifacts, validation_rows)]
+    profile = build_profile(features[feature_cols].values, feature_cols, held_out)
+
+    synthetic = SyntheticRows.from_csv(args.data)
+    rows = synthetic.requests(2048, seed=0)
+    probabilities = [result['probability'] for result in predict_batch(model_artifacts, rows)]
+    monitor = DriftMonitor(profile)
+    print(f"{monitor.n_bins} bins x {monitor.buckets} buckets")
+
+    start = time.perf_counter()
+    for _ in range(10):
+        for row, probability in zip(rows, probabilities):
+            monitor.observe(row, probability)
+    print(f"observe (one /predict row):        {(time.perf_counter() - start) / (10 * len(rows)) * 1e6:6.2f} us/row")
+    start = time.perf_counter()
+    for _ in range(10):
+        monitor.observe_rows(rows, probabilities)
+    print(f"observe_rows (2048-row chunk):     {(time.perf_counter() - start) / (10 * len(rows)) * 1e6:6.2f} us/row")
+    columns = columns_of(rows)
+    start = time.perf_counter()
+    for _ in range(10):
+        monitor.observe_columns(columns, probabilities)
+    print(f"observe_columns (2048-row chunk):  {(time.perf_counter() - start) / (10 * len(rows)) * 1e6:6.2f} us/row")
+
+    tracemalloc.start()
+    monitor.observe_columns(columns, probabilities)
+    baseline = tracemalloc.get_traced_memory()[0]
+    for _ in range(args.memory_rows // len(rows)):
+        monitor.observe_columns(columns, probabilities)
+    grown = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    print(f"after {monitor.rows_total:,} rows: traced memory grew {grown:,} bytes")
+
+    short = DriftMonitor(profile, window_seconds=0.5, buckets=5)
+    short.observe_columns(columns, probabilities)
+    rows_before = short.stats()['window_rows']
+    time.sleep(0.6)
+    print(f"0.5 s window: {rows_before} rows, {short.stats()['window_rows']} rows 0.6 s later")
+
+    rng = np.random.default_rng(0)
+    held_out_rows = [validation_rows[i] for i in rng.integers(len(validation_rows), size=args.rows)]
+    older = [dict(row, age=min(row['age'] + 25, 100.0)) for row in synthetic.requests(args.rows, seed=2)]
+    asd = synthetic.sample(args.rows * 4, seed=3)
+    asd = asd[asd['Class/ASD'] == 1][REQUEST_COLUMNS].head(args.rows).to_dict('records')
+    scenarios = [
+        ('held-out rows, resampled', held_out_rows),
+        ('synthetic rows', synthetic.requests(args.rows, seed=1)),
+        ('synthetic, age + 25', older),
+        ('synthetic, ASD cases only', asd),
+    ]
+    print(f"\n{'scenario':<28} {'status':<12} {'probability PSI':>15}  significant columns")
+    for name, scenario_rows in scenarios:
+        monitor = DriftMonitor(profile)
+        scored = predict_batch(model_artifacts, scenario_rows)
+        monitor.observe_rows(scenario_rows, [result['probability'] for result in scored])
+        report = monitor.report()
+        print(f"{name:<28} {report['status']:<12} {report['probability']['psi']:>15.3f}  "
+              f"{', '.join(report['drifted']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+CSV parsing + engineer_features vs the on-disk feature cache
+Tiles train.csv up to --rows rows and times a cold build, the first cached
+run (which writes the .npy matrix) and warm loads from the memory-mapped cache
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+import pandas as pd
+
+from feature_cache import load_features
+from train import engineer_features, get_feature_columns
+
+DEFAULT_DATA = os.path.join(BACKEND_DIR, '..', '..', 'dataset', 'train.csv')
+
+
+def median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--rows', type=int, nargs='+', default=[800, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    source = pd.read_csv(args.data)
+    feature_cols = get_feature_columns()
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            csv_path = os.path.join(tmp, f'train{rows}.csv')
+            tiled = source.iloc[np.arange(rows) % len(source)].reset_index(drop=True)
+            tiled.assign(ID=np.arange(1, rows + 1)).to_csv(csv_path, index=False)
+            cache_dir = os.path.join(tmp, 'cache')
+
+            def cold():
+                return engineer_features(pd.read_csv(csv_path))[feature_cols].values
+
+            def warm():
+                return load_features(csv_path, cache_dir=cache_dir)[feature_cols].values
+
+            cold_ms = median_ms(cold, args.repeat)
+            start = time.perf_counter()
+            load_features(csv_path, cache_dir=cache_dir, refresh=True)
+            first_ms = (time.perf_counter() - start) * 1000
+            warm_ms = median_ms(warm, args.repeat)
+            assert np.array_equal(cold(), warm())
+
+            print(f"{rows:>9,} rows | csv + engineer_features {cold_ms:8.1f} ms | "
+                  f"first cached run {first_ms:8.1f} ms | warm cache {warm_ms:7.1f} ms "
+                  f"({cold_ms / warm_ms:5.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Incremental model update vs full retraining
+Over several random splits, holds back part of train.csv's training split as
+"newly labeled" rows, trains a base model on the rest, and compares
+train.update_model on the new rows with retraining on everything: AUC-ROC and
+Brier on the original validation split and how often the guard accepts.
+Then times both on a large synthetic base, checks that trees rescaled to
+updated scaler statistics give unchanged raw scores, and that an update with
+flipped labels is rejected
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+import warnings
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from synthetic import SyntheticRows
+from train import ensure_features, evaluate, get_feature_columns, rescale_booster, update_model
+
+DEFAULT_DATA = os.path.join(BACKEND_DIR, '..', '..', 'dataset', 'train.csv')
+
+
+def fit_full(df: pd.DataFrame) -> dict:
+    """Same model and scaler as train.train_model, fitted on every row of df"""
+    features = ensure_features(df)
+    feature_cols = get_feature_columns()
+    X, y = features[feature_cols].values, features['Class/ASD'].values
+    scaler = StandardScaler().fit(X)
+    model = lgb.LGBMClassifier(
+        n_estimators=100, max_depth=5, learning_rate=0.1, class_weight='balanced', random_state=42, verbose=-1
+    )
+    model.fit(scaler.transform(X), y)
+    return {'model': model, 'scaler': scaler, 'feature_cols': feature_cols}
+
+
+def timed(fn, *args, **kwargs) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--splits', type=int, default=12)
+    parser.add_argument('--new-share', type=float, default=0.25, help='Share of the training split held back as new rows')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--learning-rate', type=float, default=0.05)
+    parser.add_argument('--auc-tolerance', type=float, default=0.0)
+    parser.add_argument('--synthetic-rows', type=int, default=200000, help='Base rows for the timing comparison')
+    parser.add_argument('--synthetic-new', type=int, default=5000, help='New rows for the timing comparison')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore', category=FutureWarning)
+    warnings.filterwarnings('ignore', category=UserWarning)
+    df = pd.read_csv(args.data)
+    train_df, reference_df = train_test_split(df, test_size=0.2, stratify=df['Class/ASD'], random_state=42)
+    reference = ensure_features(reference_df)
+    X_val, y_val = reference[get_feature_columns()].values, reference['Class/ASD'].values
+
+    scores = {'base': [], 'update': [], 'retrain': []}
+    accepted = 0
+    for seed in range(args.splits):
+        base_df, new_df = train_test_split(
+            train_df, test_size=args.new_share, stratify=train_df['Class/ASD'], random_state=seed
+        )
+        base = fit_full(base_df)
+        updated = update_model(base, new_df, reference_df, rounds=args.rounds, learning_rate=args.learning_rate,
+                               auc_tolerance=args.auc_tolerance)
+        accepted += updated['metrics']['incremental']['accepted']
+        for name, artifacts in (('base', base), ('update', updated), ('retrain', fit_full(train_df))):
+            result = evaluate(artifacts['model'], artifacts['scaler'], X_val, y_val)
+            scores[name].append((result['auc_roc'], result['brier_score']))
+
+    print(f"{args.splits} splits: base {len(base_df)} rows, new {len(new_df)} rows, validation {len(reference_df)} rows")
+    base_scores = np.array(scores['base'])
+    for name, label in (('base', 'base model'), ('update', f'update_model (+{args.rounds} trees)'),
+                        ('retrain', 'full retrain (base + new)')):
+        values = np.array(scores[name])
+        auc, brier = values.mean(axis=0)
+        line = f"  {label:<28} AUC-ROC {auc:.4f}  Brier {brier:.4f}"
+        if name != 'base':
+            delta = values - base_scores
+            line += (f"  AUC better on {int((delta[:, 0] > 0).sum())}/{args.splits}, "
+                     f"Brier better on {int((delta[:, 1] < 0).sum())}/{args.splits}")
+        print(line)
+    print(f"  guard accepted {accepted}/{args.splits} updates (AUC tolerance {args.auc_tolerance})")
+
+    rows = SyntheticRows.from_csv(args.data)
+    big_df, new_df = rows.sample(args.synthetic_rows, seed=1), rows.sample(args.synthetic_new, seed=2)
+    base, fit_seconds = timed(fit_full, big_df)
+    _, retrain_seconds = timed(fit_full, pd.concat([big_df, new_df]))
+    updated, update_seconds = timed(update_model, base, new_df, reference_df,
+                                    rounds=args.rounds, learning_rate=args.learning_rate)
+    print(f"synthetic base of {args.synthetic_rows:,} rows + {args.synthetic_new:,} new: "
+          f"full retrain {retrain_seconds:.2f}s, update_model {update_seconds:.2f}s")
+
+    # Trees rescaled to the updated statistics score unseen rows exactly as before
+    X = ensure_features(rows.sample(20000, seed=3))[get_feature_columns()].values
+    small = fit_full(train_df)
+    scaler = copy.deepcopy(small['scaler']).partial_fit(ensure_features(new_df)[get_feature_columns()].values)
+    booster = small['model'].booster_
+    before = booster.predict(small['scaler'].transform(X), raw_score=True)
+    after = rescale_booster(booster, small['scaler'], scaler).predict(scaler.transform(X), raw_score=True)
+    print(f"rescaled trees, 20,000 rows: max |raw score difference| {np.abs(before - after).max():.3g}")
+
+    flipped = train_df.sample(frac=args.new_share, random_state=0)
+    flipped['Class/ASD'] = 1 - flipped['Class/ASD']
+    rejected = update_model(small, flipped, reference_df, rounds=args.rounds, learning_rate=args.learning_rate)
+    print(f"flipped labels: {'accepted' if rejected['metrics']['incremental']['accepted'] else 'rejected'} "
+          f"{rejected['metrics']['incremental']['regressions']}")
+
+
+if __name__ == '__main__':
+    main()
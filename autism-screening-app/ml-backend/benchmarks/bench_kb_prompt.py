@@ -0,0 +1,63 @@
+"""
+Video-analysis prompt size with full knowledge base vs BM25 retrieval
+Reports prompt characters and estimated tokens for both, plus index build,
+cached-load and query times
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from kb_index import VIDEO_ANALYSIS_QUERY, KnowledgeBaseIndex, estimate_tokens, load_or_build_index
+from video_analysis import build_analysis_prompt
+
+DEFAULT_KB = os.path.join(BACKEND_DIR, '..', '..', 'KNOWLEDGE_BASE.txt')
+
+
+def median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--kb', default=DEFAULT_KB)
+    parser.add_argument('--top-k', type=int, default=8)
+    parser.add_argument('--token-budget', type=int, default=1600)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.kb, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    full_prompt = build_analysis_prompt(text)
+    with tempfile.TemporaryDirectory() as index_dir:
+        build_ms = median_ms(lambda: KnowledgeBaseIndex.build(text), args.repeat)
+        load_or_build_index(args.kb, index_dir)
+        load_ms = median_ms(lambda: load_or_build_index(args.kb, index_dir), args.repeat)
+        index = load_or_build_index(args.kb, index_dir)
+    query_ms = median_ms(lambda: index.context(VIDEO_ANALYSIS_QUERY, args.top_k, args.token_budget),
+                         args.repeat)
+    context = index.context(VIDEO_ANALYSIS_QUERY, args.top_k, args.token_budget)
+    retrieved_prompt = build_analysis_prompt(context)
+
+    print(f"index: {index.meta['passages']} passages, {index.meta['terms']} terms")
+    print(f"build {build_ms:.1f} ms | cached load {load_ms:.1f} ms | query {query_ms:.2f} ms")
+    print(f"full knowledge base prompt  {len(full_prompt):7d} chars  ~{estimate_tokens(full_prompt):5d} tokens")
+    print(f"retrieved passages prompt   {len(retrieved_prompt):7d} chars  ~{estimate_tokens(retrieved_prompt):5d} tokens "
+          f"({len(index.retrieve(VIDEO_ANALYSIS_QUERY, args.top_k, args.token_budget))} passages, "
+          f"{1 - len(retrieved_prompt) / len(full_prompt):.0%} smaller)")
+
+
+if __name__ == '__main__':
+    main()
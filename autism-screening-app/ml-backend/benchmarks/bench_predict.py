@@ -0,0 +1,91 @@
+"""
+Single-row inference benchmark for train.predict
+Checks FeatureEncoder parity against engineer_features over the whole
+training set, then reports per-request p50/p99 latency for the pandas
+feature path and the compiled encoder path
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from features import FeatureEncoder
+from train import engineer_features, get_feature_columns, load_model, predict
+
+DEFAULT_DATA = os.path.join(BACKEND_DIR, '..', '..', 'dataset', 'train.csv')
+DEFAULT_MODEL_DIR = os.path.join(BACKEND_DIR, 'models')
+
+
+def check_parity(df: pd.DataFrame, feature_cols: list) -> int:
+    """Compare the encoder against engineer_features row by row, return mismatches"""
+    expected = engineer_features(df)[feature_cols].values
+    encoder = FeatureEncoder(feature_cols)
+    records = df.to_dict('records')
+    mismatches = 0
+    for i, record in enumerate(records):
+        row = encoder.encode(record)
+        if row.dtype != expected.dtype or not np.array_equal(row, expected[i]):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  row {i}: expected {expected[i].tolist()}, got {row.tolist()}")
+    return mismatches
+
+
+def legacy_features(model_artifacts: dict, input_data: dict) -> np.ndarray:
+    """The DataFrame feature path predict used before the encoder"""
+    df_features = engineer_features(pd.DataFrame([input_data]))
+    return df_features[model_artifacts['feature_cols']].values
+
+
+def time_calls(fn, inputs: list, repeat: int) -> np.ndarray:
+    """Call fn once per input, repeat times, and return per-call latencies in ms"""
+    latencies = []
+    for _ in range(repeat):
+        for input_data in inputs:
+            start = time.perf_counter()
+            fn(input_data)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def report(name: str, latencies: np.ndarray):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{name:<28} p50={p50:8.4f} ms  p99={p99:8.4f} ms  n={len(latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR)
+    parser.add_argument('--requests', type=int, default=200, help='Distinct inputs to time')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    feature_cols = get_feature_columns()
+
+    print(f"Checking encoder parity on {len(df)} rows...")
+    mismatches = check_parity(df, feature_cols)
+    if mismatches:
+        print(f"FAILED: {mismatches} rows differ from engineer_features")
+        sys.exit(1)
+    print("OK: encoder matches engineer_features on every row\n")
+
+    model_artifacts = load_model(args.model_dir)
+    inputs = df.drop(columns=['ID', 'Class/ASD'], errors='ignore').to_dict('records')[:args.requests]
+    encoder = model_artifacts['encoder']
+
+    report('engineer_features (1 row)', time_calls(lambda x: legacy_features(model_artifacts, x), inputs, args.repeat))
+    report('FeatureEncoder.encode', time_calls(encoder.encode, inputs, args.repeat))
+    report('train.predict', time_calls(lambda x: predict(model_artifacts, x), inputs, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Pooled provider client vs a new client per request
+Starts the stub provider (optionally failing a share of requests with 503)
+and sends concurrent requests through ProviderClient and through a fresh
+httpx.AsyncClient per call, reporting latency, TCP connections opened and
+retries. Exits non-zero if any pooled request ends in an error
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+from provider_client import ProviderClient
+
+PATH = "/models/stub:generateContent"
+PAYLOAD = {"contents": [{"parts": [{"text": "ping"}]}]}
+
+
+async def run_requests(send, total: int, concurrency: int) -> tuple:
+    """Issue total requests with at most concurrency in flight, return (latencies ms, statuses)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            status = await send()
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses.append(status)
+
+    await asyncio.gather(*[one() for _ in range(total)])
+    return np.array(latencies), statuses
+
+
+def stub_stats(base: str) -> dict:
+    return httpx.get(f"{base}/stats").json()
+
+
+async def bench(args, base: str):
+    client = ProviderClient(base, max_connections=args.concurrency, max_keepalive=args.concurrency,
+                            backoff_base=0.05, max_retries=args.max_retries)
+    client.start()
+
+    async def pooled():
+        return (await client.post(PATH, json=PAYLOAD)).status_code
+
+    async def per_request():
+        async with httpx.AsyncClient(base_url=base) as fresh:
+            return (await fresh.post(PATH, json=PAYLOAD)).status_code
+
+    results = {}
+    try:
+        for name, send in (("per-request client", per_request), ("pooled client", pooled)):
+            before = stub_stats(base)
+            start = time.perf_counter()
+            latencies, statuses = await run_requests(send, args.requests, args.concurrency)
+            elapsed = time.perf_counter() - start
+            after = stub_stats(base)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            errors = sum(status != 200 for status in statuses)
+            results[name] = errors
+            print(f"{name:<20} {args.requests / elapsed:8.1f} req/s  p50={p50:6.2f} ms  p99={p99:7.2f} ms  "
+                  f"connections={after['connections'] - before['connections']:4d}  "
+                  f"provider 503s={after['failed'] - before['failed']:3d}  errors={errors}")
+        print(f"pooled client stats: {client.stats()}")
+    finally:
+        await client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--max-retries", type=int, default=4)
+    parser.add_argument("--stub-port", type=int, default=8791)
+    args = parser.parse_args()
+
+    stub = subprocess.Popen(
+        [sys.executable, "stub_provider.py", "--port", str(args.stub_port), "--fail-rate", str(args.fail_rate)],
+        cwd=BENCH_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f"http://127.0.0.1:{args.stub_port}"
+        deadline = time.perf_counter() + 30
+        while True:
+            try:
+                stub_stats(base)
+                break
+            except httpx.TransportError:
+                if time.perf_counter() > deadline:
+                    raise
+                time.sleep(0.05)
+        results = asyncio.run(bench(args, base))
+    finally:
+        stub.terminate()
+        stub.wait()
+    sys.exit(1 if results.get("pooled client") else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Throughput, memory and crash recovery of the chunked scoring CLI
+Tiles train.csv into a large input, scores it with score.py at several
+worker counts (rows/s and peak RSS), then kills a run mid-way, resumes it and
+checks the output is identical to an uninterrupted run
+"""
+
+import argparse
+import filecmp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from bench_video_upload import read_status_kb
+
+DEFAULT_DATA = os.path.join(BACKEND_DIR, '..', '..', 'dataset', 'train.csv')
+
+
+def make_input(source: str, path: str, rows: int):
+    df = pd.read_csv(source).drop(columns=['Class/ASD'])
+    block = 100_000
+    for start in range(0, rows, block):
+        n = min(block, rows - start)
+        chunk = df.iloc[np.arange(start, start + n) % len(df)].assign(ID=np.arange(start + 1, start + n + 1))
+        chunk.to_csv(path, mode='a' if start else 'w', header=not start, index=False)
+
+
+def run_score(args: list) -> tuple:
+    """Run score.py; return (seconds, peak RSS of the main process in MB, stdout)"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'score.py', *args, '--quiet'], cwd=BACKEND_DIR,
+                               stdout=subprocess.PIPE, text=True)
+    peak_kb = 0
+    while process.poll() is None:
+        try:
+            peak_kb = max(peak_kb, read_status_kb(process.pid, 'VmHWM'))
+        except (OSError, KeyError, ValueError):
+            pass  # exited between poll() and the read
+        time.sleep(0.05)
+    seconds = time.perf_counter() - start
+    stdout = process.stdout.read()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, 'score.py')
+    return seconds, peak_kb / 1024, stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=50_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'input.csv')
+        make_input(args.data, input_path, args.rows)
+        print(f"input: {args.rows:,} rows, {os.path.getsize(input_path) / 1e6:.0f} MB, "
+              f"chunk size {args.chunk_size:,}, {os.cpu_count()} cores")
+
+        reference = os.path.join(tmp, 'reference.csv')
+        for workers in args.workers:
+            output = reference if workers == args.workers[0] else os.path.join(tmp, f'scores-{workers}.csv')
+            seconds, rss, _ = run_score([input_path, '-o', output, '--chunk-size', str(args.chunk_size),
+                                         '--workers', str(workers)])
+            same = output == reference or filecmp.cmp(output, reference, shallow=False)
+            print(f"workers={workers}  {seconds:6.1f}s  {args.rows / seconds:9,.0f} rows/s (incl. start-up)  "
+                  f"peak RSS {rss:6.0f} MB (main process)  output identical: {same}")
+
+        # Kill a run once a few chunks are checkpointed, then resume it
+        resumed = os.path.join(tmp, 'resumed.csv')
+        command = [sys.executable, 'score.py', input_path, '-o', resumed, '--chunk-size', str(args.chunk_size),
+                   '--quiet']
+        process = subprocess.Popen(command, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL)
+        progress_path = resumed + '.progress.json'
+        while process.poll() is None and not (
+                os.path.exists(progress_path) and os.path.getsize(resumed) > 5 * args.chunk_size * 20):
+            time.sleep(0.05)
+        process.kill()
+        process.wait()
+        killed_at = os.path.getsize(resumed)
+        _, _, stdout = run_score([input_path, '-o', resumed, '--chunk-size', str(args.chunk_size)])
+        print(f"killed with {killed_at / 1e6:.1f} MB written; {stdout.splitlines()[1].strip()}")
+        print(f"resumed output identical to uninterrupted run: {filecmp.cmp(resumed, reference, shallow=False)}")
+
+
+if __name__ == '__main__':
+    main()
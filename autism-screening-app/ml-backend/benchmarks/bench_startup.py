@@ -0,0 +1,86 @@
+"""
+Cold-start benchmark for the API
+Times importing the serving API against importing the training module in
+fresh interpreters, then starts uvicorn and measures time to live
+(/health) and time to ready (/health/ready)
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('pandas', 'sklearn', 'scipy', 'lightgbm')
+
+
+def time_import(module: str) -> tuple:
+    """Import module in a fresh interpreter, return (seconds, heavy modules it pulled in)"""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(elapsed, ','.join(heavy))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]
+    elapsed, heavy = output.split(' ', 1) if ' ' in output else (output, '')
+    return float(elapsed), heavy
+
+
+def wait_for(url: str, deadline: float) -> float:
+    """Poll url until it returns 200, return the time it happened"""
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not become available")
+
+
+def time_server_start(port: int, timeout: float) -> tuple:
+    """Start uvicorn, return (seconds to live, seconds to ready)"""
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        live = wait_for(f"{base}/health", start + timeout)
+        ready = wait_for(f"{base}/health/ready", start + timeout)
+        return live - start, ready - start
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    args = parser.parse_args()
+
+    for module in ('api', 'train'):
+        runs = [time_import(module) for _ in range(args.repeat)]
+        median = statistics.median(elapsed for elapsed, _ in runs)
+        print(f"import {module:<6} median={median * 1000:8.1f} ms  heavy modules: {runs[-1][1] or 'none'}")
+
+    starts = [time_server_start(args.port, args.timeout) for _ in range(args.repeat)]
+    print(f"uvicorn time to live   median={statistics.median(s[0] for s in starts) * 1000:8.1f} ms")
+    print(f"uvicorn time to ready  median={statistics.median(s[1] for s in starts) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Compiled tree evaluator vs LightGBM
+Checks tree_engine against model.pkl predict_proba bit for bit (training rows,
+perturbed and out-of-range rows, NaNs, and values on either side of every
+folded threshold), then times single-row and 10k-row scoring for each engine
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from serving import load_serving_model, score_rows
+from train import engineer_features, get_feature_columns, load_model
+from tree_engine import CompiledTrees
+
+DEFAULT_DATA = os.path.join(BACKEND_DIR, '..', '..', 'dataset', 'train.csv')
+DEFAULT_MODEL_DIR = os.path.join(BACKEND_DIR, 'models')
+
+
+def parity_rows(X: np.ndarray, trees: CompiledTrees, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    noisy = X + rng.normal(0, 0.5, X.shape) * (rng.random(X.shape) < 0.3)
+    wide = rng.normal(X.mean(axis=0), 4 * X.std(axis=0) + 1, (20000, X.shape[1]))
+    with_nan = X.copy()
+    with_nan[rng.random(X.shape) < 0.1] = np.nan
+    # Each split's folded threshold and the doubles just below and above it, one feature at a time
+    split = np.isfinite(trees.threshold)
+    boundary = []
+    for feature, threshold in zip(trees.feature[split], trees.threshold[split]):
+        for value in (np.nextafter(threshold, -np.inf), threshold, np.nextafter(threshold, np.inf)):
+            row = X[rng.integers(len(X))].copy()
+            row[feature] = value
+            boundary.append(row)
+    return {'training': X, 'perturbed': noisy, 'wide': wide, 'nan': with_nan, 'thresholds': np.array(boundary)}
+
+
+def median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR)
+    parser.add_argument('--batch', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    X = engineer_features(pd.read_csv(args.data))[get_feature_columns()].values.astype(np.float64)
+    reference = load_model(args.model_dir)
+    lightgbm = load_serving_model(args.model_dir)
+    compiled = load_serving_model(args.model_dir, engine='compiled')
+    trees = compiled['model'].trees
+    tables = trees.tables
+    print(f"{trees.n_trees} trees, depth {trees.max_depth}, {len(trees.feature)} nodes, "
+          f"{len(tables[1]) if tables else 0} split conditions, {len(tables[4]) if tables else 0} leaf-table entries")
+
+    failed = False
+    for name, rows in parity_rows(X, trees).items():
+        expected = reference['model'].predict_proba(reference['scaler'].transform(rows))
+        got = compiled['model'].predict_proba(compiled['scaler'].transform(rows))
+        walked = trees.traverse(rows)
+        mismatches = int((got != expected).any(axis=1).sum())
+        walk_mismatches = int((walked != trees.leaf_values(rows)).any(axis=1).sum())
+        failed |= bool(mismatches or walk_mismatches)
+        print(f"  {name:<11} {len(rows):6d} rows: {mismatches} predict_proba mismatches, "
+              f"{walk_mismatches} table/traversal mismatches")
+    if failed:
+        print("FAILED: compiled trees differ from LightGBM")
+        sys.exit(1)
+    print("OK: bit-for-bit equal to model.pkl predict_proba\n")
+
+    batch = X[np.arange(args.batch) % len(X)]
+    single = [batch[i:i + 1] for i in range(200)]
+    engines = [
+        ('model.pkl predict_proba', lambda rows: reference['model'].predict_proba(reference['scaler'].transform(rows))),
+        ('serving, LightGBM', lambda rows: score_rows(lightgbm, rows)),
+        ('serving, compiled', lambda rows: score_rows(compiled, rows)),
+        ('compiled, traversal only', lambda rows: trees.traverse(rows)),
+    ]
+    for name, fn in engines:
+        one = np.median([median_ms(lambda: fn(row), 5) for row in single])
+        many = median_ms(lambda: fn(batch), args.repeat)
+        print(f"{name:<26} 1 row {one * 1000:7.1f} us | {args.batch} rows {many:7.1f} ms "
+              f"({args.batch / many * 1000:10,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+/analyze-video result cache check
+Starts a slow stub provider and the API with a fresh cache directory, sends
+concurrent identical uploads (expect one provider call), repeats the upload
+(expect a cache hit) and sends a different clip (expect a miss), reporting
+latencies and the cache counters
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_video_upload import BACKEND_DIR, BENCH_DIR, wait_for
+
+
+async def upload_many(base: str, video: bytes, count: int) -> list:
+    """POST the same clip count times concurrently, return (status, seconds) per request"""
+    async with httpx.AsyncClient(base_url=base, timeout=120.0) as client:
+        async def one():
+            start = time.perf_counter()
+            response = await client.post(
+                "/analyze-video", files={"file": ("clip.mp4", video, "video/mp4")}
+            )
+            return response.status_code, time.perf_counter() - start
+        return await asyncio.gather(*[one() for _ in range(count)])
+
+
+def provider_requests(stub_base: str) -> int:
+    return httpx.get(f"{stub_base}/stats").json()["requests"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--provider-delay", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--stub-port", type=int, default=8792)
+    args = parser.parse_args()
+
+    stub_base = f"http://127.0.0.1:{args.stub_port}"
+    base = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(
+            os.environ, AIPIPE_API_KEY="test", AI_PROVIDER_BASE_URL=stub_base,
+            VIDEO_CACHE="1", VIDEO_CACHE_DIR=cache_dir
+        )
+        stub = subprocess.Popen(
+            [sys.executable, "stub_provider.py", "--port", str(args.stub_port),
+             "--delay", str(args.provider_delay)],
+            cwd=BENCH_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for(f"{stub_base}/stats", 30)
+            wait_for(f"{base}/health", 60)
+            clip = os.urandom(args.size_mb << 20)
+            other = os.urandom(args.size_mb << 20)
+
+            checks = []
+            for name, video, count, expected_calls in (
+                (f"{args.concurrency} concurrent identical", clip, args.concurrency, 1),
+                ("repeat upload", clip, 1, 0),
+                ("different clip", other, 1, 1),
+            ):
+                before = provider_requests(stub_base)
+                results = asyncio.run(upload_many(base, video, count))
+                calls = provider_requests(stub_base) - before
+                slowest = max(seconds for _, seconds in results)
+                statuses = sorted({status for status, _ in results})
+                print(f"{name:<26} statuses={statuses}  slowest={slowest * 1000:8.1f} ms  "
+                      f"provider calls={calls} (expected {expected_calls})")
+                checks.append(calls == expected_calls and statuses == [200])
+
+            print(f"cache stats: {httpx.get(f'{base}/inference-stats').json()['video_cache']}")
+        finally:
+            server.terminate()
+            stub.terminate()
+            server.wait()
+            stub.wait()
+
+    print("PASS" if all(checks) else "FAIL")
+    sys.exit(0 if all(checks) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Burst of /analyze-video/jobs uploads against a slow provider
+Submits a burst of distinct clips, follows one job over SSE, restarts the
+API while jobs are still queued and checks that every job finishes, that
+submits return immediately and that provider concurrency never exceeds
+VIDEO_JOB_WORKERS
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_video_upload import BACKEND_DIR, BENCH_DIR, wait_for
+
+
+def start_api(port: int, env: dict) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    wait_for(f"http://127.0.0.1:{port}/health", 60)
+    return server
+
+
+def read_sse(client: httpx.Client, path: str) -> list:
+    """Stages seen on a job's event stream until it closes"""
+    stages = []
+    with client.stream("GET", path) as response:
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                stages.append(line[len("event: "):])
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--size-mb", type=int, default=2)
+    parser.add_argument("--provider-delay", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--stub-port", type=int, default=8793)
+    args = parser.parse_args()
+
+    stub_base = f"http://127.0.0.1:{args.stub_port}"
+    base = f"http://127.0.0.1:{args.port}"
+    stub = subprocess.Popen(
+        [sys.executable, "stub_provider.py", "--port", str(args.stub_port),
+         "--delay", str(args.provider_delay)],
+        cwd=BENCH_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ, AIPIPE_API_KEY="test", AI_PROVIDER_BASE_URL=stub_base, VIDEO_CACHE="0",
+            VIDEO_JOBS_DIR=os.path.join(tmp, "jobs"), VIDEO_JOB_WORKERS=str(args.workers)
+        )
+        try:
+            wait_for(f"{stub_base}/stats", 30)
+            server = start_api(args.port, env)
+            client = httpx.Client(base_url=base, timeout=120.0)
+
+            submit_times, job_ids = [], []
+            for _ in range(args.jobs):
+                start = time.perf_counter()
+                response = client.post(
+                    "/analyze-video/jobs",
+                    files={"file": ("clip.mp4", os.urandom(args.size_mb << 20), "video/mp4")}
+                )
+                submit_times.append(time.perf_counter() - start)
+                response.raise_for_status()
+                job_ids.append(response.json()["job_id"])
+            print(f"submitted {args.jobs} jobs, slowest submit {max(submit_times) * 1000:.1f} ms")
+
+            stages = read_sse(client, f"/jobs/{job_ids[0]}/events")
+            print(f"SSE stages for first job: {stages}")
+
+            # Restart while later jobs are still queued; they must resume from SQLite
+            client.close()
+            server.terminate()
+            server.wait()
+            server = start_api(args.port, env)
+            client = httpx.Client(base_url=base, timeout=120.0)
+
+            deadline = time.perf_counter() + args.jobs * args.provider_delay * 4 + 60
+            while time.perf_counter() < deadline:
+                jobs = [client.get(f"/jobs/{job_id}").json() for job_id in job_ids]
+                if all(job["status"] in ("done", "failed") for job in jobs):
+                    break
+                time.sleep(0.5)
+            statuses = {}
+            for job in jobs:
+                statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+            provider = httpx.get(f"{stub_base}/stats").json()
+            print(f"after restart: job statuses {statuses}")
+            print(f"provider max concurrent calls {provider['max_inflight']} (workers {args.workers})")
+            print(f"queue stats: {client.get('/inference-stats').json()['video_jobs']}")
+            client.close()
+
+            ok = (statuses.get("done") == args.jobs and provider["max_inflight"] <= args.workers
+                  and stages[-1] == "done")
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+            stub.terminate()
+            stub.wait()
+
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Raw vs preprocessed /analyze-video uploads on synthetic videos
+Generates test recordings with ffmpeg (moving test pattern plus a tone),
+then sends each through one API with VIDEO_PREPROCESS=0 and one with
+VIDEO_PREPROCESS=1 against a bandwidth-limited stub provider, reporting
+provider request bytes and end-to-end latency
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_video_upload import BENCH_DIR, wait_for
+from video_preprocess import find_ffmpeg
+
+# (name, width, height, seconds, video bitrate); keyframe every second like phone cameras
+VIDEOS = [
+    ("720p-20s", 1280, 720, 20, "4M"),
+    ("1080p-45s", 1920, 1080, 45, "10M"),
+]
+
+
+def make_video(ffmpeg: str, path: str, width: int, height: int, seconds: int, bitrate: str):
+    subprocess.run([
+        ffmpeg, "-nostdin", "-v", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=30",
+        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=44100",
+        "-t", str(seconds), "-c:v", "libx264", "-preset", "ultrafast", "-g", "30",
+        "-b:v", bitrate, "-maxrate", bitrate, "-bufsize", bitrate,
+        "-c:a", "aac", "-b:a", "128k", "-shortest", path,
+    ], check=True)
+
+
+def analyze(base: str, path: str) -> tuple:
+    """Upload one video, return (seconds, response json)"""
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        response = httpx.post(f"{base}/analyze-video", files={"file": ("clip.mp4", f, "video/mp4")},
+                              timeout=600.0)
+    response.raise_for_status()
+    return time.perf_counter() - start, response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bandwidth-mbps", type=float, default=50.0,
+                        help="Simulated uplink to the provider")
+    parser.add_argument("--fps", type=float, default=1.0)
+    parser.add_argument("--keyframes", choices=("0", "1"), default="1")
+    parser.add_argument("--port", type=int, default=8769)
+    parser.add_argument("--stub-port", type=int, default=8794)
+    args = parser.parse_args()
+
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        print("ffmpeg not found; install it or `pip install imageio-ffmpeg`")
+        sys.exit(1)
+
+    stub_base = f"http://127.0.0.1:{args.stub_port}"
+    stub = subprocess.Popen(
+        [sys.executable, "stub_provider.py", "--port", str(args.stub_port),
+         "--bandwidth-mbps", str(args.bandwidth_mbps)],
+        cwd=BENCH_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    servers = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode, port in (("raw", args.port), ("preprocessed", args.port + 1)):
+                env = dict(
+                    os.environ, AIPIPE_API_KEY="test", AI_PROVIDER_BASE_URL=stub_base, VIDEO_CACHE="0",
+                    VIDEO_JOBS_DIR=os.path.join(tmp, f"jobs-{mode}"),
+                    VIDEO_PREPROCESS="1" if mode == "preprocessed" else "0",
+                    VIDEO_PREPROCESS_FPS=str(args.fps), VIDEO_PREPROCESS_KEYFRAMES=args.keyframes,
+                )
+                servers[mode] = subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+                    cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            wait_for(f"{stub_base}/stats", 30)
+            for port in (args.port, args.port + 1):
+                wait_for(f"http://127.0.0.1:{port}/health", 60)
+
+            print(f"provider uplink {args.bandwidth_mbps:g} Mbps, sampling {args.fps:g} fps, "
+                  f"keyframes only: {args.keyframes == '1'}")
+            for name, width, height, seconds, bitrate in VIDEOS:
+                path = os.path.join(tmp, f"{name}.mp4")
+                make_video(ffmpeg, path, width, height, seconds, bitrate)
+
+                raw_seconds, _ = analyze(f"http://127.0.0.1:{args.port}", path)
+                raw_bytes = httpx.get(f"{stub_base}/stats").json()["last_body_bytes"]
+                pre_seconds, result = analyze(f"http://127.0.0.1:{args.port + 1}", path)
+                pre_bytes = httpx.get(f"{stub_base}/stats").json()["last_body_bytes"]
+                report = result.get("preprocessing") or {}
+
+                print(f"{name:<10} video {os.path.getsize(path) / 1e6:6.1f} MB | request "
+                      f"{raw_bytes / 1e6:6.1f} MB -> {pre_bytes / 1e6:5.2f} MB "
+                      f"({1 - pre_bytes / raw_bytes:.1%} smaller) | latency {raw_seconds:5.2f}s -> "
+                      f"{pre_seconds:5.2f}s | {report.get('frames')} frames, "
+                      f"preprocess {report.get('preprocess_ms')} ms")
+    finally:
+        for server in servers.values():
+            server.terminate()
+            server.wait()
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
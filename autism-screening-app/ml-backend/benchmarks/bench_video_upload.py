@@ -0,0 +1,132 @@
+"""
+Peak memory of /analyze-video for a large upload
+Starts the stub provider and the API, streams a generated video file to
+/analyze-video and reports the API process' peak RSS (VmHWM) before and
+after, so the streaming path can be checked to stay bounded
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def read_status_kb(pid: int, field: str) -> int:
+    """Read a memory field (VmRSS, VmHWM) from /proc/<pid>/status, in kB"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+
+def wait_for(url: str, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} did not become available")
+
+
+def make_video(path: str, size_mb: int):
+    """Write size_mb of random bytes (content does not matter to the stub)"""
+    block = os.urandom(1 << 20)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def file_chunks(path: str, chunk_size: int = 1 << 20):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def multipart_body(path: str, boundary: str):
+    """Stream a single-file multipart body without loading the file"""
+    yield (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="video.mp4"\r\n'
+        "Content-Type: video/mp4\r\n\r\n"
+    ).encode()
+    yield from file_chunks(path)
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--stub-port", type=int, default=8790)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64.0,
+                        help="Fail if peak RSS grows by more than this during the upload")
+    args = parser.parse_args()
+
+    env = dict(
+        os.environ,
+        AIPIPE_API_KEY="test",
+        AI_PROVIDER_BASE_URL=f"http://127.0.0.1:{args.stub_port}",
+        VIDEO_MAX_MB=str(args.size_mb + 16),
+    )
+    stub = subprocess.Popen(
+        [sys.executable, "stub_provider.py", "--port", str(args.stub_port)],
+        cwd=BENCH_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base = f"http://127.0.0.1:{args.port}"
+        wait_for(f"http://127.0.0.1:{args.stub_port}/stats", 30)
+        wait_for(f"{base}/health/ready", 60)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "video.mp4")
+            make_video(path, args.size_mb)
+
+            before = read_status_kb(server.pid, "VmHWM")
+            boundary = "benchvideoboundary"
+            start = time.perf_counter()
+            response = httpx.post(
+                f"{base}/analyze-video",
+                content=multipart_body(path, boundary),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                timeout=600.0,
+            )
+            elapsed = time.perf_counter() - start
+            after = read_status_kb(server.pid, "VmHWM")
+
+        provider = httpx.get(f"http://127.0.0.1:{args.stub_port}/stats").json()
+        growth_mb = (after - before) / 1024
+        print(f"upload      {args.size_mb} MB in {elapsed:.1f}s -> HTTP {response.status_code}")
+        print(f"response    {response.json()}")
+        print(f"provider    received {provider['last_body_bytes'] / 1e6:.1f} MB of request body")
+        print(f"peak RSS    before={before / 1024:.1f} MB  after={after / 1024:.1f} MB  growth={growth_mb:.1f} MB")
+
+        ok = response.status_code == 200 and growth_mb <= args.max_rss_growth_mb
+        print("PASS" if ok else f"FAIL (limit {args.max_rss_growth_mb} MB growth)")
+        sys.exit(0 if ok else 1)
+    finally:
+        server.terminate()
+        stub.terminate()
+        server.wait()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
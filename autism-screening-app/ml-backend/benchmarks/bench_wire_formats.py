@@ -0,0 +1,120 @@
+"""
+/batch-predict latency, time to first byte and server memory per wire format
+Starts the API and sends the same synthetic rows as a JSON array of rows, a
+JSON object of columns and an Arrow IPC stream, reading the results back as
+JSON, NDJSON and Arrow. Every case gets a fresh API process, and its peak RSS
+growth over the first request shows how much memory that format needs
+(later requests reuse memory the allocator kept)
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_video_upload import read_status_kb, wait_for
+from synthetic import SyntheticRows
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NDJSON = 'application/x-ndjson'
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+# (name, request body format, Accept)
+CASES = [
+    ('rows json -> json', 'rows', 'application/json'),
+    ('columns json -> json', 'columns', 'application/json'),
+    ('columns json -> ndjson', 'columns', NDJSON),
+    ('arrow -> arrow', 'arrow', ARROW_STREAM),
+    ('rows json -> ndjson', 'rows', NDJSON),
+]
+
+
+def arrow_body(rows: list) -> bytes:
+    import pyarrow as pa
+    import pyarrow.ipc
+
+    table = pa.Table.from_pylist(rows)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def build_bodies(rows: list) -> dict:
+    columns = {name: [row[name] for row in rows] for name in rows[0]}
+    bodies = {
+        'rows': (json.dumps(rows).encode(), 'application/json'),
+        'columns': (json.dumps(columns).encode(), 'application/json'),
+    }
+    try:
+        bodies['arrow'] = (arrow_body(rows), ARROW_STREAM)
+    except ImportError:
+        print("pyarrow not installed, skipping Arrow cases", file=sys.stderr)
+    return bodies
+
+
+def timed_request(client: httpx.Client, body: bytes, content_type: str, accept: str, params: dict) -> tuple:
+    """(total seconds, seconds to the first body byte, response bytes)"""
+    start = time.perf_counter()
+    first = None
+    size = 0
+    headers = {'content-type': content_type, 'accept': accept}
+    with client.stream('POST', '/batch-predict', content=body, headers=headers, params=params) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw():
+            if first is None:
+                first = time.perf_counter() - start
+            size += len(chunk)
+    return time.perf_counter() - start, first, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--return-details', action='store_true')
+    parser.add_argument('--explain', action='store_true')
+    parser.add_argument('--port', type=int, default=8768)
+    args = parser.parse_args()
+
+    rows = SyntheticRows.from_csv().requests(args.rows, seed=0)
+    bodies = build_bodies(rows)
+    params = {'return_details': str(args.return_details).lower(), 'explain': str(args.explain).lower()}
+
+    print(f"{args.rows:,} rows, {params}")
+    print(f"{'case':<24} {'body MB':>8} {'total ms':>9} {'first byte ms':>14} {'response MB':>12} {'server peak +MB':>16}")
+    for name, body_format, accept in CASES:
+        if body_format not in bodies:
+            continue
+        body, content_type = bodies[body_format]
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(args.port), '--log-level', 'warning'],
+            cwd=BACKEND_DIR, env=dict(os.environ, LOG_LEVEL='WARNING'),
+        )
+        try:
+            wait_for(f'http://127.0.0.1:{args.port}/health/ready', timeout=60)
+            with httpx.Client(base_url=f'http://127.0.0.1:{args.port}', timeout=600) as client:
+                before = read_status_kb(server.pid, 'VmRSS')
+                timed_request(client, body, content_type, accept, params)
+                growth = (read_status_kb(server.pid, 'VmHWM') - before) / 1024
+                totals, firsts = [], []
+                for _ in range(args.repeat):
+                    total, first, size = timed_request(client, body, content_type, accept, params)
+                    totals.append(total)
+                    firsts.append(first)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{name:<24} {len(body) / 1e6:>8.1f} {np.median(totals) * 1000:>9.0f} "
+              f"{np.median(firsts) * 1000:>14.0f} {size / 1e6:>12.1f} {growth:>16.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Per-worker memory and startup time as the API scales out
+Starts the API with `uvicorn api:app --workers N` (every worker imports the
+API and loads the model itself) and with serve.py (loaded once, then forked)
+for each worker count, and reports the time until every worker has its model,
+the RSS, PSS and private memory per worker, and the PSS of the whole process
+tree, at startup and again after some /predict and /batch-predict traffic
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import SyntheticRows
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def launch_command(launcher: str, workers: int, port: int) -> list:
+    if launcher == 'uvicorn':
+        return [sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(port),
+                '--workers', str(workers), '--log-level', 'warning']
+    return [sys.executable, 'serve.py', '--port', str(port), '--workers', str(workers), '--log-level', 'warning']
+
+
+def descendants(pid: int) -> list:
+    children = []
+    for task in os.listdir(f'/proc/{pid}/task'):
+        try:
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                children += [int(child) for child in f.read().split()]
+        except FileNotFoundError:
+            pass
+    return children + [grandchild for child in children for grandchild in descendants(child)]
+
+
+def smaps(pid: int) -> dict:
+    """Rss, Pss and private (Private_Clean + Private_Dirty) of a process in MB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0].endswith(':') and len(parts) == 3:
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return {'rss': values['Rss'], 'pss': values['Pss'],
+            'private': values['Private_Clean'] + values['Private_Dirty']}
+
+
+def worker_pids(launcher: str, parent: int) -> list:
+    """
+    The processes serving requests: serve.py's children, uvicorn's spawned
+    'multiprocessing.spawn' children, or uvicorn itself with one worker
+    """
+    pids = descendants(parent)
+    if launcher == 'uvicorn':
+        def cmdline(pid):
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                return f.read()
+        pids = [pid for pid in pids if b'spawn_main' in cmdline(pid)] or [parent]
+    return pids
+
+
+def memory(launcher: str, parent: int) -> dict:
+    workers = [smaps(pid) for pid in worker_pids(launcher, parent)]
+    tree = [smaps(pid) for pid in [parent] + descendants(parent)]
+    return {
+        'rss': sum(w['rss'] for w in workers) / len(workers),
+        'private': sum(w['private'] for w in workers) / len(workers),
+        'pss': sum(w['pss'] for w in workers) / len(workers),
+        'total_pss': sum(p['pss'] for p in tree),
+    }
+
+
+def send_traffic(port: int, rows: list, predicts: int, batches: int):
+    """New connection per request, so requests spread over the workers"""
+    limits = httpx.Limits(max_keepalive_connections=0)
+    with httpx.Client(base_url=f'http://127.0.0.1:{port}', timeout=120, limits=limits) as client:
+        for i in range(predicts):
+            client.post('/predict', json=rows[i % len(rows)]).raise_for_status()
+        for _ in range(batches):
+            client.post('/batch-predict', json=rows, params={'return_details': 'true'}).raise_for_status()
+
+
+def run_case(launcher: str, workers: int, port: int, rows: list, args) -> tuple:
+    log_path = os.path.join(tempfile.gettempdir(), f'bench_workers_{launcher}_{port}.log')
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(launch_command(launcher, workers, port), cwd=BACKEND_DIR,
+                                  stdout=log, stderr=subprocess.STDOUT, env=dict(os.environ, LOG_LEVEL='INFO'))
+    try:
+        # Ready when every worker has logged its model load
+        while True:
+            with open(log_path) as f:
+                loaded = f.read().count('Model loaded')
+            if loaded >= workers:
+                break
+            if server.poll() is not None or time.perf_counter() - start > args.timeout:
+                raise RuntimeError(f"{launcher} with {workers} workers did not start, see {log_path}")
+            time.sleep(0.02)
+        ready = time.perf_counter() - start
+        time.sleep(1.0)
+        at_start = memory(launcher, server.pid)
+        send_traffic(port, rows, args.predicts * workers, args.batches * workers)
+        after = memory(launcher, server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+        os.remove(log_path)
+    return ready, at_start, after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--predicts', type=int, default=200, help='/predict requests per worker')
+    parser.add_argument('--batches', type=int, default=2, help='/batch-predict requests per worker')
+    parser.add_argument('--batch-rows', type=int, default=2000)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--port', type=int, default=8769)
+    args = parser.parse_args()
+
+    rows = SyntheticRows.from_csv().requests(args.batch_rows, seed=0)
+    print(f"{'launcher':<8} {'workers':>7} {'ready s':>8}   {'per worker MB: RSS':>18} {'private':>8} {'PSS':>6}"
+          f" {'total PSS MB':>13}   {'after traffic: private':>22} {'total PSS':>10}")
+    for workers in args.workers:
+        for launcher in ('uvicorn', 'serve.py'):
+            ready, at_start, after = run_case(launcher, workers, args.port, rows, args)
+            print(f"{launcher:<8} {workers:>7} {ready:>8.2f}   {at_start['rss']:>18.0f} {at_start['private']:>8.0f} "
+                  f"{at_start['pss']:>6.0f} {at_start['total_pss']:>13.0f}   {after['private']:>22.0f} "
+                  f"{after['total_pss']:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
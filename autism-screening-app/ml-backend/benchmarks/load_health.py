@@ -0,0 +1,100 @@
+"""
+Health-check latency under concurrent batch load
+Probes /health on a running API server while idle and again while several
+clients hammer /batch-predict, so event-loop stalls show up as a jump in
+health latency
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA = os.path.join(BACKEND_DIR, '..', '..', 'dataset', 'train.csv')
+
+INPUT_COLUMNS = [
+    'A1_Score', 'A2_Score', 'A3_Score', 'A4_Score', 'A5_Score',
+    'A6_Score', 'A7_Score', 'A8_Score', 'A9_Score', 'A10_Score',
+    'age', 'gender', 'ethnicity', 'jaundice', 'austim', 'used_app_before', 'result'
+]
+
+
+def load_batch(path: str, size: int) -> list:
+    """Build a batch of request rows by sampling the training set"""
+    df = pd.read_csv(path)[INPUT_COLUMNS]
+    return df.sample(n=size, replace=True, random_state=0).to_dict('records')
+
+
+async def probe_health(client: httpx.AsyncClient, duration: float, interval: float) -> np.ndarray:
+    """Hit /health every interval seconds for duration seconds, return latencies in ms"""
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get('/health')
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return np.array(latencies)
+
+
+async def batch_worker(client: httpx.AsyncClient, batch: list, stop: asyncio.Event, counts: dict):
+    """Send /batch-predict requests back to back until stopped"""
+    while not stop.is_set():
+        response = await client.post('/batch-predict', json=batch)
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+
+def report(name: str, latencies: np.ndarray):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{name:<14} p50={p50:8.2f} ms  p99={p99:8.2f} ms  max={latencies.max():8.2f} ms  n={len(latencies)}")
+
+
+async def run(args):
+    batch = load_batch(args.data, args.batch_size)
+    timeout = httpx.Timeout(300.0)
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+        idle = await probe_health(client, args.duration, args.interval)
+
+        stop = asyncio.Event()
+        counts = {}
+        workers = [
+            asyncio.create_task(batch_worker(client, batch, stop, counts))
+            for _ in range(args.concurrency)
+        ]
+        loaded = await probe_health(client, args.duration, args.interval)
+        stop.set()
+        await asyncio.gather(*workers)
+
+    print(f"/health latency, {args.concurrency} concurrent /batch-predict clients x {args.batch_size} rows")
+    report('idle', idle)
+    report('under load', loaded)
+    print(f"batch responses by status: {dict(sorted(counts.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per phase')
+    parser.add_argument('--interval', type=float, default=0.05, help='Seconds between health probes')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except httpx.ConnectError:
+        print(f"Could not connect to {args.url}; start the API first (python api.py)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
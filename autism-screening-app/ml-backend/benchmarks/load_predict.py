@@ -0,0 +1,75 @@
+"""
+Concurrent /predict throughput and latency
+Run against a server started with and without PREDICT_BATCHING=1 to see
+what micro-batching buys at a given concurrency
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_health import DEFAULT_DATA, load_batch
+
+
+async def client_loop(client: httpx.AsyncClient, rows: list, deadline: float,
+                      latencies: list, counts: dict):
+    """Send /predict requests back to back until the deadline"""
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post('/predict', json=rows[i % len(rows)])
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+        i += 1
+
+
+async def run(args):
+    rows = load_batch(args.data, 1000)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    latencies = []
+    counts = {}
+    async with httpx.AsyncClient(base_url=args.url, timeout=60.0, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*[
+            client_loop(client, rows[i::args.concurrency], deadline, latencies, counts)
+            for i in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+        stats = (await client.get('/inference-stats')).json()
+
+    latencies = np.array(latencies)
+    p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+    print(f"{args.concurrency} concurrent clients for {elapsed:.1f}s")
+    print(f"throughput  {len(latencies) / elapsed:10.1f} req/s")
+    print(f"latency     p50={p50:.2f} ms  p99={p99:.2f} ms")
+    print(f"responses by status: {dict(sorted(counts.items()))}")
+    if stats.get('batcher'):
+        print(f"batcher: {stats['batcher']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except httpx.ConnectError:
+        print(f"Could not connect to {args.url}; start the API first (python api.py)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
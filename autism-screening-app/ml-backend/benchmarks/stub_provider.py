@@ -0,0 +1,84 @@
+"""
+Local stand-in for the Gemini generateContent endpoint
+Reads the streamed request body in chunks without keeping it, counts the
+bytes and connections and answers with a canned analysis, so
+/analyze-video can be exercised without network access or an API key.
+--fail-rate makes a fraction of requests answer 503 to exercise retries and
+--bandwidth-mbps throttles how fast request bodies are read
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+CANNED_TEXT = (
+    "Physical Score: 42\n"
+    "Physical Reason: Stub provider response.\n"
+    "Speech Score: 17\n"
+    "Speech Reason: Stub provider response."
+)
+
+stats = {"requests": 0, "failed": 0, "body_bytes": 0, "last_body_bytes": 0, "inflight": 0, "max_inflight": 0}
+client_addresses = set()
+config = {"fail_rate": 0.0, "delay": 0.0, "bandwidth_mbps": 0.0}
+
+
+async def app(scope, receive, send):
+    """Minimal ASGI app: POST anything, get the canned Gemini-shaped response"""
+    if scope["type"] != "http":
+        return
+
+    status = 200
+    if scope["path"] == "/stats":
+        body = json.dumps(dict(stats, connections=len(client_addresses))).encode()
+    else:
+        # Each distinct client (host, port) is one TCP connection
+        client_addresses.add(tuple(scope.get("client") or ()))
+        stats["inflight"] += 1
+        stats["max_inflight"] = max(stats["max_inflight"], stats["inflight"])
+        received = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunk_size = len(message.get("body", b""))
+            received += chunk_size
+            if config["bandwidth_mbps"]:
+                await asyncio.sleep(chunk_size * 8 / (config["bandwidth_mbps"] * 1e6))
+            more_body = message.get("more_body", False)
+        stats["requests"] += 1
+        stats["body_bytes"] += received
+        stats["last_body_bytes"] = received
+        stats["last_request_at"] = time.time()
+        if config["delay"]:
+            await asyncio.sleep(config["delay"])
+        if random.random() < config["fail_rate"]:
+            stats["failed"] += 1
+            status = 503
+            body = json.dumps({"error": "stub overloaded"}).encode()
+        else:
+            body = json.dumps({
+                "candidates": [{"content": {"parts": [{"text": CANNED_TEXT}]}}]
+            }).encode()
+        stats["inflight"] -= 1
+
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0.0, help="Simulated upload bandwidth (0 = unlimited)")
+    args = parser.parse_args()
+    config.update(fail_rate=args.fail_rate, delay=args.delay, bandwidth_mbps=args.bandwidth_mbps)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
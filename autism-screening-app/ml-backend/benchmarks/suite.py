@@ -0,0 +1,339 @@
+"""
+Benchmark suite for the ML backend
+Times engineer_features, train.predict, load_model cold start and the
+/predict, /batch-predict and /analyze-video endpoints (the last against the
+local stub provider) on synthetic rows from synthetic.py. Writes p50/p95/p99
+latency, throughput and peak RSS per case to JSON, and with --compare flags
+the cases that regressed against a stored baseline
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_video_upload import read_status_kb, wait_for
+from synthetic import DEFAULT_DATA, SyntheticRows
+
+DEFAULT_MODEL_DIR = os.path.join(BACKEND_DIR, 'models')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results.json')
+RESULTS_VERSION = 1
+
+# Metrics checked by --compare, and whether a higher value is worse
+COMPARED_METRICS = {'p50_ms': True, 'p95_ms': True, 'throughput_per_s': False, 'peak_rss_mb': True}
+
+# (rows per call, timed calls)
+FEATURE_SIZES = ((1, 200), (1_000, 50), (100_000, 5))
+BATCH_SIZES = ((1, 200), (10, 200), (100, 100), (1_000, 20), (10_000, 5))
+HTTP_CASES = ['/predict', *(f'/batch-predict[{size}]' for size, _ in BATCH_SIZES), '/analyze-video']
+
+# Fresh-interpreter cold start: imports plus loading the artifacts, then the process' peak RSS
+COLD_START_CODE = """\
+import time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+status = open('/proc/self/status').read()
+print(elapsed, status.split('VmHWM:')[1].split()[0])
+"""
+
+
+class Case:
+    """One benchmark: run(i) is timed `calls` times, each processing `items` rows/requests"""
+
+    def __init__(self, name: str, run, calls: int, items: int = 1, unit: str = 'rows', warmup: int = 3):
+        self.name = name
+        self.run = run
+        self.calls = calls
+        self.items = items
+        self.unit = unit
+        self.warmup = warmup
+
+
+def reset_peak_rss(pid: int) -> bool:
+    """Reset VmHWM to the current RSS (Linux clear_refs); False if not permitted"""
+    try:
+        with open(f'/proc/{pid}/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def summarize(latencies_ms: list, total_s: float, items: int, unit: str, peak_rss_kb: float) -> dict:
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        'calls': len(latencies_ms),
+        'items_per_call': items,
+        'unit': unit,
+        'p50_ms': round(float(p50), 4),
+        'p95_ms': round(float(p95), 4),
+        'p99_ms': round(float(p99), 4),
+        'mean_ms': round(float(np.mean(latencies_ms)), 4),
+        'throughput_per_s': round(len(latencies_ms) * items / total_s, 2),
+        'peak_rss_mb': round(peak_rss_kb / 1024, 1),
+    }
+
+
+def measure(case: Case, calls: int, pid: int) -> dict:
+    """Warm up, reset the measured process' peak RSS, then time every call"""
+    for i in range(case.warmup):
+        case.run(i)
+    rss_reset = reset_peak_rss(pid)
+    latencies = []
+    start = time.perf_counter()
+    for i in range(calls):
+        call_start = time.perf_counter()
+        case.run(i)
+        latencies.append((time.perf_counter() - call_start) * 1000)
+    total = time.perf_counter() - start
+    result = summarize(latencies, total, case.items, case.unit, read_status_kb(pid, 'VmHWM'))
+    result['rss_reset'] = rss_reset
+    return result
+
+
+def measure_cold_start(statement: str, calls: int) -> dict:
+    """Run statement in fresh interpreters; latency is in-process time, RSS the largest child peak"""
+    latencies, peaks = [], []
+    for _ in range(calls):
+        output = subprocess.run(
+            [sys.executable, '-c', COLD_START_CODE.format(statement=statement)],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        elapsed, peak_kb = output.split()
+        latencies.append(float(elapsed) * 1000)
+        peaks.append(int(peak_kb))
+    total = sum(latencies) / 1000
+    return summarize(latencies, total, 1, 'loads', max(peaks))
+
+
+def local_cases(rows: SyntheticRows, model_dir: str, seed: int) -> list:
+    """In-process cases: feature engineering and single-row predict"""
+    from train import engineer_features, load_model, predict
+
+    cases = []
+    for size, calls in FEATURE_SIZES:
+        frame = rows.sample(size, seed).drop(columns=['Class/ASD'])
+        cases.append(Case(f'engineer_features[{size}]', lambda i, frame=frame: engineer_features(frame),
+                          calls, items=size, warmup=1))
+
+    model_artifacts = load_model(model_dir)
+    inputs = rows.requests(1_000, seed)
+    cases.append(Case('train.predict', lambda i: predict(model_artifacts, inputs[i % len(inputs)]), 500))
+    return cases
+
+
+def http_cases(rows: SyntheticRows, client: httpx.Client, video_path: str, seed: int) -> list:
+    """Cases against the running API server"""
+    inputs = rows.requests(1_000, seed)
+
+    def post(path: str, **kwargs):
+        response = client.post(path, **kwargs)
+        response.raise_for_status()
+        return response
+
+    cases = [Case('/predict', lambda i: post('/predict', json=inputs[i % len(inputs)]), 500, unit='requests')]
+    for size, calls in BATCH_SIZES:
+        batch = rows.requests(size, seed + size)
+        cases.append(Case(f'/batch-predict[{size}]', lambda i, batch=batch: post('/batch-predict', json=batch),
+                          calls, items=size, warmup=1))
+
+    with open(video_path, 'rb') as f:
+        video = f.read()
+    cases.append(Case(
+        '/analyze-video', lambda i: post('/analyze-video', files={'file': ('video.mp4', video, 'video/mp4')}),
+        20, unit='requests', warmup=1
+    ))
+    return cases
+
+
+def cold_start_statements(model_dir: str) -> dict:
+    return {
+        'load_model (cold start)': f"from train import load_model\nload_model({model_dir!r})",
+        'load_serving_model (cold start)': f"from serving import load_serving_model\nload_serving_model({model_dir!r})",
+    }
+
+
+class ApiServer:
+    """uvicorn running api:app, with the stub provider standing in for Gemini"""
+
+    def __init__(self, port: int, stub_port: int, extra_env: dict = None):
+        self.port = port
+        self.stub_port = stub_port
+        self.env = dict(
+            os.environ,
+            AIPIPE_API_KEY='test',
+            AI_PROVIDER_BASE_URL=f'http://127.0.0.1:{stub_port}',
+            # Every /analyze-video call should reach the provider, not the result cache
+            VIDEO_CACHE='0',
+            **(extra_env or {}),
+        )
+        self.stub = self.server = None
+
+    def __enter__(self) -> 'ApiServer':
+        self.stub = subprocess.Popen(
+            [sys.executable, 'stub_provider.py', '--port', str(self.stub_port)],
+            cwd=BENCH_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self.server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(self.port), '--log-level', 'warning'],
+            cwd=BACKEND_DIR, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_for(f'http://127.0.0.1:{self.stub_port}/stats', 30)
+            wait_for(f'http://127.0.0.1:{self.port}/health/ready', 120)
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        for process in (self.server, self.stub):
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    @property
+    def pid(self) -> int:
+        return self.server.pid
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_suite(args) -> dict:
+    rows = SyntheticRows.from_csv(args.data)
+    # Exact names first: '/batch-predict[10]' is also a glob with a character class
+    selected = lambda name: not args.cases or name in args.cases or any(fnmatch.fnmatch(name, p) for p in args.cases)
+    scale = (lambda calls: max(3, calls // 5)) if args.quick else (lambda calls: calls)
+    server_env = dict(item.split('=', 1) for item in args.server_env)
+    results = {}
+
+    def record(name: str, result: dict):
+        results[name] = result
+        print(f"{name:<34} p50={result['p50_ms']:9.3f} ms  p95={result['p95_ms']:9.3f} ms  "
+              f"p99={result['p99_ms']:9.3f} ms  {result['throughput_per_s']:11,.1f} {result['unit']}/s  "
+              f"peak RSS {result['peak_rss_mb']:6.1f} MB")
+
+    for case in local_cases(rows, args.model_dir, args.seed):
+        if selected(case.name):
+            record(case.name, measure(case, scale(case.calls), os.getpid()))
+
+    for name, statement in cold_start_statements(args.model_dir).items():
+        if selected(name):
+            record(name, measure_cold_start(statement, scale(5)))
+
+    if any(selected(name) for name in HTTP_CASES):
+        with tempfile.TemporaryDirectory() as tmp, ApiServer(args.port, args.stub_port, server_env) as server, \
+                httpx.Client(base_url=f'http://127.0.0.1:{args.port}', timeout=120.0) as client:
+            video_path = os.path.join(tmp, 'video.mp4')
+            with open(video_path, 'wb') as f:
+                f.write(np.random.default_rng(args.seed).bytes(args.video_kb * 1024))
+            for case in http_cases(rows, client, video_path, args.seed):
+                if selected(case.name):
+                    record(case.name, measure(case, scale(case.calls), server.pid))
+
+    return {
+        'version': RESULTS_VERSION,
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': args.quick,
+            'seed': args.seed,
+            'server_env': server_env,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_ms: float, min_delta_mb: float) -> list:
+    """Print a per-case comparison; return (case, metric, baseline, current) for each regression"""
+    floors = {'p50_ms': min_delta_ms, 'p95_ms': min_delta_ms, 'peak_rss_mb': min_delta_mb, 'throughput_per_s': 0.0}
+    regressions = []
+    base_results, current_results = baseline['results'], current['results']
+    print(f"\nvs baseline {baseline['meta'].get('git_commit')} ({baseline['meta'].get('created')}), "
+          f"threshold {threshold:.0%}")
+    for name in sorted(set(base_results) | set(current_results)):
+        if name not in current_results or name not in base_results:
+            print(f"  {name:<34} only in {'baseline' if name in base_results else 'current run'}")
+            continue
+        changes = []
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            before, after = base_results[name][metric], current_results[name][metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = change if higher_is_worse else -change
+            if worse > threshold and abs(after - before) > floors[metric]:
+                regressions.append((name, metric, before, after))
+                changes.append(f"{metric} {before:g} -> {after:g} ({change:+.0%}) REGRESSION")
+            elif worse < -threshold and abs(after - before) > floors[metric]:
+                changes.append(f"{metric} {change:+.0%} improved")
+        print(f"  {name:<34} {'; '.join(changes) or 'ok'}")
+    print(f"{len(regressions)} regression(s)" if regressions else "No regressions")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--data', default=DEFAULT_DATA, help='CSV the synthetic rows are modelled on')
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR)
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help='Where to write the results JSON')
+    parser.add_argument('--compare', metavar='BASELINE', help='Results JSON to check for regressions against')
+    parser.add_argument('--results', metavar='RESULTS', help='Compare this results JSON instead of running')
+    parser.add_argument('--cases', nargs='+', help="Only run cases matching these patterns (e.g. '/batch-predict*')")
+    parser.add_argument('--quick', action='store_true', help='A fifth of the calls per case')
+    parser.add_argument('--threshold', type=float, default=0.15, help='Relative change counted as a regression')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help='Ignore latency changes smaller than this')
+    parser.add_argument('--min-delta-mb', type=float, default=8.0, help='Ignore peak RSS changes smaller than this')
+    parser.add_argument('--server-env', nargs='+', default=[], metavar='KEY=VALUE',
+                        help='Extra environment for the API server (e.g. INFERENCE_ENGINE=compiled)')
+    parser.add_argument('--video-kb', type=int, default=512, help='Size of the /analyze-video upload')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--stub-port', type=int, default=8791)
+    args = parser.parse_args()
+
+    if args.results:
+        if not args.compare:
+            parser.error('--results needs --compare')
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, current, args.threshold, args.min_delta_ms, args.min_delta_mb):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Synthetic screening rows drawn from the training set's distributions
+Samples the class from its prior, then every column from its distribution
+within that class: categorical and 0/1 columns from their frequencies,
+continuous columns (age, result) by resampling observed values with a little
+Gaussian jitter clipped to the observed range, so benchmarks can use any
+number of realistic but previously unseen rows
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA = os.path.join(BACKEND_DIR, '..', '..', 'dataset', 'train.csv')
+
+TARGET = 'Class/ASD'
+# Jitter added to resampled continuous values, as a fraction of the column's standard deviation
+JITTER = 0.1
+
+# Columns the API's ScreeningInput accepts
+REQUEST_COLUMNS = [
+    'A1_Score', 'A2_Score', 'A3_Score', 'A4_Score', 'A5_Score',
+    'A6_Score', 'A7_Score', 'A8_Score', 'A9_Score', 'A10_Score',
+    'age', 'gender', 'ethnicity', 'jaundice', 'austim', 'used_app_before', 'result'
+]
+
+
+class SyntheticRows:
+    """Class-conditional per-column sampler fitted on a training CSV"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.columns = [c for c in df.columns if c not in ('ID', TARGET)]
+        self.continuous = [c for c in self.columns if pd.api.types.is_float_dtype(df[c])]
+        self.prior = df[TARGET].value_counts(normalize=True).sort_index()
+        self.by_class = {label: group for label, group in df.groupby(TARGET)}
+        self.low = df[self.continuous].min()
+        self.high = df[self.continuous].max()
+        self.jitter = df[self.continuous].std() * JITTER
+
+    @classmethod
+    def from_csv(cls, path: str = DEFAULT_DATA) -> 'SyntheticRows':
+        return cls(pd.read_csv(path))
+
+    def sample(self, n: int, seed: int = 0) -> pd.DataFrame:
+        """n rows with an ID and every training column (Class/ASD included)"""
+        rng = np.random.default_rng(seed)
+        labels = rng.choice(self.prior.index.to_numpy(), size=n, p=self.prior.to_numpy())
+        parts = []
+        for label, group in self.by_class.items():
+            count = int((labels == label).sum())
+            if not count:
+                continue
+            # Columns are drawn independently, so rows are new combinations rather than copies
+            part = pd.DataFrame({
+                column: group[column].to_numpy()[rng.integers(len(group), size=count)]
+                for column in self.columns
+            })
+            for column in self.continuous:
+                noisy = part[column] + rng.normal(0.0, self.jitter[column], count)
+                part[column] = noisy.clip(self.low[column], self.high[column])
+            part[TARGET] = label
+            parts.append(part)
+        df = pd.concat(parts, ignore_index=True)
+        df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+        df.insert(0, 'ID', np.arange(1, n + 1))
+        return df
+
+    def requests(self, n: int, seed: int = 0) -> list:
+        """n /predict request bodies"""
+        return self.sample(n, seed)[REQUEST_COLUMNS].to_dict('records')
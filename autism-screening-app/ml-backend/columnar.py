@@ -0,0 +1,256 @@
+"""
+Column-oriented /batch-predict payloads and streamed result formats
+A batch can arrive as a JSON object of arrays or an Arrow IPC stream instead
+of an array of row objects. Its columns are validated as whole numpy arrays
+with the same rules (and, for rejected rows, the same error messages) as the
+pydantic model, and results can be written back as NDJSON lines or Arrow
+record batches chunk by chunk. pyarrow is only imported for Arrow payloads
+"""
+
+import json
+import operator
+from typing import Annotated
+
+import annotated_types
+import numpy as np
+from pydantic import TypeAdapter, ValidationError
+
+JSON = 'application/json'
+NDJSON = 'application/x-ndjson'
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+# End-of-stream marker of the Arrow IPC streaming format (continuation token + zero length)
+ARROW_EOS = b'\xff\xff\xff\xff\x00\x00\x00\x00'
+
+_BOUNDS = {
+    annotated_types.Gt: ('gt', operator.gt),
+    annotated_types.Ge: ('ge', operator.ge),
+    annotated_types.Lt: ('lt', operator.lt),
+    annotated_types.Le: ('le', operator.le),
+}
+
+
+class ColumnarError(ValueError):
+    """A column-oriented payload that cannot be used at all (missing column, ragged lengths, unreadable Arrow)"""
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Arrow payloads need pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def _python_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def read_arrow_columns(body: bytes) -> dict:
+    """Columns of an Arrow IPC stream: numpy arrays, or lists for columns with nulls or booleans"""
+    pa = _require_pyarrow()
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise ColumnarError(f"Invalid Arrow IPC stream: {e}")
+    columns = {}
+    for name in table.column_names:
+        column = table.column(name)
+        # Nulls and booleans take the value-by-value path so they are judged exactly like JSON input
+        if column.null_count or pa.types.is_boolean(column.type):
+            columns[name] = column.to_pylist()
+        else:
+            columns[name] = column.to_numpy()
+    return columns
+
+
+class _Field:
+    """One model field: its type, default, numeric bounds and pydantic validator"""
+
+    def __init__(self, name: str, info):
+        if info.annotation not in (int, float, str):
+            raise TypeError(f"Columnar validation supports int, float and str fields, not {name}: {info.annotation}")
+        self.name = name
+        self.kind = info.annotation
+        self.required = info.is_required()
+        self.default = None if self.required else info.default
+        self.bounds = []
+        for constraint in info.metadata:
+            for bound_type, (attribute, compare) in _BOUNDS.items():
+                if isinstance(constraint, bound_type):
+                    self.bounds.append((compare, getattr(constraint, attribute)))
+        self.constrained = len(self.bounds) != len(info.metadata)
+        self.adapter = TypeAdapter(Annotated[(info.annotation, *info.metadata)] if info.metadata else info.annotation)
+        self.dtype = object if self.kind is str else np.float64
+
+    def _is_clean(self, values) -> bool:
+        """True when the vectorized checks are exact for these values (plain numbers, or plain strings)"""
+        if self.constrained:
+            return False
+        if isinstance(values, np.ndarray):
+            if self.kind is str:
+                return values.dtype.kind == 'U' or (
+                    values.dtype.kind == 'O' and all(type(value) is str for value in values))
+            return values.dtype.kind in 'iuf'
+        kinds = set(map(type, values))
+        return kinds <= ({str} if self.kind is str else {int, float})
+
+    def coerce(self, values) -> tuple:
+        """(values as a float64 or object array, mask of the values the field accepts)"""
+        if self._is_clean(values):
+            if self.kind is str:
+                return np.asarray(values, dtype=object), np.ones(len(values), dtype=bool)
+            try:
+                array = np.asarray(values, dtype=np.float64)
+            except OverflowError:
+                array = None
+            if array is not None:
+                valid = np.ones(len(array), dtype=bool)
+                if self.kind is int:
+                    valid &= np.isfinite(array) & (np.floor(array) == array)
+                for compare, bound in self.bounds:
+                    valid &= compare(array, bound)
+                return array, valid
+        # Anything else (bools, numeric strings, nulls, mixed types) is checked value by value by pydantic
+        array = np.empty(len(values), dtype=self.dtype)
+        valid = np.zeros(len(values), dtype=bool)
+        for i, value in enumerate(values):
+            try:
+                array[i] = self.adapter.validate_python(_python_value(value))
+                valid[i] = True
+            except (ValidationError, OverflowError):
+                array[i] = 0 if self.kind is not str else ''
+        return array, valid
+
+
+class ColumnarValidator:
+    """
+    Validates column-oriented batches against a pydantic model.
+
+    Columns of plain numbers or plain strings are checked as whole arrays
+    (type, integrality, ge/gt/le/lt bounds); other columns go value by
+    value through the field's own validator. Rows that fail are validated
+    once more through the model itself, so their errors read exactly like
+    row-by-row validation.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.fields = [_Field(name, info) for name, info in model.model_fields.items()]
+
+    def count_rows(self, columns: dict) -> int:
+        """Number of rows, after checking that required columns exist and all columns are equally long"""
+        if not isinstance(columns, dict):
+            raise ColumnarError("Expected an object of column arrays")
+        missing = [field.name for field in self.fields if field.required and field.name not in columns]
+        if missing:
+            raise ColumnarError(f"Missing required column(s): {', '.join(missing)}")
+        lengths = {}
+        for field in self.fields:
+            if field.name in columns:
+                values = columns[field.name]
+                if not isinstance(values, (list, np.ndarray)):
+                    raise ColumnarError(f"Column {field.name} must be an array")
+                lengths[field.name] = len(values)
+        if len(set(lengths.values())) > 1:
+            raise ColumnarError(f"Columns have different lengths: {lengths}")
+        return next(iter(lengths.values()), 0)
+
+    def validate(self, columns: dict, start: int = 0, stop: int = None) -> tuple:
+        """
+        Validate rows [start, stop) of columns already checked by count_rows.
+        Returns (valid row positions, their values as name -> array,
+        [(row position, ValidationError)] for the rejected rows).
+        """
+        if stop is None:
+            stop = self.count_rows(columns)
+        n_rows = stop - start
+        values = {}
+        valid = np.ones(n_rows, dtype=bool)
+        for field in self.fields:
+            if field.name in columns:
+                values[field.name], field_valid = field.coerce(columns[field.name][start:stop])
+                valid &= field_valid
+            else:
+                values[field.name] = np.full(n_rows, field.default, dtype=field.dtype)
+
+        errors = []
+        for i in np.flatnonzero(~valid):
+            row = {field.name: _python_value(columns[field.name][start + i])
+                   for field in self.fields if field.name in columns}
+            try:
+                validated = self.model.model_validate(row)
+            except ValidationError as e:
+                errors.append((start + int(i), e))
+                continue
+            # The model accepted a row the array checks did not; use the model's values
+            for field in self.fields:
+                values[field.name][i] = getattr(validated, field.name)
+            valid[i] = True
+
+        positions = np.flatnonzero(valid)
+        if len(positions) < n_rows:
+            values = {name: array[positions] for name, array in values.items()}
+        return (start + positions).tolist(), values, errors
+
+
+def ndjson_lines(results: list) -> bytes:
+    """Results as newline-delimited JSON"""
+    return ''.join(json.dumps(result) + '\n' for result in results).encode()
+
+
+class ArrowResultStream:
+    """
+    Writes /batch-predict results as an Arrow IPC stream: schema(), then
+    batch() per scored chunk, then end(). Every row of the input appears in
+    order; rejected rows have null scores and an error message.
+    """
+
+    def __init__(self, return_details: bool = False, explain: bool = False):
+        pa = self.pa = _require_pyarrow()
+        fields = [('index', pa.int64()), ('prediction', pa.int64()), ('probability', pa.float64())]
+        if return_details:
+            fields += [('risk_level', pa.string()), ('aq10_total', pa.int64()),
+                       ('social_score', pa.int64()), ('attention_score', pa.int64())]
+        if explain:
+            # Nested factor lists as one JSON document per row
+            fields.append(('contributing_factors', pa.string()))
+        fields.append(('error', pa.string()))
+        self.schema = pa.schema(fields)
+
+    def start(self) -> bytes:
+        return self.schema.serialize().to_pybytes()
+
+    def batch(self, start: int, stop: int, positions: list, results: dict, errors: dict) -> bytes:
+        """
+        One record batch for input rows [start, stop): results holds
+        score_matrix columns for the rows at positions, errors maps the other
+        positions to messages.
+        """
+        pa = self.pa
+        n_rows = stop - start
+        offsets = np.asarray(positions, dtype=np.int64) - start
+        scored = np.zeros(n_rows, dtype=bool)
+        scored[offsets] = True
+        arrays = []
+        for field in self.schema:
+            name = field.name
+            if name == 'index':
+                arrays.append(pa.array(np.arange(start, stop, dtype=np.int64)))
+            elif name == 'error':
+                arrays.append(pa.array([errors.get(i) for i in range(start, stop)], type=pa.string()))
+            elif name in ('risk_level', 'contributing_factors'):
+                column = [None] * n_rows
+                for offset, value in zip(offsets.tolist(), results.get(name, ())):
+                    column[offset] = value if name == 'risk_level' else json.dumps(value)
+                arrays.append(pa.array(column, type=field.type))
+            else:
+                column = np.zeros(n_rows, dtype=field.type.to_pandas_dtype())
+                if len(offsets):
+                    column[offsets] = results[name]
+                arrays.append(pa.array(column, type=field.type, mask=~scored))
+        return pa.record_batch(arrays, schema=self.schema).serialize().to_pybytes()
+
+    def end(self) -> bytes:
+        return ARROW_EOS
@@ -0,0 +1,351 @@
+"""
+Streaming input/output drift against the training-time profile
+save_model writes drift_profile.json next to every model: the training rows'
+distribution over fixed bins of every model feature (quantile bins for age and
+result, one bin per value for the AQ-10 answers and encoded categoricals) and
+of held-out predicted probabilities. The API counts live rows into the same
+bins in a ring of time buckets, so each row costs one lookup per feature,
+memory is fixed by the number of bins however much traffic is served, and
+PSI / KS against the reference cover the last DRIFT_WINDOW_SECONDS
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+import numpy as np
+
+from features import FeatureEncoder
+
+PROFILE_FILE = 'drift_profile.json'
+PROFILE_VERSION = 1
+
+# Histogrammed features; every other model feature is a small set of encoded values
+NUMERIC_FEATURES = ('age', 'result')
+NUMERIC_BINS = 20
+# Categorical values kept per feature; rarer ones share the trailing "other" bin
+MAX_CATEGORIES = 32
+PROBABILITY = 'probability'
+
+# Usual PSI reading: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant shift
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+STATUS_ORDER = ['stable', 'moderate', 'significant']
+# Floor for empty bins so PSI stays finite
+PSI_EPSILON = 1e-4
+
+
+def _numeric_bins(name: str, values: np.ndarray) -> dict:
+    finite = values[np.isfinite(values)]
+    quantiles = np.linspace(0, 1, NUMERIC_BINS + 1)[1:-1]
+    edges = np.unique(np.quantile(finite, quantiles)) if len(finite) else np.array([])
+    return {'name': name, 'kind': 'numeric', 'edges': edges.tolist(), 'counts': [0] * (len(edges) + 2)}
+
+
+def _categorical_bins(name: str, values: np.ndarray) -> dict:
+    unique, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+    kept = np.sort(unique[np.argsort(-counts, kind='stable')[:MAX_CATEGORIES]])
+    return {'name': name, 'kind': 'categorical', 'values': kept.tolist(), 'counts': [0] * (len(kept) + 1)}
+
+
+def build_profile(X: np.ndarray, feature_cols: list, probabilities: np.ndarray) -> dict:
+    """Reference profile from training rows (encoded, unscaled) and held-out probabilities"""
+    features = []
+    for i, name in enumerate(feature_cols):
+        column = np.asarray(X[:, i], dtype=np.float64)
+        features.append(_numeric_bins(name, column) if name in NUMERIC_FEATURES else _categorical_bins(name, column))
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    profile = {
+        'version': PROFILE_VERSION,
+        'feature_cols': list(feature_cols),
+        'rows': 0,
+        'probability_rows': int(len(probabilities)),
+        'features': features,
+        'probability': _numeric_bins(PROBABILITY, probabilities)
+    }
+    extend_profile(profile, X)
+    profile['probability']['counts'] = _Bins(profile['probability']).count(probabilities).tolist()
+    return profile
+
+
+def extend_profile(profile: dict, X: np.ndarray):
+    """Add more training rows to a profile's feature counts (its bins and probability reference stay)"""
+    for i, spec in enumerate(profile['features']):
+        counts = _Bins(spec).count(np.asarray(X[:, i], dtype=np.float64))
+        spec['counts'] = (np.asarray(spec['counts'], dtype=np.int64) + counts).tolist()
+    profile['rows'] += int(len(X))
+
+
+def save_profile(profile: dict, output_dir: str):
+    with open(os.path.join(output_dir, PROFILE_FILE), 'w') as f:
+        json.dump(profile, f)
+
+
+def load_profile(model_dir: str):
+    """The model directory's drift profile, or None for models saved without one"""
+    try:
+        with open(os.path.join(model_dir, PROFILE_FILE), 'r') as f:
+            profile = json.load(f)
+    except FileNotFoundError:
+        return None
+    if profile.get('version') != PROFILE_VERSION:
+        raise ValueError(f"Unsupported drift profile version: {profile.get('version')}")
+    return profile
+
+
+class _Bins:
+    """Bin lookup for one profiled column; the last bin holds missing (numeric) or unseen (categorical) values"""
+
+    def __init__(self, spec: dict, offset: int = 0):
+        self.name = spec['name']
+        self.kind = spec['kind']
+        self.offset = offset
+        self.reference = np.asarray(spec['counts'], dtype=np.float64)
+        self.size = len(self.reference)
+        self.other = self.size - 1
+        if self.kind == 'numeric':
+            self.edges = np.asarray(spec['edges'], dtype=np.float64)
+        else:
+            self.values = np.asarray(spec['values'], dtype=np.float64)
+
+    def indices(self, values: np.ndarray) -> np.ndarray:
+        if self.kind == 'numeric':
+            # side='left' makes bins right-closed, like bisect_left
+            index = np.searchsorted(self.edges, values, side='left')
+            index[np.isnan(values)] = self.other
+            return index
+        if not len(self.values):
+            return np.full(len(values), self.other, dtype=np.intp)
+        position = np.minimum(np.searchsorted(self.values, values), len(self.values) - 1)
+        return np.where(self.values[position] == values, position, self.other)
+
+    def count(self, values: np.ndarray) -> np.ndarray:
+        return np.bincount(self.indices(values), minlength=self.size)
+
+    def label(self, i: int) -> str:
+        if self.kind == 'categorical':
+            return 'other' if i == self.other else f'{self.values[i]:g}'
+        if i == self.other:
+            return 'missing'
+        if i == 0:
+            return f'<= {self.edges[0]:g}' if len(self.edges) else 'all'
+        if i == len(self.edges):
+            return f'> {self.edges[-1]:g}'
+        return f'({self.edges[i - 1]:g}, {self.edges[i]:g}]'
+
+
+def compare(reference: np.ndarray, live: np.ndarray, numeric: bool) -> dict:
+    """PSI (and, for histograms, KS over the bin edges) of live bin counts against reference counts"""
+    p = np.maximum(live / live.sum(), PSI_EPSILON)
+    q = np.maximum(reference / reference.sum(), PSI_EPSILON)
+    result = {'psi': float(np.sum((p - q) * np.log(p / q)))}
+    if numeric:
+        # Missing values sit outside the ordering, so the CDFs cover the finite bins only
+        live_cdf = np.cumsum(live[:-1]) / max(live[:-1].sum(), 1)
+        reference_cdf = np.cumsum(reference[:-1]) / max(reference[:-1].sum(), 1)
+        result['ks'] = float(np.max(np.abs(live_cdf - reference_cdf))) if len(live_cdf) else 0.0
+    shift = np.abs(live / live.sum() - reference / reference.sum())
+    result['largest_shift'] = int(np.argmax(shift))
+    return result
+
+
+def psi_status(psi: float) -> str:
+    if psi >= PSI_SIGNIFICANT:
+        return 'significant'
+    return 'moderate' if psi >= PSI_MODERATE else 'stable'
+
+
+class DriftMonitor:
+    """
+    Live counts of every model feature and the output probability, kept in
+    the profile's bins over a sliding window.
+
+    The window is a ring of `buckets` count vectors, each covering
+    window_seconds / buckets; moving into a new bucket clears the oldest
+    one, so memory is buckets x bins integers however many rows arrive.
+    Rows are encoded with the model's FeatureEncoder, so the monitored
+    values are exactly the ones the model scores.
+    """
+
+    def __init__(self, profile: dict, window_seconds: float = 3600, buckets: int = 12, min_rows: int = 100):
+        if buckets < 1 or window_seconds <= 0:
+            raise ValueError("Drift window needs at least one bucket and a positive length")
+        self.profile = profile
+        self.window_seconds = window_seconds
+        self.buckets = buckets
+        self.bucket_seconds = window_seconds / buckets
+        self.min_rows = min_rows
+        self.encoder = FeatureEncoder(profile['feature_cols'])
+        self.bins = []
+        offset = 0
+        for spec in profile['features'] + [profile['probability']]:
+            self.bins.append(_Bins(spec, offset))
+            offset += self.bins[-1].size
+        self.features, self.probability = self.bins[:-1], self.bins[-1]
+        self.n_bins = offset
+        # observe()'s per-column lookup: (value -> bin or None, histogram edges or None, offset, other/missing bin)
+        self._row_bins = [
+            (
+                {value: bins.offset + i for i, value in enumerate(bins.values.tolist())}
+                if bins.kind == 'categorical' else None,
+                bins.edges.tolist() if bins.kind == 'numeric' else None,
+                bins.offset, bins.offset + bins.other
+            )
+            for bins in self.bins
+        ]
+        self.started = time.time()
+        self.rows_total = 0
+        # Plain lists: a single row is a couple of dozen scalar increments, which numpy makes slower
+        self._counts = [[0] * offset for _ in range(buckets)]
+        self._slot = self._current_slot()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, profile: dict) -> 'DriftMonitor':
+        return cls(
+            profile,
+            window_seconds=float(os.getenv("DRIFT_WINDOW_SECONDS", "3600")),
+            buckets=int(os.getenv("DRIFT_BUCKETS", "12")),
+            min_rows=int(os.getenv("DRIFT_MIN_ROWS", "100"))
+        )
+
+    def _current_slot(self) -> int:
+        return int(time.monotonic() // self.bucket_seconds)
+
+    def _advance(self):
+        """Clear buckets that have fallen out of the window (call with the lock held)"""
+        slot = self._current_slot()
+        if slot != self._slot:
+            for stale in range(max(self._slot + 1, slot - self.buckets + 1), slot + 1):
+                self._counts[stale % self.buckets] = [0] * self.n_bins
+            self._slot = slot
+
+    def observe(self, input_data: dict, probability: float):
+        """Count one validated input row and its probability"""
+        row = self.encoder.encode_values(input_data)
+        row.append(probability)
+        indices = []
+        for (lookup, edges, offset, other), value in zip(self._row_bins, row):
+            if lookup is not None:
+                indices.append(lookup.get(value, other))
+            elif value != value:
+                indices.append(other)
+            else:
+                indices.append(offset + bisect_left(edges, value))
+        with self._lock:
+            self._advance()
+            counts = self._counts[self._slot % self.buckets]
+            for i in indices:
+                counts[i] += 1
+            self.rows_total += 1
+
+    def observe_columns(self, columns: dict, probabilities):
+        """Count validated input columns (see columnar.py) and their probabilities"""
+        X = self.encoder.encode_columns(columns)
+        counts = np.empty(self.n_bins, dtype=np.int64)
+        for i, bins in enumerate(self.features):
+            counts[bins.offset:bins.offset + bins.size] = bins.count(X[:, i])
+        probability = self.probability
+        counts[probability.offset:] = probability.count(np.asarray(probabilities, dtype=np.float64))
+        added = [(i, count) for i, count in enumerate(counts.tolist()) if count]
+        with self._lock:
+            self._advance()
+            bucket = self._counts[self._slot % self.buckets]
+            for i, count in added:
+                bucket[i] += count
+            self.rows_total += len(X)
+
+    def observe_rows(self, rows: list, probabilities):
+        """Count validated input row dicts and their probabilities"""
+        if rows:
+            self.observe_columns({name: np.asarray([row[name] for row in rows]) for name in rows[0]}, probabilities)
+
+    def window_counts(self) -> np.ndarray:
+        with self._lock:
+            self._advance()
+            return np.array(self._counts, dtype=np.int64).sum(axis=0)
+
+    def _compare(self, bins: _Bins, counts: np.ndarray) -> dict:
+        live = counts[bins.offset:bins.offset + bins.size].astype(np.float64)
+        n = int(live.sum())
+        result = {'rows': n}
+        if n < self.min_rows or not bins.reference.sum():
+            result['status'] = 'insufficient_data'
+            return result
+        result.update(compare(bins.reference, live, bins.kind == 'numeric'))
+        shift = result.pop('largest_shift')
+        result['status'] = psi_status(result['psi'])
+        result['largest_shift'] = {
+            'bin': bins.label(shift),
+            'reference': float(bins.reference[shift] / bins.reference.sum()),
+            'live': float(live[shift] / n)
+        }
+        return result
+
+    def report(self) -> dict:
+        """PSI / KS of every feature and the probability over the current window"""
+        counts = self.window_counts()
+        features = {bins.name: self._compare(bins, counts) for bins in self.features}
+        probability = self._compare(self.probability, counts)
+        scored = [result for result in [*features.values(), probability] if 'psi' in result]
+        return {
+            'window_seconds': self.window_seconds,
+            'rows': probability['rows'],
+            'rows_total': self.rows_total,
+            'started': self.started,
+            'reference_rows': self.profile['rows'],
+            'status': max((result['status'] for result in scored), key=STATUS_ORDER.index,
+                          default='insufficient_data'),
+            'drifted': [name for name, result in features.items() if result['status'] == 'significant'],
+            'features': features,
+            'probability': probability
+        }
+
+    def psi(self) -> dict:
+        """{(column,): PSI} for the columns with enough rows in the window (for /metrics)"""
+        counts = self.window_counts()
+        values = {}
+        for bins in self.bins:
+            live = counts[bins.offset:bins.offset + bins.size].astype(np.float64)
+            if live.sum() >= self.min_rows and bins.reference.sum():
+                values[(bins.name,)] = compare(bins.reference, live, False)['psi']
+        return values
+
+    def stats(self) -> dict:
+        counts = self.window_counts()
+        return {
+            "rows_total": self.rows_total,
+            "window_rows": int(counts[self.probability.offset:].sum()),
+            "window_seconds": self.window_seconds,
+            "buckets": self.buckets,
+            "bins": self.n_bins
+        }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+
+    parser = argparse.ArgumentParser(description='Write the drift profile of an existing model')
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--data', default=os.path.join('..', '..', 'dataset', 'train.csv'))
+    args = parser.parse_args()
+
+    from model_registry import resolve_model_dir
+    from train import ensure_features, load_model
+
+    model_dir = resolve_model_dir(args.model_dir)
+    model_artifacts = load_model(model_dir)
+    df = pd.read_csv(args.data)
+    features = ensure_features(df)
+    feature_cols = model_artifacts['feature_cols']
+    # Probabilities of train.py's validation split, which the single-split model did not train on
+    _, validation = train_test_split(features, test_size=0.2, stratify=features['Class/ASD'], random_state=42)
+    X_val = model_artifacts['scaler'].transform(validation[feature_cols].values)
+    probabilities = model_artifacts['model'].predict_proba(X_val)[:, 1]
+    save_profile(build_profile(features[feature_cols].values, feature_cols, probabilities), model_dir)
+    print(f"Wrote {os.path.join(model_dir, PROFILE_FILE)} from {len(df)} rows")
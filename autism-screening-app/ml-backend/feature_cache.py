@@ -0,0 +1,131 @@
+"""
+On-disk cache of engineered feature matrices
+A CSV is parsed and run through engineer_features once; the feature columns
+are stored as a memory-mappable .npy matrix keyed by the file's sha256 and a
+hash of the feature spec, so later training or scoring runs skip pandas work
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from features import (
+    AQ10_FEATURES, SOCIAL_FEATURES, ATTENTION_FEATURES, AGE_BINS, ETHNICITY_MAP, UNKNOWN_ETHNICITY
+)
+
+logger = logging.getLogger(__name__)
+
+FEATURE_CACHE_DIR = 'feature_cache'
+# Bump to invalidate every cached matrix when the spec changes outside the hashed code
+FEATURE_SPEC_VERSION = 1
+# Non-feature columns carried along when the CSV has them
+PASSTHROUGH_COLUMNS = ['ID', 'Class/ASD']
+META_FILE = 'meta.json'
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def feature_spec_hash(prepare=None) -> str:
+    """Hash of everything that decides the engineered matrix: code, constants and columns"""
+    from train import engineer_features, get_feature_columns
+
+    digest = hashlib.sha256(f'v{FEATURE_SPEC_VERSION}'.encode())
+    functions = [engineer_features, get_feature_columns] + ([prepare] if prepare is not None else [])
+    for fn in functions:
+        digest.update(inspect.getsource(fn).encode())
+    constants = (AQ10_FEATURES, SOCIAL_FEATURES, ATTENTION_FEATURES, AGE_BINS,
+                 sorted(ETHNICITY_MAP.items()), UNKNOWN_ETHNICITY, get_feature_columns())
+    digest.update(repr(constants).encode())
+    return digest.hexdigest()
+
+
+def _save_array(path: str, array: np.ndarray):
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, array, allow_pickle=False)
+    os.replace(path + '.tmp', path)
+
+
+def _column_array(series: pd.Series) -> np.ndarray:
+    array = series.to_numpy()
+    return array.astype(str) if array.dtype == object else array
+
+
+def write_features(features: pd.DataFrame, entry_dir: str, meta: dict):
+    """Store the feature matrix and passthrough columns; meta.json is written last as the commit marker"""
+    os.makedirs(entry_dir, exist_ok=True)
+    columns = meta['feature_cols']
+    _save_array(os.path.join(entry_dir, 'X.npy'),
+                np.ascontiguousarray(features[columns].to_numpy(dtype=np.float64)))
+    passthrough = [col for col in PASSTHROUGH_COLUMNS if col in features.columns]
+    for i, col in enumerate(passthrough):
+        _save_array(os.path.join(entry_dir, f'col{i}.npy'), _column_array(features[col]))
+    meta_path = os.path.join(entry_dir, META_FILE)
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump(dict(meta, passthrough=passthrough, rows=len(features)), f)
+    os.replace(meta_path + '.tmp', meta_path)
+
+
+def read_features(entry_dir: str, mmap: bool = True) -> pd.DataFrame:
+    """Engineered frame backed by the cached arrays (memory-mapped by default)"""
+    with open(os.path.join(entry_dir, META_FILE), 'r') as f:
+        meta = json.load(f)
+    mmap_mode = 'r' if mmap else None
+    X = np.load(os.path.join(entry_dir, 'X.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+    frame = pd.DataFrame(X, columns=meta['feature_cols'], copy=False)
+    for i, col in enumerate(meta['passthrough']):
+        frame[col] = np.load(os.path.join(entry_dir, f'col{i}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+    return frame
+
+
+def load_features(csv_path: str, cache_dir: str = None, prepare=None, refresh: bool = False) -> pd.DataFrame:
+    """
+    Engineered features for a CSV, from the cache when the file and feature spec are unchanged.
+
+    prepare (optional) adjusts the raw frame before engineer_features; its
+    source is part of the cache key. The frame holds the model's feature
+    columns plus ID / Class/ASD when present, not the raw string columns.
+    """
+    from train import engineer_features, get_feature_columns
+
+    cache_dir = cache_dir or os.path.join('models', FEATURE_CACHE_DIR)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    source_sha256 = file_sha256(csv_path)
+    spec = feature_spec_hash(prepare)
+    entry_dir = os.path.join(cache_dir, f'{stem}-{hashlib.sha256((source_sha256 + spec).encode()).hexdigest()[:16]}')
+
+    if not refresh and os.path.exists(os.path.join(entry_dir, META_FILE)):
+        try:
+            return read_features(entry_dir)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable feature cache %s: %s", entry_dir, e)
+
+    df = pd.read_csv(csv_path)
+    if prepare is not None:
+        df = prepare(df)
+    features = engineer_features(df)
+    try:
+        write_features(features, entry_dir, {
+            'source': os.path.abspath(csv_path), 'source_sha256': source_sha256,
+            'feature_spec': spec, 'feature_cols': get_feature_columns(),
+        })
+        # Older entries for the same file can never match again
+        for name in os.listdir(cache_dir):
+            stale = os.path.join(cache_dir, name)
+            if name.startswith(f'{stem}-') and len(name) == len(stem) + 17 and stale != entry_dir and os.path.isdir(stale):
+                shutil.rmtree(stale, ignore_errors=True)
+        return read_features(entry_dir)
+    except OSError as e:
+        logger.warning("Could not cache engineered features: %s", e)
+        return features
@@ -0,0 +1,166 @@
+"""
+Feature definitions and a compiled single-row feature encoder
+Mirrors train.engineer_features without going through pandas, so serving
+code can turn a ScreeningInput dict straight into a model-ready row
+"""
+
+import numpy as np
+
+# Feature columns (AQ-10 questionnaire scores)
+AQ10_FEATURES = [
+    'A1_Score', 'A2_Score', 'A3_Score', 'A4_Score', 'A5_Score',
+    'A6_Score', 'A7_Score', 'A8_Score', 'A9_Score', 'A10_Score'
+]
+
+# Additional demographic features
+DEMOGRAPHIC_FEATURES = ['age', 'gender', 'jaundice', 'austim', 'used_app_before', 'result']
+
+# AQ-10 Question descriptions for interpretability
+AQ10_QUESTIONS = {
+    'A1_Score': 'I often notice small sounds when others do not',
+    'A2_Score': 'I usually concentrate more on the whole picture, rather than small details',
+    'A3_Score': 'I find it easy to do more than one thing at once',
+    'A4_Score': 'If there is an interruption, I can switch back to what I was doing very quickly',
+    'A5_Score': 'I find it easy to read between the lines when someone is talking to me',
+    'A6_Score': 'I know how to tell if someone listening to me is getting bored',
+    'A7_Score': 'When reading a story, I find it difficult to work out the characters intentions',
+    'A8_Score': 'I like to collect information about categories of things',
+    'A9_Score': 'I find it easy to work out what someone is thinking or feeling',
+    'A10_Score': 'I find it difficult to work out peoples intentions'
+}
+
+# Communication/Social features (A5, A6, A7, A9, A10)
+SOCIAL_FEATURES = ['A5_Score', 'A6_Score', 'A7_Score', 'A9_Score', 'A10_Score']
+
+# Attention/Detail features (A1, A2, A3, A4, A8)
+ATTENTION_FEATURES = ['A1_Score', 'A2_Score', 'A3_Score', 'A4_Score', 'A8_Score']
+
+# Age group (child, teen, adult, senior), right-inclusive like pd.cut
+AGE_BINS = [0, 12, 18, 40, 100]
+
+# Ethnicity encoding (simplified), unknown values fall back to '?'
+ETHNICITY_MAP = {
+    'White-European': 0,
+    'Asian': 1,
+    'Middle Eastern ': 2,
+    'South Asian': 3,
+    'Black': 4,
+    'Hispanic': 5,
+    'Pasifika': 6,
+    'Turkish': 7,
+    'Others': 8,
+    '?': 9
+}
+UNKNOWN_ETHNICITY = 9
+
+
+def encode_age_group(age: float) -> int:
+    """Bucket an age the same way pd.cut(bins=AGE_BINS) does"""
+    if not AGE_BINS[0] < age <= AGE_BINS[-1]:
+        raise ValueError(f"age {age} is outside the supported range ({AGE_BINS[0]}, {AGE_BINS[-1]}]")
+    for group, upper in enumerate(AGE_BINS[1:]):
+        if age <= upper:
+            return group
+    return len(AGE_BINS) - 2
+
+
+class FeatureEncoder:
+    """
+    Encodes raw screening inputs into rows ordered like feature_cols.
+
+    Each output column is compiled once into a small closure, so encoding a
+    request is a single pass over feature_cols writing into a preallocated
+    float64 row (the dtype engineer_features hands to the scaler).
+    """
+
+    def __init__(self, feature_cols: list):
+        self.feature_cols = list(feature_cols)
+        self.index = {feat: i for i, feat in enumerate(self.feature_cols)}
+        self._encoders = [self._compile(feat) for feat in self.feature_cols]
+        self._column_encoders = [self._compile_column(feat) for feat in self.feature_cols]
+
+    @staticmethod
+    def _compile(feat: str):
+        if feat in AQ10_FEATURES or feat in ('age', 'result'):
+            return lambda row: row[feat]
+        if feat == 'aq10_total':
+            return lambda row: sum(row[col] for col in AQ10_FEATURES)
+        if feat == 'social_score':
+            return lambda row: sum(row[col] for col in SOCIAL_FEATURES)
+        if feat == 'attention_score':
+            return lambda row: sum(row[col] for col in ATTENTION_FEATURES)
+        if feat == 'gender_encoded':
+            return lambda row: row['gender'] == 'm'
+        if feat == 'jaundice_encoded':
+            return lambda row: row['jaundice'] == 'yes'
+        if feat == 'autism_family_encoded':
+            return lambda row: row['austim'] == 'yes'
+        if feat == 'used_app_encoded':
+            return lambda row: row['used_app_before'] == 'yes'
+        if feat == 'age_group':
+            return lambda row: encode_age_group(row['age'])
+        if feat == 'ethnicity_encoded':
+            return lambda row: ETHNICITY_MAP.get(row.get('ethnicity'), UNKNOWN_ETHNICITY)
+        raise ValueError(f"Unknown feature column: {feat}")
+
+    @staticmethod
+    def _compile_column(feat: str):
+        """Like _compile, but over whole validated columns (numeric float arrays, object arrays of str)"""
+        if feat in AQ10_FEATURES or feat in ('age', 'result'):
+            return lambda columns: columns[feat]
+        if feat == 'aq10_total':
+            return lambda columns: sum(columns[col] for col in AQ10_FEATURES)
+        if feat == 'social_score':
+            return lambda columns: sum(columns[col] for col in SOCIAL_FEATURES)
+        if feat == 'attention_score':
+            return lambda columns: sum(columns[col] for col in ATTENTION_FEATURES)
+        if feat == 'gender_encoded':
+            return lambda columns: columns['gender'] == 'm'
+        if feat == 'jaundice_encoded':
+            return lambda columns: columns['jaundice'] == 'yes'
+        if feat == 'autism_family_encoded':
+            return lambda columns: columns['austim'] == 'yes'
+        if feat == 'used_app_encoded':
+            return lambda columns: columns['used_app_before'] == 'yes'
+        if feat == 'age_group':
+            # Right-inclusive bins: an age equal to an upper edge belongs to that bin
+            return lambda columns: np.searchsorted(AGE_BINS[1:], columns['age'], side='left')
+        if feat == 'ethnicity_encoded':
+            return lambda columns: np.fromiter(
+                (ETHNICITY_MAP.get(value, UNKNOWN_ETHNICITY) for value in columns['ethnicity']),
+                dtype=np.float64, count=len(columns['ethnicity'])
+            )
+        raise ValueError(f"Unknown feature column: {feat}")
+
+    def encode(self, input_data: dict, out: np.ndarray = None) -> np.ndarray:
+        """Encode a single input dict into a (n_features,) row"""
+        if out is None:
+            out = np.empty(len(self._encoders), dtype=np.float64)
+        for i, encoder in enumerate(self._encoders):
+            out[i] = encoder(input_data)
+        return out
+
+    def encode_values(self, input_data: dict) -> list:
+        """Encode a single input dict into a list of Python numbers (no array to allocate or fill)"""
+        return [encoder(input_data) for encoder in self._encoders]
+
+    def encode_many(self, inputs: list, out: np.ndarray = None) -> np.ndarray:
+        """Encode a list of input dicts into a (n_samples, n_features) matrix"""
+        if out is None:
+            out = np.empty((len(inputs), len(self._encoders)), dtype=np.float64)
+        for i, input_data in enumerate(inputs):
+            self.encode(input_data, out[i])
+        return out
+
+    def encode_columns(self, columns: dict, out: np.ndarray = None) -> np.ndarray:
+        """
+        Encode validated input columns (name -> array of equal length, ages
+        within AGE_BINS) into a (n_samples, n_features) matrix, one
+        vectorized operation per feature column
+        """
+        n_samples = len(columns['age'])
+        if out is None:
+            out = np.empty((n_samples, len(self._column_encoders)), dtype=np.float64)
+        for i, encoder in enumerate(self._column_encoders):
+            out[:, i] = encoder(columns)
+        return out
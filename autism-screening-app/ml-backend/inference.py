@@ -0,0 +1,183 @@
+"""
+Inference executor for CPU-bound model calls
+Keeps pandas, sklearn and LightGBM work off the asyncio event loop with a
+bounded queue (callers get ExecutorSaturated instead of piling up) and a
+per-request timeout
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from metrics import collect_stages, record_stages
+
+# Model artifacts held by each process-pool worker (loaded once per worker)
+_worker_artifacts = None
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the inference queue is full and the request should be shed"""
+
+
+def _init_worker(model_dir: str, load_kwargs: dict):
+    """Process-pool initializer: preload the model in the worker"""
+    global _worker_artifacts
+    from serving import load_serving_model
+    _worker_artifacts = load_serving_model(model_dir, **load_kwargs)
+
+
+def _call_in_worker(fn, *args):
+    """Run fn against the artifacts preloaded in this worker process"""
+    return fn(_worker_artifacts, *args)
+
+
+def _noop(_model_artifacts):
+    return None
+
+
+def _call_in_worker_with_stages(fn, *args):
+    """_call_in_worker, also returning the stage timings it observed (for the API process' metrics)"""
+    with collect_stages() as stages:
+        result = fn(_worker_artifacts, *args)
+    return result, stages
+
+
+class InferenceExecutor:
+    """
+    Runs fn(model_artifacts, *args) on a thread or process pool.
+
+    At most max_workers calls run at once and at most max_queue more wait
+    behind them; anything beyond that is rejected immediately so the
+    event loop never accumulates unbounded work.
+    """
+
+    def __init__(self, kind: str = 'thread', max_workers: int = None,
+                 max_queue: int = 32, timeout: float = 30.0):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Unknown inference executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.pending = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._pool = None
+        self._model_artifacts = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'InferenceExecutor':
+        """Build an executor from INFERENCE_* environment variables"""
+        workers = os.getenv("INFERENCE_WORKERS")
+        return cls(
+            kind=os.getenv("INFERENCE_EXECUTOR", "thread"),
+            max_workers=int(workers) if workers else None,
+            max_queue=int(os.getenv("INFERENCE_MAX_QUEUE", "32")),
+            timeout=float(os.getenv("INFERENCE_TIMEOUT", "30")),
+        )
+
+    def _process_pool(self, model_dir: str, load_kwargs: dict) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(model_dir, load_kwargs),
+        )
+
+    def start(self, model_artifacts: dict, model_dir: str, **load_kwargs):
+        """Create the pool; process workers load their own copy via load_model(model_dir, **load_kwargs)"""
+        self._model_artifacts = model_artifacts
+        if self.kind == 'process':
+            self._pool = self._process_pool(model_dir, load_kwargs)
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='inference'
+            )
+
+    def swap(self, model_artifacts: dict, model_dir: str, warm_up=None, **load_kwargs):
+        """
+        Serve a different model from now on (blocking; call it off the event loop).
+
+        Calls already running or queued finish on the model they started
+        with. A process pool is replaced by a new one whose workers have all
+        loaded model_dir and run warm_up(model_artifacts) before the switch,
+        so requests never wait on a cold worker.
+        """
+        if self._pool is None:
+            raise RuntimeError("Inference executor not started")
+        old_pool = None
+        if self.kind == 'process':
+            pool = self._process_pool(model_dir, load_kwargs)
+            try:
+                # One call per worker: the pool spawns a process for every call that finds no idle worker
+                warm = [pool.submit(_call_in_worker, warm_up or _noop) for _ in range(self.max_workers)]
+                for future in warm:
+                    future.result()
+            except BaseException:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+        with self._lock:
+            if self.kind == 'process':
+                old_pool, self._pool = self._pool, pool
+            self._model_artifacts = model_artifacts
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    def _release(self, _future):
+        # Done callbacks fire on pool threads, so guard the counter
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, fn, *args):
+        """Run fn(model_artifacts, *args) in the pool and await its result"""
+        if self._pool is None:
+            raise RuntimeError("Inference executor not started")
+        with self._lock:
+            if self.pending >= self.capacity:
+                self.rejected += 1
+                raise ExecutorSaturated(f"Inference queue is full ({self.pending} pending)")
+            self.pending += 1
+            # Submitted under the lock so swap() never shuts down a pool between lookup and submit
+            try:
+                if self.kind == 'process':
+                    future = self._pool.submit(_call_in_worker_with_stages, fn, *args)
+                else:
+                    future = self._pool.submit(fn, self._model_artifacts, *args)
+            except Exception:
+                self.pending -= 1
+                raise
+        # The slot is freed when the work actually finishes, not when the caller gives up
+        future.add_done_callback(self._release)
+
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            future.cancel()
+            raise
+        if self.kind == 'process':
+            result, stages = result
+            record_stages(stages)
+        return result
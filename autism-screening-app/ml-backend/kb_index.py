@@ -0,0 +1,191 @@
+"""
+BM25 retrieval over the clinical knowledge base
+The knowledge base is split into passages of whole sentences and the BM25
+weight of every (passage, term) pair is precomputed into a numpy matrix,
+cached next to the model artifacts, so prompts carry only the top passages
+for a query within a token budget instead of the whole document
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'kb_index.npz'
+META_FILE = 'kb_index.json'
+
+# What the video-analysis prompt asks the model to look for
+VIDEO_ANALYSIS_QUERY = (
+    "physical behavior facial expressions eye contact gaze hand flapping rocking body language "
+    "motor stereotypies repetitive movements gestures "
+    "speech audio prosody monotone intonation speech rate response latency echolalia vocal"
+)
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had has
+have having he her here hers herself him himself his how i if in into is it its itself just me more
+most my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves may often within across however whereas
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Sentence ends; the knowledge base also glues headings to the next sentence without a space
+SENTENCE_END = re.compile(r"(?<=[.!?])\s*(?=[A-Z“\"(])")
+
+
+def normalize(word: str) -> str:
+    """Light stemming so plural and singular forms share a term"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list:
+    return [normalize(word) for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token for English)"""
+    return (len(text) + 3) // 4
+
+
+def split_passages(text: str, max_words: int = 120) -> list:
+    """Group consecutive sentences into passages of at most max_words words"""
+    sentences = [s.strip() for s in SENTENCE_END.split(text) if s.strip()]
+    passages, current, words = [], [], 0
+    for sentence in sentences:
+        n = len(sentence.split())
+        if current and words + n > max_words:
+            passages.append(" ".join(current))
+            current, words = [], 0
+        current.append(sentence)
+        words += n
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+class KnowledgeBaseIndex:
+    """Passages plus their BM25 weight matrix (passages x vocabulary)"""
+
+    def __init__(self, passages: list, vocabulary: dict, weights: np.ndarray, meta: dict):
+        self.passages = passages
+        self.vocabulary = vocabulary
+        self.weights = weights
+        self.meta = meta
+
+    @classmethod
+    def build(cls, text: str, max_words: int = 120, k1: float = 1.5, b: float = 0.75) -> 'KnowledgeBaseIndex':
+        passages = split_passages(text, max_words)
+        tokens = [tokenize(passage) for passage in passages]
+        vocabulary = {term: i for i, term in enumerate(sorted({t for doc in tokens for t in doc}))}
+
+        tf = np.zeros((len(passages), len(vocabulary)), dtype=np.float32)
+        for row, doc in enumerate(tokens):
+            ids, counts = np.unique([vocabulary[t] for t in doc], return_counts=True)
+            tf[row, ids] = counts
+        lengths = tf.sum(axis=1, keepdims=True)
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1 + (len(passages) - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = k1 * (1 - b + b * lengths / lengths.mean())
+        weights = idf * tf * (k1 + 1) / (tf + norm)
+
+        meta = {
+            'source_sha256': hashlib.sha256(text.encode('utf-8')).hexdigest(),
+            'max_words': max_words, 'k1': k1, 'b': b,
+            'passages': len(passages), 'terms': len(vocabulary),
+        }
+        return cls(passages, vocabulary, weights.astype(np.float32), meta)
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        index_path = os.path.join(directory, INDEX_FILE)
+        # Write-then-rename so a concurrent reader never sees a partial index
+        with open(index_path + '.tmp', 'wb') as f:
+            np.savez(f, weights=self.weights)
+        os.replace(index_path + '.tmp', index_path)
+        meta = dict(self.meta, passages_text=self.passages, vocabulary=self.vocabulary)
+        with open(os.path.join(directory, META_FILE) + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(os.path.join(directory, META_FILE) + '.tmp', os.path.join(directory, META_FILE))
+
+    @classmethod
+    def load(cls, directory: str) -> 'KnowledgeBaseIndex':
+        with open(os.path.join(directory, META_FILE), 'r') as f:
+            meta = json.load(f)
+        weights = np.load(os.path.join(directory, INDEX_FILE))['weights']
+        return cls(meta.pop('passages_text'), meta.pop('vocabulary'), weights, meta)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every passage for the query"""
+        ids = [self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary]
+        if not ids:
+            return np.zeros(len(self.passages), dtype=np.float32)
+        return self.weights[:, ids].sum(axis=1)
+
+    def retrieve(self, query: str, top_k: int = 8, token_budget: int = 1600) -> list:
+        """Best passages for the query that fit the token budget, in document order"""
+        scores = self.scores(query)
+        chosen, used = [], 0
+        for i in np.argsort(-scores, kind='stable'):
+            if len(chosen) == top_k or scores[i] <= 0:
+                break
+            cost = estimate_tokens(self.passages[i])
+            if used + cost > token_budget:
+                continue
+            chosen.append(int(i))
+            used += cost
+        return [self.passages[i] for i in sorted(chosen)]
+
+    def context(self, query: str, top_k: int = 8, token_budget: int = 1600) -> str:
+        return "\n\n".join(self.retrieve(query, top_k, token_budget))
+
+
+def load_or_build_index(kb_path: str, index_dir: str, max_words: int = 120) -> KnowledgeBaseIndex:
+    """Load the cached index if it was built from the current knowledge base, else rebuild it"""
+    with open(kb_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    source_sha256 = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    try:
+        index = KnowledgeBaseIndex.load(index_dir)
+        if index.meta['source_sha256'] == source_sha256 and index.meta['max_words'] == max_words:
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index = KnowledgeBaseIndex.build(text, max_words)
+    try:
+        index.save(index_dir)
+    except OSError as e:
+        logger.warning("Could not cache knowledge base index: %s", e)
+    return index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the knowledge base retrieval index')
+    parser.add_argument('--kb', default='../../KNOWLEDGE_BASE.txt')
+    parser.add_argument('--index-dir', default='models')
+    parser.add_argument('--max-words', type=int, default=120)
+    parser.add_argument('--query', default=VIDEO_ANALYSIS_QUERY)
+    parser.add_argument('--top-k', type=int, default=8)
+    parser.add_argument('--token-budget', type=int, default=1600)
+    args = parser.parse_args()
+
+    with open(args.kb, 'r', encoding='utf-8') as f:
+        kb_index = KnowledgeBaseIndex.build(f.read(), args.max_words)
+    kb_index.save(args.index_dir)
+    print(f"Indexed {kb_index.meta['passages']} passages, {kb_index.meta['terms']} terms -> {args.index_dir}")
+    context = kb_index.context(args.query, args.top_k, args.token_budget)
+    print(f"Context for the query: ~{estimate_tokens(context)} tokens\n")
+    print(context)
@@ -0,0 +1,77 @@
+"""
+Structured logging for the API
+Configures the root logger once, as JSON lines (LOG_FORMAT=json) or
+readable text with the same key=value fields appended (LOG_FORMAT=text).
+Fields are passed with logging's extra={...}, so call sites stay plain
+logger.info/warning calls
+"""
+
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+
+# Libraries whose INFO logs are per request (httpx logs every provider call)
+QUIET_LOGGERS = ('httpx', 'httpcore')
+
+# Attributes every LogRecord has; anything else on a record came in through extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def record_fields(record: logging.LogRecord) -> dict:
+    """The extra={...} fields of a record"""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields and any traceback"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(record_fields(record))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """time level logger: message key=value ..."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            extra = ' '.join(f'{key}={json.dumps(value, default=str)}' for key, value in fields.items())
+            # Keep a traceback (added by the base formatter) after the fields
+            head, sep, tail = line.partition('\n')
+            line = f'{head} {extra}{sep}{tail}'
+        return line
+
+
+def configure_logging(level: str = None, fmt: str = None):
+    """Send all logs to stderr in the LOG_FORMAT (text/json) at LOG_LEVEL; safe to call twice"""
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    fmt = fmt or os.getenv('LOG_FORMAT', 'text')
+    if fmt not in ('text', 'json'):
+        raise ValueError(f"Unknown LOG_FORMAT: {fmt}")
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if getattr(handler, '_asd_handler', False):
+            root.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+    handler._asd_handler = True
+    root.addHandler(handler)
+    root.setLevel(level)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
@@ -0,0 +1,379 @@
+"""
+Prometheus-style metrics for the API
+Counters, gauges and histograms kept in process and rendered in the
+Prometheus text exposition format for GET /metrics, plus stage timers for
+the model and video paths and an ASGI middleware that counts and times every
+request by route template (so /jobs/{job_id} is one series, not one per job).
+Under serve.py, workers share snapshots so one scrape covers every worker
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request and stage latencies range from ~50 us (a cached stage) to minutes (video analysis)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0
+)
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base for one named metric family; values are kept per label-value tuple"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """(suffix, label names, label values, extra label, value) for every series"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in sorted(items):
+            yield "", self.labelnames, key, "", value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class CallbackMetric(Metric):
+    """
+    Gauge or counter read at scrape time from existing stats: fn() returns a
+    number, or {label values tuple: number}; None values are skipped
+    """
+
+    def __init__(self, name: str, documentation: str, fn, labelnames: tuple = (), kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        if kind not in ("gauge", "counter"):
+            raise ValueError(f"Unknown callback metric kind: {kind}")
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self):
+        try:
+            values = self.fn()
+        except Exception:
+            return
+        if values is None:
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            if value is not None:
+                yield "", self.labelnames, key, "", value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (not cumulative) counts, then sum and count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in sorted(items):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield "_bucket", self.labelnames, key, f'le="{_format_value(bound)}"', cumulative
+            yield "_sum", self.labelnames, key, "", total
+            yield "_count", self.labelnames, key, "", count
+
+
+class Registry:
+    """All metrics of the process, rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Re-registration (e.g. a module imported twice) returns the live metric
+                if existing.kind != metric.kind or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                if isinstance(existing, CallbackMetric):
+                    existing.fn = metric.fn
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def callback(self, name: str, documentation: str, fn, labelnames: tuple = (),
+                 kind: str = "gauge") -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, fn, labelnames, kind))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def collect(self) -> list:
+        """[name, kind, documentation, samples] of every metric, as JSON-serialisable lists"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [
+            [metric.name, metric.kind, metric.documentation,
+             [[suffix, list(names), list(values), extra, value]
+              for suffix, names, values, extra, value in metric.samples()]]
+            for metric in metrics
+        ]
+
+
+SNAPSHOT_PREFIX = "worker-"
+
+
+class WorkerMetrics:
+    """
+    Metrics of all pre-fork workers from a scrape of any one of them.
+
+    Each worker writes its samples to <directory>/worker-<n>.json every
+    `interval` seconds; render() merges this worker's live samples with the
+    latest snapshot of every other worker, adding a `worker` label, so other
+    workers' series are at most `interval` seconds old. A replacement worker
+    overwrites its predecessor's file, which Prometheus reads as a counter reset.
+    """
+
+    def __init__(self, registry: Registry, directory: str, worker: str, interval: float = 5.0):
+        self.registry = registry
+        self.directory = directory
+        self.worker = str(worker)
+        self.interval = interval
+
+    @classmethod
+    def from_env(cls, registry: Registry):
+        """METRICS_DIR and SERVE_WORKER (set by serve.py for each worker), or None outside serve.py"""
+        directory = os.getenv("METRICS_DIR")
+        worker = os.getenv("SERVE_WORKER")
+        if not directory or worker is None:
+            return None
+        return cls(registry, directory, worker, float(os.getenv("METRICS_SNAPSHOT_SECONDS", "5")))
+
+    def _path(self, worker: str) -> str:
+        return os.path.join(self.directory, f"{SNAPSHOT_PREFIX}{worker}.json")
+
+    def write(self):
+        """Write this worker's samples atomically (temp file + rename)"""
+        path = self._path(self.worker)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"worker": self.worker, "pid": os.getpid(), "time": time.time(),
+                       "metrics": self.registry.collect()}, f)
+        os.replace(tmp_path, path)
+
+    def snapshots(self) -> list:
+        """(worker, metrics) of every other worker that has written a snapshot"""
+        snapshots = []
+        for name in sorted(os.listdir(self.directory)):
+            if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot["worker"] != self.worker:
+                snapshots.append((snapshot["worker"], snapshot["metrics"]))
+        return snapshots
+
+    def render(self) -> str:
+        families = {}
+        for worker, metrics in [(self.worker, self.registry.collect())] + self.snapshots():
+            for name, kind, documentation, samples in metrics:
+                family = families.setdefault(name, [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"])
+                for suffix, names, values, extra, value in samples:
+                    labels = _format_labels(tuple(names) + ("worker",), tuple(values) + (worker,), extra)
+                    family.append(f"{name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(line for family in families.values() for line in family) + "\n"
+
+
+def clear_snapshots(directory: str):
+    """Remove worker snapshots left by an earlier run"""
+    for name in os.listdir(directory):
+        if name.startswith(SNAPSHOT_PREFIX):
+            os.remove(os.path.join(directory, name))
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "asd_http_requests_total", "HTTP requests by method, route template and status code",
+    ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "asd_http_request_duration_seconds", "Time from request start to the last response byte",
+    ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("asd_http_requests_in_flight", "HTTP requests currently being handled")
+STAGE_SECONDS = REGISTRY.histogram(
+    "asd_stage_duration_seconds",
+    "Time spent per processing stage (model path: features, scale, model, explain, factors; "
+    "video path: upload_read, hash, preprocess, encode, provider, parse)",
+    ("stage",)
+)
+
+# Stage observations are also appended here while collect_stages() is active in this thread
+_collecting = threading.local()
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record one stage duration"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    sink = getattr(_collecting, "stages", None)
+    if sink is not None:
+        sink.append((stage, seconds))
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time the enclosed block as one observation of stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def collect_stages():
+    """
+    Yield a list that receives every (stage, seconds) observed in this
+    thread inside the block, so process-pool workers can ship their stage
+    timings back to the API process with the result.
+    """
+    previous = getattr(_collecting, "stages", None)
+    stages = _collecting.stages = []
+    try:
+        yield stages
+    finally:
+        _collecting.stages = previous
+
+
+def record_stages(stages: list):
+    """Merge stage timings collected in another process"""
+    for stage, seconds in stages:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: request count, latency and in-flight gauge per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope; unmatched paths share one series
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status["code"])
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=scope["method"], route=route)
@@ -0,0 +1,269 @@
+"""
+Versioned model artifacts and shadow scoring
+train.save_model writes every trained model to its own directory under
+models/versions/ and only then points models/CURRENT at it, so a version is
+complete on disk before anything can load it. Loaders resolve the model
+directory through that pointer (a directory without one, the original flat
+layout, is used as is), which lets the API load, warm up and swap in a new
+version without a restart, and score sampled live traffic against a
+candidate version off the request path
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = 'versions'
+CURRENT_FILE = 'CURRENT'
+STAGING_PREFIX = '.staging-'
+VERSION_PATTERN = re.compile(r'[A-Za-z0-9][A-Za-z0-9._-]*')
+
+# Artifacts of a flat models/ directory, copied into a version by `import`
+ARTIFACT_FILES = [
+    'model.pkl', 'scaler.pkl', 'feature_cols.json', 'feature_importance.json', 'metrics.json',
+    'model.txt', 'scaler.npz', 'score_table.json', 'score_table.npy', 'drift_profile.json'
+]
+
+SHADOW_ROWS = REGISTRY.counter(
+    "asd_shadow_rows_total",
+    "Rows scored by the shadow model, by whether its label and risk band agree with the served ones",
+    ("outcome",)
+)
+SHADOW_DELTA = REGISTRY.histogram(
+    "asd_shadow_probability_delta", "Absolute difference between served and shadow probabilities", (),
+    buckets=(0.001, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0)
+)
+
+
+def current_version(model_dir: str):
+    """Version named by model_dir/CURRENT, or None for a flat (unversioned) directory"""
+    try:
+        with open(os.path.join(model_dir, CURRENT_FILE), 'r') as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def version_dir(model_dir: str, version: str) -> str:
+    """Directory of a stored version (names are checked so they cannot escape versions/)"""
+    if not version or not VERSION_PATTERN.fullmatch(version):
+        raise ValueError(f"Invalid model version: {version!r}")
+    path = os.path.join(model_dir, VERSIONS_DIR, version)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"Model version not found: {version}")
+    return path
+
+
+def resolve_model_dir(model_dir: str, version: str = None) -> str:
+    """Artifact directory of `version` (default: the CURRENT one), or model_dir itself when unversioned"""
+    version = version or current_version(model_dir)
+    return model_dir if version is None else version_dir(model_dir, version)
+
+
+def list_versions(model_dir: str) -> list:
+    """Stored versions, oldest first, with their training metrics"""
+    root = os.path.join(model_dir, VERSIONS_DIR)
+    if not os.path.isdir(root):
+        return []
+    current = current_version(model_dir)
+    versions = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if name.startswith(STAGING_PREFIX) or not os.path.isdir(path):
+            continue
+        try:
+            with open(os.path.join(path, 'metrics.json'), 'r') as f:
+                metrics = json.load(f)
+        except (OSError, ValueError):
+            metrics = None
+        versions.append({
+            'version': name,
+            'created': os.path.getmtime(path),
+            'metrics': metrics,
+            'current': name == current
+        })
+    return versions
+
+
+def set_current_version(model_dir: str, version: str):
+    """
+    Point CURRENT at an existing version (atomic, so readers never see a
+    partial name); None removes it, back to serving the flat directory
+    """
+    if version is None:
+        try:
+            os.remove(os.path.join(model_dir, CURRENT_FILE))
+        except FileNotFoundError:
+            pass
+        return
+    version_dir(model_dir, version)
+    tmp_path = os.path.join(model_dir, CURRENT_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        f.write(version + '\n')
+    os.replace(tmp_path, os.path.join(model_dir, CURRENT_FILE))
+
+
+@contextmanager
+def new_version(model_dir: str, activate: bool = True):
+    """
+    Yield (version, staging directory) to write a model into. When the block
+    succeeds the directory is renamed to versions/<version> and, with
+    activate, CURRENT is pointed at it; when it fails the staging directory
+    is removed, so half-written versions are never visible.
+    """
+    root = os.path.join(model_dir, VERSIONS_DIR)
+    os.makedirs(root, exist_ok=True)
+    base = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+    version, suffix = base, 1
+    while os.path.exists(os.path.join(root, version)) or os.path.exists(os.path.join(root, STAGING_PREFIX + version)):
+        suffix += 1
+        version = f'{base}-{suffix}'
+    staging = os.path.join(root, STAGING_PREFIX + version)
+    os.makedirs(staging)
+    try:
+        yield version, staging
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    os.rename(staging, os.path.join(root, version))
+    if activate:
+        set_current_version(model_dir, version)
+
+
+def import_flat_artifacts(model_dir: str, activate: bool = True) -> str:
+    """Copy the artifacts of a flat models/ directory into a new version"""
+    if not os.path.exists(os.path.join(model_dir, 'model.pkl')):
+        raise FileNotFoundError(f"No model.pkl in {model_dir}")
+    with new_version(model_dir, activate=activate) as (version, directory):
+        for name in ARTIFACT_FILES:
+            source = os.path.join(model_dir, name)
+            if os.path.exists(source):
+                shutil.copy2(source, os.path.join(directory, name))
+    return version
+
+
+class ShadowScorer:
+    """
+    Scores a sampled fraction of live requests with a candidate model and
+    records how far it is from the served model.
+
+    Requests are offered after the served result exists and are scored on
+    this scorer's own thread; when max_pending batches are already waiting
+    the offer is dropped instead, so shadowing never holds up a response.
+    """
+
+    def __init__(self, version: str, model_artifacts: dict, sample_rate: float = 0.1,
+                 max_pending: int = 8, max_rows: int = 256):
+        self.version = version
+        self.model_artifacts = model_artifacts
+        self.sample_rate = sample_rate
+        self.max_pending = max_pending
+        self.max_rows = max_rows
+        self.started = time.time()
+        self.pending = 0
+        self.dropped = 0
+        self.failed = 0
+        self.rows = 0
+        self.label_disagreements = 0
+        self.risk_disagreements = 0
+        self.delta_sum = 0.0
+        self.delta_max = 0.0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow')
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "sample_rate": self.sample_rate,
+            "started": self.started,
+            "rows": self.rows,
+            "pending": self.pending,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "label_disagreement_rate": self.label_disagreements / self.rows if self.rows else None,
+            "risk_level_disagreement_rate": self.risk_disagreements / self.rows if self.rows else None,
+            "mean_abs_delta": self.delta_sum / self.rows if self.rows else None,
+            "max_abs_delta": self.delta_max,
+        }
+
+    def offer(self, rows: list, served_probabilities: list):
+        """Maybe shadow-score these input rows; returns immediately"""
+        if not rows or random.random() >= self.sample_rate:
+            return
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return
+            self.pending += 1
+        future = self._pool.submit(
+            self._compare, rows[:self.max_rows], list(served_probabilities[:self.max_rows])
+        )
+        future.add_done_callback(self._release)
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+
+    def _compare(self, rows: list, served: list):
+        from serving import get_risk_level, predict_batch
+        try:
+            shadow = [result['probability'] for result in predict_batch(self.model_artifacts, rows)]
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.warning("Shadow scoring failed", extra={"version": self.version, "error": str(e)})
+            return
+        for served_probability, shadow_probability in zip(served, shadow):
+            delta = abs(shadow_probability - served_probability)
+            label_differs = (shadow_probability >= 0.5) != (served_probability >= 0.5)
+            risk_differs = get_risk_level(shadow_probability) != get_risk_level(served_probability)
+            SHADOW_DELTA.observe(delta)
+            SHADOW_ROWS.inc(outcome="label_flip" if label_differs else "risk_flip" if risk_differs else "agree")
+            with self._lock:
+                self.rows += 1
+                self.label_disagreements += label_differs
+                self.risk_disagreements += risk_differs
+                self.delta_sum += delta
+                self.delta_max = max(self.delta_max, delta)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage versioned model artifacts')
+    parser.add_argument('--model-dir', default='models')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='List stored versions')
+    activate_parser = commands.add_parser('activate', help='Point CURRENT at a version (watching APIs reload it)')
+    activate_parser.add_argument('version')
+    import_parser = commands.add_parser('import', help='Copy a flat models/ directory into a new version')
+    import_parser.add_argument('--no-activate', action='store_true')
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        for entry in list_versions(args.model_dir):
+            metrics = entry['metrics'] or {}
+            marker = '*' if entry['current'] else ' '
+            print(f"{marker} {entry['version']}  auc={(metrics.get('auc_roc') or float('nan')):.4f}  "
+                  f"brier={(metrics.get('brier_score') or float('nan')):.4f}")
+    elif args.command == 'activate':
+        set_current_version(args.model_dir, args.version)
+        print(f"CURRENT -> {args.version}")
+    else:
+        version = import_flat_artifacts(args.model_dir, activate=not args.no_activate)
+        print(f"Imported {args.model_dir} as version {version}")
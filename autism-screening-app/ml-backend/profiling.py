@@ -0,0 +1,303 @@
+"""
+Opt-in sampling profiler for production requests
+A sampled fraction of requests (or requests sent with an X-Profile header)
+is profiled by a background thread that snapshots every busy thread's stack
+at a fixed interval while the request runs. Stacks are stored in the folded
+format flamegraph.pl, inferno and speedscope read, in a bounded ring of files
+on disk. Nothing is installed when profiling is off, so it then costs nothing
+"""
+
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+PROFILE_SUFFIX = '.folded'
+META_SUFFIX = '.json'
+PROFILE_ID_CHARACTERS = frozenset('0123456789abcdef-')
+
+# Innermost frames of a thread parked waiting for work; such samples are idle, not time spent on a request
+IDLE_FRAMES = {
+    ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'), ('thread.py', '_worker'), ('selectors.py', 'select'),
+}
+
+
+def _path_roots() -> list:
+    return sorted({os.path.abspath(p) + os.sep for p in sys.path if p}, key=len, reverse=True)
+
+
+class ProfileSession:
+    """Folded stacks (stack -> samples) collected for one request, and the number of sampling ticks"""
+
+    def __init__(self):
+        self.stacks = Counter()
+        self.ticks = 0
+
+
+class StackSampler:
+    """
+    One daemon thread that samples all threads while at least one session
+    is active, and blocks on a condition (no CPU at all) otherwise.
+
+    The event loop thread is always kept, idle or not, because waiting
+    there is part of a request's latency; other threads are only kept while
+    busy. Samples while several requests run at once are shared by all of
+    their sessions, so concurrent requests show up in each other's profiles.
+    """
+
+    def __init__(self, interval: float, loop_thread_id: int = None):
+        self.interval = interval
+        self.loop_thread_id = loop_thread_id
+        self._sessions = set()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._labels = {}
+        self._roots = _path_roots()
+
+    def start_session(self) -> ProfileSession:
+        session = ProfileSession()
+        with self._condition:
+            self._sessions.add(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return session
+
+    def stop_session(self, session: ProfileSession):
+        with self._condition:
+            self._sessions.discard(session)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            for root in self._roots:
+                if path.startswith(root):
+                    path = path[len(root):]
+                    break
+            # ';' separates frames in the folded format
+            label = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(';', ':')
+            self._labels[code] = label
+        return label
+
+    def _is_idle(self, frame) -> bool:
+        return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+    def sample(self) -> list:
+        """Folded stacks of the threads worth keeping right now"""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (thread_id != self.loop_thread_id and self._is_idle(frame)):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, f'thread-{thread_id}'))
+            stacks.append(';'.join(reversed(labels)))
+        return stacks
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._sessions:
+                    self._condition.wait()
+            stacks = self.sample()
+            # Under the lock, so a session never changes after stop_session returns
+            with self._condition:
+                for session in self._sessions:
+                    session.stacks.update(stacks)
+                    session.ticks += 1
+            time.sleep(self.interval)
+
+
+class ProfileStore:
+    """Bounded on-disk ring of profiles: <id>.folded plus <id>.json metadata, oldest dropped first"""
+
+    def __init__(self, directory: str, max_profiles: int = 200):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        os.makedirs(directory, exist_ok=True)
+
+    def _ids(self) -> list:
+        """Stored profile ids, oldest first (ids start with a zero-padded timestamp)"""
+        return sorted(name[:-len(META_SUFFIX)] for name in os.listdir(self.directory) if name.endswith(META_SUFFIX))
+
+    def save(self, profile_id: str, stacks: Counter, meta: dict):
+        folded = ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+        base = os.path.join(self.directory, profile_id)
+        with open(base + PROFILE_SUFFIX, 'w') as f:
+            f.write(folded)
+        # Metadata last: a profile is only listed once both files exist
+        tmp_path = base + META_SUFFIX + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, base + META_SUFFIX)
+        for old in self._ids()[:-self.max_profiles]:
+            for suffix in (META_SUFFIX, PROFILE_SUFFIX):
+                try:
+                    os.remove(os.path.join(self.directory, old + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list(self, route: str = None, limit: int = 100) -> list:
+        """Metadata of stored profiles, newest first"""
+        profiles = []
+        for profile_id in reversed(self._ids()):
+            try:
+                with open(os.path.join(self.directory, profile_id + META_SUFFIX)) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if route is None or meta.get('route') == route:
+                profiles.append(meta)
+                if len(profiles) >= limit:
+                    break
+        return profiles
+
+    def path(self, profile_id: str):
+        """Folded-stack file of a profile, or None (ids are checked so they cannot escape the directory)"""
+        if not profile_id or not set(profile_id) <= PROFILE_ID_CHARACTERS:
+            return None
+        path = os.path.join(self.directory, profile_id + PROFILE_SUFFIX)
+        return path if os.path.exists(path) else None
+
+    def merged(self, route: str = None, limit: int = 100) -> str:
+        """Folded stacks of the newest `limit` profiles added together"""
+        total = Counter()
+        for meta in self.list(route, limit):
+            path = self.path(meta['id'])
+            if path is None:
+                continue
+            with open(path) as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if stack:
+                        total[stack] += int(count)
+        return ''.join(f'{stack} {count}\n' for stack, count in total.most_common())
+
+
+class Profiler:
+    """Which requests to profile, the shared sampler and where profiles go"""
+
+    def __init__(self, directory: str, sample_rate: float = 0.01, interval_ms: float = 1.0,
+                 max_profiles: int = 200, paths: tuple = ('/predict', '/batch-predict'),
+                 header: str = 'x-profile', admin_token: str = None):
+        self.sample_rate = sample_rate
+        self.interval_ms = interval_ms
+        self.paths = frozenset(paths)
+        self.header = header.lower().encode('latin-1')
+        self.admin_token = admin_token
+        self.store = ProfileStore(directory, max_profiles)
+        # Profiles are written off the request path, one at a time
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profile-writer')
+        self.sampler = None
+        self.profiled = 0
+        self.by_header = 0
+
+    @classmethod
+    def from_env(cls, model_dir: str) -> 'Profiler':
+        """Build a profiler from PROFILE_* environment variables"""
+        return cls(
+            directory=os.getenv("PROFILE_DIR", os.path.join(model_dir, "profiles")),
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0.01")),
+            interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "1")),
+            max_profiles=int(os.getenv("PROFILE_MAX_FILES", "200")),
+            paths=tuple(p.strip() for p in os.getenv("PROFILE_PATHS", "/predict,/batch-predict").split(",") if p.strip()),
+            admin_token=os.getenv("PROFILE_ADMIN_TOKEN") or None,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "directory": self.store.directory,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval_ms,
+            "max_profiles": self.store.max_profiles,
+            "paths": sorted(self.paths),
+            "profiled": self.profiled,
+            "profiled_by_header": self.by_header,
+        }
+
+    def authorized(self, token: str, client_host: str = None) -> bool:
+        """Admin access: the PROFILE_ADMIN_TOKEN when one is set, otherwise loopback clients only"""
+        if self.admin_token:
+            return token is not None and hmac.compare_digest(token, self.admin_token)
+        return client_host in ('127.0.0.1', '::1', 'localhost')
+
+    def choose(self, scope) -> str:
+        """'header', 'sampled' or None for an incoming request"""
+        for name, value in scope.get("headers", ()):
+            if name == self.header:
+                client = scope.get("client")
+                if self.authorized(value.decode('latin-1'), client[0] if client else None):
+                    return 'header'
+                break
+        if scope["path"] in self.paths and self.sample_rate and random.random() < self.sample_rate:
+            return 'sampled'
+        return None
+
+    def start(self) -> ProfileSession:
+        if self.sampler is None:
+            # The first profiled request arrives on the event loop thread
+            self.sampler = StackSampler(self.interval_ms / 1000, threading.get_ident())
+        return self.sampler.start_session()
+
+    def stop(self, session: ProfileSession, profile_id: str, meta: dict):
+        """End the session and queue the profile to be written"""
+        self.sampler.stop_session(session)
+        meta["samples"] = session.ticks
+        self.profiled += 1
+        self.by_header += meta["reason"] == 'header'
+        self._writer.submit(self.store.save, profile_id, session.stacks, meta)
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware: profile the chosen requests and tag their responses with X-Profile-Id"""
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        reason = self.profiler.choose(scope) if scope["type"] == "http" else None
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        status = {"code": 500}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = dict(message, headers=[*message.get("headers", []),
+                                                 (b"x-profile-id", profile_id.encode())])
+            await send(message)
+
+        session = self.profiler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            duration = time.perf_counter() - start
+            self.profiler.stop(session, profile_id, {
+                "id": profile_id,
+                "created": time.time(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None) or scope["path"],
+                "status": status["code"],
+                "duration_ms": round(duration * 1000, 3),
+                "interval_ms": self.profiler.interval_ms,
+                "reason": reason,
+            })
@@ -0,0 +1,126 @@
+"""
+Shared HTTP client for the video-analysis provider
+One app-lifetime connection pool (keep-alive, HTTP/2 when the h2 package is
+installed) with separate connect/read timeouts and bounded, jittered
+retries on 429 and 5xx responses
+"""
+
+import asyncio
+import os
+import random
+
+import httpx
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ProviderClient:
+    """
+    Wraps one httpx.AsyncClient for the whole process.
+
+    post() retries a request up to max_retries times when the provider
+    answers 429/5xx or the connection cannot be opened, sleeping a random
+    time up to backoff_base * 2**attempt, or the provider's Retry-After,
+    never longer than backoff_max. Request bodies may be passed as a
+    factory so a streamed body can be regenerated for each attempt.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 20, max_keepalive: int = 20,
+                 keepalive_expiry: float = 30.0, connect_timeout: float = 5.0,
+                 read_timeout: float = 120.0, max_retries: int = 2, backoff_base: float = 0.5,
+                 backoff_max: float = 8.0, http2: bool = True):
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # Uploads can be large, so writes get the same allowance as reads
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout, read=read_timeout, write=read_timeout, pool=connect_timeout
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.http2 = http2 and http2_available()
+        self._client = None
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls) -> 'ProviderClient':
+        """Build a client from AI_PROVIDER_* environment variables"""
+        return cls(
+            base_url=os.getenv("AI_PROVIDER_BASE_URL", "https://aipipe.org/geminiv1beta"),
+            max_connections=int(os.getenv("AI_PROVIDER_MAX_CONNECTIONS", "20")),
+            max_keepalive=int(os.getenv("AI_PROVIDER_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("AI_PROVIDER_KEEPALIVE_EXPIRY", "30")),
+            connect_timeout=float(os.getenv("AI_PROVIDER_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("AI_PROVIDER_READ_TIMEOUT", "120")),
+            max_retries=int(os.getenv("AI_PROVIDER_MAX_RETRIES", "2")),
+            backoff_base=float(os.getenv("AI_PROVIDER_BACKOFF_BASE", "0.5")),
+            backoff_max=float(os.getenv("AI_PROVIDER_BACKOFF_MAX", "8")),
+            http2=os.getenv("AI_PROVIDER_HTTP2", "1") == "1",
+        )
+
+    def start(self):
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url, limits=self.limits, timeout=self.timeout, http2=self.http2
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+    def _backoff(self, attempt: int, response: httpx.Response = None) -> float:
+        """Full-jitter exponential backoff, or the provider's Retry-After (both capped at backoff_max)"""
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.backoff_max, float(retry_after))
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def post(self, path: str, headers: dict = None, content=None, json=None) -> httpx.Response:
+        """POST to base_url + path with retries; content may be a callable returning a fresh body"""
+        if self._client is None:
+            raise RuntimeError("Provider client not started")
+
+        self.requests += 1
+        for attempt in range(self.max_retries + 1):
+            body = content() if callable(content) else content
+            try:
+                response = await self._client.post(path, headers=headers, content=body, json=json)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                # Nothing reached the provider, so trying again is safe
+                if attempt == self.max_retries:
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                if response.status_code >= 400:
+                    self.failures += 1
+                return response
+            self.retries += 1
+            await asyncio.sleep(self._backoff(attempt, response))
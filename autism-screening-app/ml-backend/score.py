@@ -0,0 +1,325 @@
+"""
+Chunked batch scoring of screening CSVs
+Reads the input in fixed-size row chunks, scores each chunk vectorized
+(optionally on a process pool), appends the results to the output as it goes
+and checkpoints progress so an interrupted run resumes where it stopped
+"""
+
+import argparse
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from inference import _init_worker, _call_in_worker
+from model_registry import resolve_model_dir
+from score_table import model_fingerprint
+from serving import load_serving_model, score_rows
+
+DEFAULT_CHUNK_SIZE = 50_000
+PROGRESS_SUFFIX = '.progress.json'
+
+# Output column sets
+LAYOUTS = {
+    'detailed': ['ID', 'Prediction', 'Probability', 'Risk_Level', 'AQ10_Total', 'Social_Score', 'Attention_Score'],
+    'submission': ['ID', 'Class/ASD'],
+}
+
+
+def recompute_result(df: pd.DataFrame) -> pd.DataFrame:
+    """Replace result with the AQ-10 answer count (what generate_submission has always scored)"""
+    df['result'] = df[[f'A{i}_Score' for i in range(1, 11)]].sum(axis=1)
+    return df
+
+
+def detect_line_terminator(path: str) -> bytes:
+    """The header's line ending: \r\n, \n or bare \r (the bundled test.csv uses the last)"""
+    with open(path, 'rb') as f:
+        head = f.read(1 << 16)
+    ends = [i for i in (head.find(b'\r'), head.find(b'\n')) if i >= 0]
+    if not ends:
+        return b'\n'
+    end = min(ends)
+    if head[end:end + 2] == b'\r\n':
+        return b'\r\n'
+    return head[end:end + 1]
+
+
+def _lines(f, terminator: bytes, block_size: int = 1 << 20):
+    pending = b''
+    while True:
+        block = f.read(block_size)
+        if not block:
+            if pending:
+                yield pending
+            return
+        parts = (pending + block).split(terminator)
+        pending = parts.pop()
+        for part in parts:
+            yield part + terminator
+
+
+def read_chunks(path: str, chunk_size: int, offset: int = None):
+    """
+    Yield (header, data, rows, end offset) for chunk_size-line slices of a CSV.
+
+    Chunks are raw bytes split on line boundaries, so parsing happens in the
+    scoring workers and the end offset is a byte position to resume from.
+    Quoted fields must not contain newlines.
+    """
+    terminator = detect_line_terminator(path)
+    with open(path, 'rb') as f:
+        lines = _lines(f, terminator)
+        header = next(lines, b'')
+        position = len(header)
+        if offset is not None and offset != position:
+            f.seek(offset)
+            lines = _lines(f, terminator)
+            position = offset
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                return
+            data = b''.join(chunk)
+            position += len(data)
+            yield header, data, len(chunk), position
+
+
+def score_chunk(model_artifacts: dict, header: bytes, data: bytes, first_row: int = 0, prepare=None) -> pd.DataFrame:
+    """Parse, engineer and score one chunk; returns every column any layout needs"""
+    from train import engineer_features
+
+    df = pd.read_csv(io.BytesIO(header + data))
+    if prepare is not None:
+        df = prepare(df)
+    features = engineer_features(df)
+    probabilities, _ = score_rows(model_artifacts, features[model_artifacts['feature_cols']].values)
+    predictions = (probabilities >= 0.5).astype(int)
+    ids = df['ID'] if 'ID' in df.columns else pd.RangeIndex(first_row + 1, first_row + len(df) + 1)
+    return pd.DataFrame({
+        'ID': np.asarray(ids),
+        'Prediction': predictions,
+        'Probability': probabilities,
+        'Risk_Level': pd.cut(probabilities, bins=[0, 0.3, 0.6, 1.0], labels=['Low', 'Medium', 'High']),
+        'AQ10_Total': features['aq10_total'].to_numpy(),
+        'Social_Score': features['social_score'].to_numpy(),
+        'Attention_Score': features['attention_score'].to_numpy(),
+        'Class/ASD': predictions,
+    })
+
+
+class ChunkWriter:
+    """Appends scored chunks to one output: a CSV file or a directory of Parquet parts"""
+
+    def __init__(self, path: str, layout: str, output_format: str = 'csv'):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown output layout: {layout}")
+        if output_format not in ('csv', 'parquet'):
+            raise ValueError(f"Unknown output format: {output_format}")
+        if output_format == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+        self.path = path
+        self.columns = LAYOUTS[layout]
+        self.output_format = output_format
+        self._file = None
+
+    def open(self, resume_size: int = None, resume_chunks: int = 0):
+        """Start fresh, or roll back to the size / part count recorded in the last checkpoint"""
+        if self.output_format == 'parquet':
+            os.makedirs(self.path, exist_ok=True)
+            for name in os.listdir(self.path):
+                if name.startswith('part-') and int(name[5:10]) >= resume_chunks:
+                    os.remove(os.path.join(self.path, name))
+            return
+        self._file = open(self.path, 'r+b' if resume_size is not None else 'wb')
+        if resume_size is not None:
+            self._file.truncate(resume_size)
+            self._file.seek(resume_size)
+
+    def write(self, index: int, chunk: pd.DataFrame):
+        frame = chunk[self.columns]
+        if self.output_format == 'parquet':
+            part = os.path.join(self.path, f'part-{index:05d}.parquet')
+            frame.to_parquet(part + '.tmp', index=False)
+            os.replace(part + '.tmp', part)
+            return
+        self._file.write(frame.to_csv(index=False, header=self._file.tell() == 0).encode())
+
+    def sync(self) -> int:
+        """Flush to disk before a checkpoint; returns the committed size"""
+        if self._file is None:
+            return 0
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _save_progress(path: str, state: dict):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+
+def score_file(input_path: str, outputs: list, model_dir: str = 'models', chunk_size: int = DEFAULT_CHUNK_SIZE,
+               workers: int = 1, output_format: str = 'csv', prepare=None, resume: bool = True,
+               progress: bool = True, engine: str = 'lightgbm') -> dict:
+    """
+    Score input_path chunk by chunk into outputs, a list of (path, layout) pairs.
+
+    After each chunk the outputs are fsynced and a checkpoint is written next
+    to the first output; with resume=True a later run for the same input,
+    model and settings rolls the outputs back to that checkpoint and carries
+    on from the recorded input offset. At most 2 * workers chunks are in
+    flight, so memory stays bounded by chunk_size. The checkpoint is removed
+    once the run completes. The model version is pinned at the start, so a
+    CURRENT switch mid-run does not mix versions.
+    """
+    model_dir = resolve_model_dir(model_dir)
+    writers = [ChunkWriter(path, layout, output_format) for path, layout in outputs]
+    progress_path = outputs[0][0].rstrip('/') + PROGRESS_SUFFIX
+    source = os.stat(input_path)
+    job = {
+        'input': os.path.abspath(input_path), 'input_size': source.st_size, 'input_mtime': source.st_mtime,
+        'model': model_fingerprint(model_dir), 'chunk_size': chunk_size, 'format': output_format,
+        'outputs': [[os.path.abspath(path), layout] for path, layout in outputs],
+        'prepare': getattr(prepare, '__qualname__', None),
+    }
+
+    state = None
+    if resume and os.path.exists(progress_path):
+        with open(progress_path, 'r') as f:
+            state = json.load(f)
+        if state['job'] != job:
+            print("Checkpoint is for a different input, model or settings; starting over", file=sys.stderr)
+            state = None
+    if state is None:
+        state = {'job': job, 'chunks': 0, 'rows': 0, 'offset': None, 'output_bytes': None,
+                 'positives': 0, 'probability_sum': 0.0, 'probability_min': None, 'probability_max': None}
+    elif progress:
+        print(f"Resuming after {state['chunks']} chunks ({state['rows']:,} rows)", file=sys.stderr)
+
+    for i, writer in enumerate(writers):
+        writer.open(state['output_bytes'][i] if state['output_bytes'] else None, state['chunks'])
+
+    pool = None
+    model_artifacts = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker, initargs=(model_dir, {'engine': engine})
+        )
+    else:
+        model_artifacts = load_serving_model(model_dir, engine=engine)
+
+    start = time.perf_counter()
+    resumed_rows = state['rows']
+
+    def commit(chunk: pd.DataFrame, end_offset: int):
+        for writer in writers:
+            writer.write(state['chunks'], chunk)
+        probabilities = chunk['Probability'].to_numpy()
+        state['chunks'] += 1
+        state['rows'] += len(chunk)
+        state['offset'] = end_offset
+        state['output_bytes'] = [writer.sync() for writer in writers]
+        state['positives'] += int(chunk['Prediction'].sum())
+        state['probability_sum'] += float(probabilities.sum())
+        if len(probabilities):
+            low, high = float(probabilities.min()), float(probabilities.max())
+            state['probability_min'] = low if state['probability_min'] is None else min(state['probability_min'], low)
+            state['probability_max'] = high if state['probability_max'] is None else max(state['probability_max'], high)
+        _save_progress(progress_path, state)
+        if progress:
+            rate = (state['rows'] - resumed_rows) / max(time.perf_counter() - start, 1e-9)
+            print(f"\r{state['rows']:,} rows ({end_offset / max(source.st_size, 1):.0%}) "
+                  f"{rate:,.0f} rows/s", end='', file=sys.stderr, flush=True)
+
+    try:
+        first_row = state['rows']
+        pending = deque()
+        for header, data, rows, end_offset in read_chunks(input_path, chunk_size, state['offset']):
+            if pool is None:
+                commit(score_chunk(model_artifacts, header, data, first_row, prepare), end_offset)
+            else:
+                pending.append((pool.submit(_call_in_worker, score_chunk, header, data, first_row, prepare),
+                                end_offset))
+                if len(pending) >= 2 * workers:
+                    future, offset = pending.popleft()
+                    commit(future.result(), offset)
+            first_row += rows
+        while pending:
+            future, offset = pending.popleft()
+            commit(future.result(), offset)
+    finally:
+        for writer in writers:
+            writer.close()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    seconds = time.perf_counter() - start
+    scored = state['rows'] - resumed_rows
+    if progress:
+        print(file=sys.stderr)
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    return {
+        'rows': state['rows'],
+        'chunks': state['chunks'],
+        'positives': state['positives'],
+        'probability_min': state['probability_min'],
+        'probability_max': state['probability_max'],
+        'probability_mean': state['probability_sum'] / state['rows'] if state['rows'] else None,
+        'seconds': seconds,
+        'rows_per_sec': scored / seconds if seconds else 0.0,
+        'resumed_rows': resumed_rows,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score a screening CSV in chunks')
+    parser.add_argument('input', help='CSV with the training columns (Class/ASD not required)')
+    parser.add_argument('-o', '--output', default='scores.csv', help='Output file (directory for parquet)')
+    parser.add_argument('--layout', choices=sorted(LAYOUTS), default='detailed')
+    parser.add_argument('--submission', metavar='PATH', help='Also write ID,Class/ASD to PATH')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1, help='Scoring processes')
+    parser.add_argument('--engine', choices=['lightgbm', 'compiled'], default='lightgbm',
+                        help='compiled: numpy tree evaluator from tree_engine.py')
+    parser.add_argument('--recompute-result', action='store_true',
+                        help='Score result as the AQ-10 answer count, like generate_submission.py')
+    parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+    parser.add_argument('--quiet', action='store_true', help='No progress line')
+    args = parser.parse_args()
+
+    outputs = [(args.output, args.layout)]
+    if args.submission:
+        outputs.append((args.submission, 'submission'))
+    summary = score_file(
+        args.input, outputs, model_dir=args.model_dir, chunk_size=args.chunk_size, workers=args.workers,
+        output_format=args.format, prepare=recompute_result if args.recompute_result else None,
+        resume=not args.restart, progress=not args.quiet, engine=args.engine
+    )
+    print(f"Scored {summary['rows']:,} rows in {summary['chunks']} chunks -> {', '.join(p for p, _ in outputs)}")
+    print(f"{summary['rows_per_sec']:,.0f} rows/s over {summary['seconds']:.1f}s"
+          + (f" (resumed after {summary['resumed_rows']:,} rows)" if summary['resumed_rows'] else ""))
+    if summary['rows']:
+        print(f"Predicted ASD: {summary['positives']:,} ({summary['positives'] / summary['rows']:.1%}), "
+              f"mean probability {summary['probability_mean']:.3f}")
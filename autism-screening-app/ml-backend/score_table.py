@@ -0,0 +1,260 @@
+"""
+Precomputed score table over the discrete screening input space
+The ten AQ-10 answers and the categorical encodings take only a handful of
+values, so the model output can be tabulated over all of them once. Age is
+bucketed between the model's own split thresholds, so every age in a bucket
+takes the same path through every tree, and result is tabulated as the
+screening form sends it (the AQ-10 total). Table cells are therefore exact;
+rows with any other result fall back to the live model. Serving becomes an
+array lookup on a memory-mapped table
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from features import (
+    AQ10_FEATURES, SOCIAL_FEATURES, ATTENTION_FEATURES, AGE_BINS, ETHNICITY_MAP,
+    FeatureEncoder, encode_age_group
+)
+from tree_engine import fold_thresholds
+
+logger = logging.getLogger(__name__)
+
+TABLE_FILE = 'score_table.npy'
+META_FILE = 'score_table.json'
+# Bumped when the table layout changes; tables of another format are rebuilt, not served
+TABLE_FORMAT = 2
+
+# Discrete axes of the table (encoded feature name, number of values)
+CATEGORICAL_AXES = [
+    ('gender_encoded', 2),
+    ('jaundice_encoded', 2),
+    ('autism_family_encoded', 2),
+    ('used_app_encoded', 2),
+    ('ethnicity_encoded', len(ETHNICITY_MAP)),
+]
+
+
+def model_fingerprint(model_dir: str) -> str:
+    """Hash of the model and scaler files the table was built from"""
+    digest = hashlib.sha256()
+    for name in ('model.pkl', 'scaler.pkl'):
+        with open(os.path.join(model_dir, name), 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def split_thresholds(booster, scaler, feature: int) -> np.ndarray:
+    """Every threshold the booster splits feature on, in raw (unscaled) units"""
+    thresholds = []
+
+    def walk(node: dict):
+        if 'split_index' in node:
+            if node['split_feature'] == feature:
+                thresholds.append(node['threshold'])
+            walk(node['left_child'])
+            walk(node['right_child'])
+
+    for tree in booster.dump_model()['tree_info']:
+        walk(tree['tree_structure'])
+    thresholds = np.unique(np.asarray(thresholds, dtype=np.float64))
+    return fold_thresholds(np.full(len(thresholds), feature), thresholds, scaler.mean_, scaler.scale_)
+
+
+def bucket_edges(thresholds: np.ndarray, lower: float, upper: float, required: list = ()) -> np.ndarray:
+    """
+    Edges spanning (lower, upper] at every split threshold and required edge.
+    A split sends x <= threshold left, so the values of one bucket
+    (edges[i], edges[i + 1]] all take the same branch at every split
+    """
+    edges = np.unique(np.concatenate([[lower, upper], thresholds, required]))
+    return edges[(edges >= lower) & (edges <= upper)]
+
+
+class ScoreTable:
+    """Memory-mapped probability table indexed by the encoded feature row"""
+
+    def __init__(self, table: np.ndarray, meta: dict, feature_cols: list):
+        self.table = table
+        self.meta = meta
+        self.age_edges = np.asarray(meta['age_edges'])
+        index = FeatureEncoder(feature_cols).index
+        self._aq_idx = [index[feat] for feat in AQ10_FEATURES]
+        self._aq_weights = 1 << np.arange(len(AQ10_FEATURES))
+        self._cat_idx = [index[feat] for feat, _ in CATEGORICAL_AXES]
+        self._age_idx = index['age']
+        self._result_idx = index['result']
+        self._total_idx = index['aq10_total']
+
+    def lookup(self, X: np.ndarray):
+        """Return (probabilities, in_grid) for encoded rows; out-of-grid rows are NaN"""
+        aq = X[:, self._aq_idx]
+        aq_code = (aq.astype(np.int64) * self._aq_weights).sum(axis=1)
+        cats = X[:, self._cat_idx].astype(np.int64)
+        # Bucket i holds values in (edges[i], edges[i + 1]]
+        age_bucket = np.searchsorted(self.age_edges, X[:, self._age_idx], side='left') - 1
+
+        in_grid = (
+            ((aq == 0) | (aq == 1)).all(axis=1)
+            & (age_bucket >= 0) & (age_bucket < len(self.age_edges) - 1)
+            & (X[:, self._result_idx] == X[:, self._total_idx])
+        )
+        for axis, (_, size) in enumerate(CATEGORICAL_AXES):
+            in_grid &= (cats[:, axis] >= 0) & (cats[:, axis] < size)
+
+        probabilities = np.full(len(X), np.nan)
+        if in_grid.any():
+            coords = (aq_code[in_grid], *cats[in_grid].T, age_bucket[in_grid])
+            probabilities[in_grid] = self.table[coords]
+        return probabilities, in_grid
+
+
+def grid_rows(encoder: FeatureEncoder, aq_codes: np.ndarray, age_reps: np.ndarray) -> np.ndarray:
+    """Encoded rows for every table cell of the given AQ codes, in table order"""
+    cat_values = [np.arange(size) for _, size in CATEGORICAL_AXES]
+    axes = np.meshgrid(aq_codes, *cat_values, np.arange(len(age_reps)), indexing='ij')
+    axes = [axis.ravel() for axis in axes]
+    aq_code, cats, age_bucket = axes[0], axes[1:-1], axes[-1]
+
+    index = encoder.index
+    X = np.empty((len(aq_code), len(encoder.feature_cols)), dtype=np.float64)
+    bits = (aq_code[:, None] >> np.arange(len(AQ10_FEATURES))) & 1
+    for i, feat in enumerate(AQ10_FEATURES):
+        X[:, index[feat]] = bits[:, i]
+    X[:, index['aq10_total']] = bits.sum(axis=1)
+    X[:, index['social_score']] = X[:, [index[feat] for feat in SOCIAL_FEATURES]].sum(axis=1)
+    X[:, index['attention_score']] = X[:, [index[feat] for feat in ATTENTION_FEATURES]].sum(axis=1)
+    for (feat, _), values in zip(CATEGORICAL_AXES, cats):
+        X[:, index[feat]] = values
+    age_groups = np.array([encode_age_group(age) for age in age_reps])
+    X[:, index['age']] = age_reps[age_bucket]
+    X[:, index['age_group']] = age_groups[age_bucket]
+    X[:, index['result']] = X[:, index['aq10_total']]
+    return X
+
+
+def build_score_table(model_artifacts: dict, train_df, output_dir: str, model_dir: str,
+                      tolerance: float = 0.05, aq_chunk: int = 16, seed: int = 0) -> dict:
+    """Tabulate the model over the discrete grid, validate it and write it next to the model"""
+    import pandas as pd
+    from train import engineer_features
+
+    model = model_artifacts['model']
+    if not hasattr(model, 'booster_'):
+        # Age buckets come from the trees' split thresholds
+        raise ValueError("Score tables need a LightGBM model")
+    scaler = model_artifacts['scaler']
+    feature_cols = model_artifacts['feature_cols']
+    encoder = FeatureEncoder(feature_cols)
+
+    thresholds = split_thresholds(model.booster_, scaler, encoder.index['age'])
+    age_edges = bucket_edges(thresholds, AGE_BINS[0], AGE_BINS[-1], required=AGE_BINS[1:-1])
+    # Any age in a bucket scores the same; its upper edge is in it
+    age_reps = age_edges[1:]
+
+    n_codes = 1 << len(AQ10_FEATURES)
+    shape = (n_codes, *[size for _, size in CATEGORICAL_AXES], len(age_reps))
+    os.makedirs(output_dir, exist_ok=True)
+    table_path = os.path.join(output_dir, TABLE_FILE)
+    tmp_path = table_path + '.tmp'
+    # float64, so a cell holds exactly the probability the live model returns
+    table = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64, shape=shape)
+
+    cells_per_code = int(np.prod(shape[1:]))
+    for start in range(0, n_codes, aq_chunk):
+        codes = np.arange(start, min(start + aq_chunk, n_codes))
+        X = grid_rows(encoder, codes, age_reps)
+        probabilities = model.predict_proba(scaler.transform(X))[:, 1]
+        table[codes[0]:codes[-1] + 1] = probabilities.reshape(len(codes), *shape[1:])
+        print(f"  tabulated AQ codes {codes[0]}-{codes[-1]} ({len(codes) * cells_per_code} cells)")
+    table.flush()
+    del table
+
+    # Check the table against the live model on the training rows as the screening form sends them
+    # (result is the AQ-10 total), at their own ages and at random ones
+    meta = {
+        'format': TABLE_FORMAT,
+        'shape': list(shape),
+        'feature_cols': feature_cols,
+        'age_edges': age_edges.tolist(),
+        'result': 'aq10_total',
+        'model_fingerprint': model_fingerprint(model_dir),
+    }
+    lookup = ScoreTable(np.load(tmp_path, mmap_mode='r'), meta, feature_cols)
+    form_df = train_df.assign(result=train_df[AQ10_FEATURES].sum(axis=1))
+    random_ages = np.random.default_rng(seed).uniform(AGE_BINS[0], AGE_BINS[-1], len(train_df))
+    check_df = pd.concat([form_df, form_df.assign(age=np.maximum(random_ages, 1e-3))], ignore_index=True)
+    X_check = engineer_features(check_df)[feature_cols].values
+    live = model.predict_proba(scaler.transform(X_check))[:, 1]
+    tabled, in_grid = lookup.lookup(X_check)
+    errors = np.abs(tabled[in_grid] - live[in_grid])
+    meta['validation'] = {
+        'rows': int(len(X_check)),
+        'in_grid': int(in_grid.sum()),
+        'max_abs_error': float(errors.max()) if len(errors) else float('inf'),
+        'mean_abs_error': float(errors.mean()) if len(errors) else float('inf'),
+        'decision_agreement': float(((tabled[in_grid] >= 0.5) == (live[in_grid] >= 0.5)).mean()),
+        'tolerance': tolerance,
+    }
+    meta['validation']['passed'] = meta['validation']['max_abs_error'] <= tolerance
+
+    os.replace(tmp_path, table_path)
+    with open(os.path.join(output_dir, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"Score table saved to {table_path} ({os.path.getsize(table_path) / 1e6:.1f} MB)")
+    print(f"Validation: {meta['validation']}")
+    return meta
+
+
+def load_score_table(model_dir: str, feature_cols: list, tolerance: float = 0.05):
+    """Load the table if it exists, matches the current model and is within tolerance"""
+    meta_path = os.path.join(model_dir, META_FILE)
+    table_path = os.path.join(model_dir, TABLE_FILE)
+    if not (os.path.exists(meta_path) and os.path.exists(table_path)):
+        logger.warning("Score table not found, using the live model. Run score_table.py to build it.")
+        return None
+
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+
+    if meta.get('format') != TABLE_FORMAT:
+        logger.warning("Score table has an old layout, using the live model. Run score_table.py to rebuild it.")
+        return None
+    if meta['feature_cols'] != list(feature_cols):
+        logger.warning("Score table was built for different feature columns, using the live model")
+        return None
+    if meta['model_fingerprint'] != model_fingerprint(model_dir):
+        logger.warning("Score table is stale (model changed since it was built), using the live model")
+        return None
+    max_error = meta['validation']['max_abs_error']
+    if max_error > tolerance:
+        logger.warning("Score table error %.4f exceeds tolerance %s, using the live model", max_error, tolerance)
+        return None
+
+    return ScoreTable(np.load(table_path, mmap_mode='r'), meta, feature_cols)
+
+
+if __name__ == '__main__':
+    import pandas as pd
+    from train import load_model
+
+    parser = argparse.ArgumentParser(description='Build the precomputed score table')
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--data', default='../../dataset/train.csv')
+    parser.add_argument('--tolerance', type=float, default=0.05)
+    args = parser.parse_args()
+
+    from model_registry import resolve_model_dir
+
+    # The table belongs to one model, so it is written into that version's directory
+    model_dir = resolve_model_dir(args.model_dir)
+    build_score_table(
+        load_model(model_dir), pd.read_csv(args.data), model_dir, model_dir, tolerance=args.tolerance
+    )
@@ -0,0 +1,169 @@
+"""
+Pre-fork production launcher for the API
+Imports api and loads the current model once in this process, then forks
+worker processes that inherit both copy-on-write and accept on one shared
+socket, so every extra worker costs its own heap rather than another copy of
+LightGBM, the model and the knowledge base index. There is no reload mode
+here; `python api.py` stays the development server
+"""
+
+import argparse
+import gc
+import logging
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+# Set before LightGBM is imported: the workers already spread over the cores, and an OpenMP
+# thread pool started by the warm-up here would not exist in the forked workers
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+# Every worker follows models/CURRENT, so a reload sent to one worker reaches all of them
+os.environ.setdefault("MODEL_WATCH", "1")
+
+import uvicorn
+from uvicorn.config import STARTUP_FAILURE
+
+from metrics import clear_snapshots
+
+logger = logging.getLogger("serve")
+
+
+class PreforkServer:
+    """
+    Forks `workers` uvicorn servers for one app on one listening socket and
+    replaces any that exit while it runs.
+
+    Workers get their own process group, so Ctrl+C reaches only this process,
+    which then stops them with one SIGTERM each (uvicorn's graceful shutdown).
+    """
+
+    def __init__(self, config: uvicorn.Config, workers: int, graceful_timeout: float = 30.0):
+        self.config = config
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.socket = None
+        self.children = {}
+        self.restarts = 0
+        self._should_exit = threading.Event()
+
+    def spawn(self, index: int) -> int:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return pid
+
+        # Worker process
+        os.setpgid(0, 0)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, signal.SIG_DFL)
+        # Labels this worker's metrics snapshot and stats; a replacement takes over the same index
+        os.environ["SERVE_WORKER"] = str(index)
+        server = uvicorn.Server(self.config)
+        try:
+            server.run(sockets=[self.socket])
+        except BaseException:
+            logger.exception("Worker failed", extra={"worker": index})
+        os._exit(0 if server.started else STARTUP_FAILURE)
+
+    def stop(self, *_):
+        self._should_exit.set()
+
+    def run(self) -> int:
+        """Fork the workers and supervise them until SIGINT/SIGTERM; returns the exit status"""
+        self.socket = self.config.bind_socket()
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        for index in range(self.workers):
+            self.spawn(index)
+        logger.info("Workers started", extra={
+            "workers": self.workers, "pids": sorted(self.children), "port": self.config.port
+        })
+
+        status = 0
+        while not self._should_exit.wait(0.5):
+            while self.children:
+                pid, wait_status = os.waitpid(-1, os.WNOHANG)
+                if not pid:
+                    break
+                index = self.children.pop(pid)
+                code = os.waitstatus_to_exitcode(wait_status)
+                if code == STARTUP_FAILURE:
+                    logger.error("Worker failed to start, shutting down", extra={"worker": index, "pid": pid})
+                    status = STARTUP_FAILURE
+                    self._should_exit.set()
+                    break
+                logger.warning("Worker exited, starting a new one", extra={"worker": index, "pid": pid, "code": code})
+                self.restarts += 1
+                self.spawn(index)
+
+        self.shutdown()
+        self.socket.close()
+        return status
+
+    def shutdown(self):
+        """SIGTERM every worker, then SIGKILL those still running after graceful_timeout"""
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+            if pid:
+                self.children.pop(pid, None)
+            else:
+                time.sleep(0.05)
+        for pid in self.children:
+            logger.warning("Worker did not stop in time, killing it", extra={"pid": pid})
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.children = {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument('--log-level', default='info')
+    parser.add_argument('--graceful-timeout', type=float, default=30.0,
+                        help='Seconds workers get to finish in-flight requests on shutdown')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    # Configures logging and reads the knowledge base index, once for all workers
+    import api
+    try:
+        version = api.preload_model()
+    except Exception as e:
+        # Workers start anyway and try to load the model themselves, like a single uvicorn process
+        version = None
+        logger.warning("Could not preload the model, workers will load it", extra={"error": str(e)})
+    # Objects that exist now are shared with every worker; keep the collector from touching (and copying) them
+    gc.collect()
+    gc.freeze()
+    logger.info("Preloaded API", extra={"version": version, "seconds": round(time.perf_counter() - start, 3)})
+
+    # Workers exchange metrics snapshots here so /metrics on any of them covers all (metrics.WorkerMetrics)
+    metrics_dir = os.getenv("METRICS_DIR")
+    if metrics_dir:
+        os.makedirs(metrics_dir, exist_ok=True)
+        clear_snapshots(metrics_dir)
+    else:
+        os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="asd-metrics-")
+
+    config = uvicorn.Config(api.app, host=args.host, port=args.port, log_level=args.log_level,
+                            reload=False, workers=1, lifespan='on')
+    server = PreforkServer(config, args.workers, graceful_timeout=args.graceful_timeout)
+    try:
+        status = server.run()
+    finally:
+        if not metrics_dir:
+            shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
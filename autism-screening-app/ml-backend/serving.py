@@ -0,0 +1,419 @@
+"""
+Serving-side model loading and prediction
+Imports only numpy at module load; the model itself is read from the compact
+serving artifact (LightGBM model text + scaler arrays) written by
+train.save_model, so the API never imports the training stack
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from drift import load_profile
+from features import AQ10_FEATURES, AQ10_QUESTIONS, FeatureEncoder
+from metrics import stage_timer
+from model_registry import resolve_model_dir
+
+logger = logging.getLogger(__name__)
+
+# Serving artifact files, written next to model.pkl by train.save_model
+BOOSTER_FILE = 'model.txt'
+SCALER_FILE = 'scaler.npz'
+
+# Scored by warm_up before a model is swapped in: all-zero and all-one answers, both engines' code paths
+WARMUP_INPUTS = [
+    {**{f'A{i}_Score': answer for i in range(1, 11)}, 'age': age, 'gender': gender, 'ethnicity': ethnicity,
+     'jaundice': 'no', 'austim': 'no', 'used_app_before': 'no', 'result': float(answer * 10)}
+    for answer, age, gender, ethnicity in ((0, 30.0, 'f', 'White-European'), (1, 8.0, 'm', '?'))
+]
+
+
+class ArrayScaler:
+    """StandardScaler.transform from saved mean/scale arrays (same float ops, same results)"""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    @classmethod
+    def from_scaler(cls, scaler) -> 'ArrayScaler':
+        n_features = scaler.n_features_in_
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+        return cls(np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64))
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+class BoosterModel:
+    """predict_proba/predict(pred_contrib=True) over a bare LightGBM Booster"""
+
+    def __init__(self, booster):
+        self.booster_ = booster
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        probability = self.booster_.predict(X)
+        return np.vstack((1.0 - probability, probability)).transpose()
+
+    def predict(self, X: np.ndarray, pred_contrib: bool = False) -> np.ndarray:
+        if pred_contrib:
+            return self.booster_.predict(X, pred_contrib=True)
+        return (self.booster_.predict(X) >= 0.5).astype(int)
+
+
+def get_risk_level(probability: float) -> str:
+    """Map a probability to its Low/Medium/High risk band"""
+    if probability < 0.3:
+        return "Low"
+    elif probability < 0.6:
+        return "Medium"
+    return "High"
+
+
+def get_encoder(model_artifacts: dict) -> FeatureEncoder:
+    """Get (building once if needed) the feature encoder for these artifacts"""
+    encoder = model_artifacts.get('encoder')
+    if encoder is None:
+        encoder = model_artifacts['encoder'] = FeatureEncoder(model_artifacts['feature_cols'])
+    return encoder
+
+
+def rank_feature_importance(feature_importance: dict) -> list:
+    """Global (feature, importance %) pairs, normalized to sum to 100 and sorted descending"""
+    total_importance = sum(feature_importance.values())
+    normalized_importance = {k: (v / total_importance) * 100 for k, v in feature_importance.items()}
+    return sorted(normalized_importance.items(), key=lambda x: x[1], reverse=True)
+
+
+def feature_label(feat: str) -> str:
+    """Human readable label for a feature column"""
+    if feat in AQ10_FEATURES:
+        return AQ10_QUESTIONS.get(feat, feat)
+    return feat.replace('_', ' ').title()
+
+
+def compute_contributions(model, X_scaled: np.ndarray):
+    """
+    Per-sample feature contributions in log-odds space, shape (n_samples, n_features).
+    Uses LightGBM's native SHAP output for boosters and coef * x for the
+    logistic path; returns None for models without either.
+    """
+    if hasattr(model, 'booster_'):
+        # Last column is the expected value (bias), not a feature
+        return model.predict(X_scaled, pred_contrib=True)[:, :-1]
+    
+    base_model = model
+    if hasattr(model, 'calibrated_classifiers_'):
+        calibrated = model.calibrated_classifiers_[0]
+        base_model = getattr(calibrated, 'estimator', None) or getattr(calibrated, 'base_estimator', None)
+    if hasattr(base_model, 'coef_'):
+        # Scaled features have zero training mean, so this is the linear SHAP value
+        return X_scaled * base_model.coef_[0]
+    return None
+
+
+def get_contributing_factors(model_artifacts: dict, X: np.ndarray, contributions=None, top_k: int = 5) -> list:
+    """Top contributing factors for each encoded row, per-sample when contributions are given"""
+    
+    feature_cols = model_artifacts['feature_cols']
+    
+    if contributions is None:
+        # Fall back to the global ranking computed once at load time
+        ranked = model_artifacts.get('ranked_importance')
+        if ranked is None:
+            ranked = model_artifacts['ranked_importance'] = rank_feature_importance(model_artifacts['feature_importance'])
+        encoder = get_encoder(model_artifacts)
+        top = [(feat, encoder.index[feat], imp) for feat, imp in ranked[:top_k]]
+        return [
+            [
+                {
+                    'feature': feat,
+                    'question': feature_label(feat),
+                    'value': int(row[idx]) if feat in AQ10_FEATURES else float(row[idx]),
+                    'importance': float(imp),
+                    # Global importance has no sign; same keys as the per-sample factors below
+                    'direction': 'neutral',
+                    'effect': 'important overall'
+                }
+                for feat, idx, imp in top
+            ]
+            for row in X
+        ]
+    
+    # Share of each row's total absolute contribution, as a percentage
+    magnitude = np.abs(contributions)
+    totals = magnitude.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1.0
+    importance = magnitude / totals * 100
+    top_indices = np.argsort(-magnitude, axis=1, kind='stable')[:, :top_k]
+    
+    factors = []
+    for row, row_contrib, row_importance, indices in zip(X, contributions, importance, top_indices):
+        row_factors = []
+        for idx in indices:
+            feat = feature_cols[idx]
+            row_factors.append({
+                'feature': feat,
+                'question': feature_label(feat),
+                'value': int(row[idx]) if feat in AQ10_FEATURES else float(row[idx]),
+                'importance': float(row_importance[idx]),
+                'contribution': float(row_contrib[idx]),
+                # direction is what the dashboard keys on; effect is the text it shows
+                'direction': 'positive' if row_contrib[idx] >= 0 else 'negative',
+                'effect': 'increases risk' if row_contrib[idx] >= 0 else 'decreases risk'
+            })
+        factors.append(row_factors)
+    return factors
+
+
+def score_rows(model_artifacts: dict, X: np.ndarray, explain: bool = False):
+    """
+    ASD probabilities (and optionally per-sample contributions) for encoded rows.
+    Probabilities come from the score table when one is loaded; contributions
+    still come from the model, so only explained requests pay for it there.
+    """
+    
+    model = model_artifacts['model']
+    scaler = model_artifacts['scaler']
+    score_table = model_artifacts.get('score_table')
+    
+    if score_table is not None:
+        # Table lookup, falling back to the live model for out-of-grid rows
+        with stage_timer('model'):
+            probabilities, in_grid = score_table.lookup(X)
+            if not in_grid.all():
+                probabilities[~in_grid] = model.predict_proba(scaler.transform(X[~in_grid]))[:, 1]
+        contributions = None
+        if explain:
+            with stage_timer('explain'):
+                contributions = compute_contributions(model, scaler.transform(X))
+        return probabilities, contributions
+    
+    with stage_timer('scale'):
+        X_scaled = scaler.transform(X)
+    with stage_timer('model'):
+        probabilities = model.predict_proba(X_scaled)[:, 1]
+    contributions = None
+    if explain:
+        with stage_timer('explain'):
+            contributions = compute_contributions(model, X_scaled)
+    return probabilities, contributions
+
+
+def predict(model_artifacts: dict, input_data: dict) -> dict:
+    """Make a prediction for a single sample"""
+    return predict_many(model_artifacts, [input_data])[0]
+
+
+def predict_many(model_artifacts: dict, inputs: list) -> list:
+    """Make full single-sample style predictions for many samples in one model call"""
+    
+    # Encode features straight into rows (same values as engineer_features)
+    encoder = get_encoder(model_artifacts)
+    with stage_timer('features'):
+        X = encoder.encode_many(inputs)
+    
+    # Scale, predict and explain
+    probabilities, contributions = score_rows(model_artifacts, X, explain=True)
+    with stage_timer('factors'):
+        contributing_factors = get_contributing_factors(model_artifacts, X, contributions)
+    
+    results = []
+    for row, probability, factors in zip(X, probabilities, contributing_factors):
+        results.append({
+            'prediction': int(probability >= 0.5),
+            'probability': float(probability),
+            'risk_level': get_risk_level(probability),
+            'contributing_factors': factors,
+            'aq10_total': int(row[encoder.index['aq10_total']]),
+            'social_score': int(row[encoder.index['social_score']]),
+            'attention_score': int(row[encoder.index['attention_score']])
+        })
+    
+    return results
+
+
+def score_matrix(model_artifacts: dict, X: np.ndarray, return_details: bool = False,
+                 explain: bool = False) -> dict:
+    """
+    Batch results for encoded rows as columns: prediction and probability
+    arrays, plus risk_level and the AQ-10 subtotals with return_details and
+    a contributing_factors list with explain
+    """
+    
+    # One scaler transform, one predict_proba (and one pred_contrib)
+    probabilities, contributions = score_rows(model_artifacts, X, explain=explain)
+    results = {
+        'prediction': (probabilities >= 0.5).astype(np.int64),
+        'probability': probabilities
+    }
+    
+    if return_details:
+        encoder = get_encoder(model_artifacts)
+        results['risk_level'] = np.select(
+            [probabilities < 0.3, probabilities < 0.6], ['Low', 'Medium'], default='High'
+        )
+        for feat in ('aq10_total', 'social_score', 'attention_score'):
+            results[feat] = X[:, encoder.index[feat]].astype(np.int64)
+    
+    if explain:
+        with stage_timer('factors'):
+            results['contributing_factors'] = get_contributing_factors(model_artifacts, X, contributions)
+    
+    return results
+
+
+def result_rows(results: dict) -> list:
+    """One dict per row from score_matrix columns (the /batch-predict JSON shape)"""
+    names = list(results)
+    columns = [values.tolist() if isinstance(values, np.ndarray) else values for values in results.values()]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def predict_batch(model_artifacts: dict, inputs: list, return_details: bool = False,
+                  explain: bool = False) -> list:
+    """Make predictions for many samples with one scaler and one model call"""
+    
+    encoder = get_encoder(model_artifacts)
+    
+    if not inputs:
+        return []
+    
+    with stage_timer('features'):
+        X = encoder.encode_many(inputs)
+    return result_rows(score_matrix(model_artifacts, X, return_details, explain))
+
+
+def predict_columns(model_artifacts: dict, columns: dict, return_details: bool = False,
+                    explain: bool = False, as_rows: bool = False):
+    """predict_batch for validated input columns (see columnar.py): score_matrix columns, or row dicts with as_rows"""
+    
+    encoder = get_encoder(model_artifacts)
+    with stage_timer('features'):
+        X = encoder.encode_columns(columns)
+    results = score_matrix(model_artifacts, X, return_details, explain)
+    return result_rows(results) if as_rows else results
+
+
+def warm_up(model_artifacts: dict) -> list:
+    """Score WARMUP_INPUTS through every serving path once, failing if the model returns invalid probabilities"""
+    results = predict_many(model_artifacts, WARMUP_INPUTS)
+    results += predict_batch(model_artifacts, WARMUP_INPUTS, return_details=True, explain=True)
+    probabilities = np.array([result['probability'] for result in results])
+    if not np.all((probabilities >= 0.0) & (probabilities <= 1.0)):
+        raise ValueError(f"Model returned invalid probabilities on the warm-up inputs: {probabilities.tolist()}")
+    return results
+
+
+def export_serving_artifact(model_artifacts: dict, output_dir: str) -> bool:
+    """Write model.txt + scaler.npz for LightGBM models; returns False for other model types"""
+    model = model_artifacts['model']
+    if not hasattr(model, 'booster_'):
+        return False
+    
+    model.booster_.save_model(os.path.join(output_dir, BOOSTER_FILE))
+    scaler = ArrayScaler.from_scaler(model_artifacts['scaler'])
+    np.savez(os.path.join(output_dir, SCALER_FILE), mean=scaler.mean_, scale=scaler.scale_)
+    return True
+
+
+def has_serving_artifact(model_dir: str) -> bool:
+    return all(os.path.exists(os.path.join(model_dir, name)) for name in (BOOSTER_FILE, SCALER_FILE))
+
+
+def serving_artifact_sha256(model_dir: str) -> str:
+    """Digest of model.txt + scaler.npz, identifying what derived caches were built from"""
+    digest = hashlib.sha256()
+    for name in (BOOSTER_FILE, SCALER_FILE):
+        with open(os.path.join(model_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def assemble_artifacts(model, scaler, model_dir: str, use_score_table: bool = False,
+                       score_table_tolerance: float = 0.05) -> dict:
+    """Build the model_artifacts dict around a loaded model and scaler"""
+    
+    with open(os.path.join(model_dir, 'feature_cols.json'), 'r') as f:
+        feature_cols = json.load(f)
+    
+    with open(os.path.join(model_dir, 'feature_importance.json'), 'r') as f:
+        feature_importance = json.load(f)
+    
+    score_table = None
+    if use_score_table:
+        from score_table import load_score_table
+        score_table = load_score_table(model_dir, feature_cols, tolerance=score_table_tolerance)
+    
+    return {
+        'model': model,
+        'scaler': scaler,
+        'feature_cols': feature_cols,
+        'feature_importance': feature_importance,
+        'ranked_importance': rank_feature_importance(feature_importance),
+        'encoder': FeatureEncoder(feature_cols),
+        'score_table': score_table,
+        'drift_profile': load_profile(model_dir)
+    }
+
+
+def load_serving_model(model_dir: str, use_score_table: bool = False,
+                       score_table_tolerance: float = 0.05, engine: str = 'lightgbm') -> dict:
+    """
+    Load model artifacts for serving from model.txt + scaler.npz.
+    LightGBM is imported here rather than at module load, and models
+    without a serving artifact (e.g. the logistic path) fall back to the
+    pickled training artifacts. engine='compiled' scores through
+    tree_engine with the scaler folded into the trees, reading the
+    compiled arrays memory-mapped from model_dir/compiled/. A versioned
+    model_dir is resolved to its CURRENT version.
+    """
+    if engine not in ('lightgbm', 'compiled'):
+        raise ValueError(f"Unknown inference engine: {engine}")
+    model_dir = resolve_model_dir(model_dir)
+    if not has_serving_artifact(model_dir):
+        logger.warning("Serving artifact not found, loading pickled model (run serving.py --export to create it)")
+        from train import load_model
+        return load_model(model_dir, use_score_table=use_score_table, score_table_tolerance=score_table_tolerance)
+    
+    import lightgbm as lgb
+    
+    booster = lgb.Booster(model_file=os.path.join(model_dir, BOOSTER_FILE))
+    with np.load(os.path.join(model_dir, SCALER_FILE)) as arrays:
+        scaler = ArrayScaler(arrays['mean'], arrays['scale'])
+    model = BoosterModel(booster)
+    
+    if engine == 'compiled':
+        from tree_engine import CompiledModel, FoldedScaler, load_or_compile
+        try:
+            # Compiled once per model and memory-mapped, so every worker serving it shares the arrays
+            trees = load_or_compile(booster, scaler, model_dir, serving_artifact_sha256(model_dir))
+            model, scaler = CompiledModel(booster, scaler, trees), FoldedScaler(scaler)
+        except ValueError as e:
+            logger.warning("Could not compile the model (%s), using LightGBM", e)
+    
+    return assemble_artifacts(
+        model, scaler, model_dir,
+        use_score_table=use_score_table, score_table_tolerance=score_table_tolerance
+    )
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Export the serving artifact for an existing model')
+    parser.add_argument('--export', metavar='MODEL_DIR', default='models')
+    args = parser.parse_args()
+    
+    from train import load_model
+    export_dir = resolve_model_dir(args.export)
+    if export_serving_artifact(load_model(export_dir), export_dir):
+        print(f"Serving artifact saved to {export_dir}")
+    else:
+        print("Model is not a LightGBM booster; it will be served from the pickle")
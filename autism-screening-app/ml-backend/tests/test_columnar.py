@@ -0,0 +1,80 @@
+"""Column-oriented /batch-predict validation against row-by-row pydantic validation"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from api import ScreeningInput, validate_batch_columns, validate_batch_inputs
+from columnar import ColumnarError, ColumnarValidator
+
+TRAIN_CSV = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'dataset', 'train.csv')
+INPUT_COLUMNS = [f'A{i}_Score' for i in range(1, 11)] + [
+    'age', 'gender', 'ethnicity', 'jaundice', 'austim', 'used_app_before', 'result'
+]
+
+
+@pytest.fixture(scope='module')
+def rows():
+    """Training rows plus rows that break each kind of field rule"""
+    valid = pd.read_csv(TRAIN_CSV)[INPUT_COLUMNS].head(200).to_dict('records')
+    broken = [
+        {'A1_Score': 2}, {'A2_Score': -1}, {'A3_Score': 0.5}, {'A4_Score': 'yes'}, {'A5_Score': None},
+        {'age': 0}, {'age': 100.5}, {'age': 'old'}, {'age': float('nan')}, {'age': True},
+        {'gender': 1}, {'jaundice': None}, {'result': 'high'}, {'A1_Score': 1.0}, {'age': '35'},
+        {'A6_Score': 3, 'age': -4, 'gender': None},
+    ]
+    for i, change in enumerate(broken):
+        valid.insert(7 * i, {**valid[i], **change})
+    return valid
+
+
+def as_columns(rows: list) -> dict:
+    return {name: [row[name] for row in rows] for name in rows[0]}
+
+
+def test_columns_validate_like_rows(rows):
+    row_indices, row_values, row_errors = validate_batch_inputs(rows)
+    indices, values, errors = validate_batch_columns(as_columns(rows), 0, len(rows))
+    assert indices == row_indices
+    assert errors == row_errors
+    assert len(errors) >= 13
+    for name in INPUT_COLUMNS:
+        assert [row[name] for row in row_values] == list(values[name]), name
+
+
+def test_chunks_report_absolute_positions(rows):
+    _, _, row_errors = validate_batch_inputs(rows, 30, 90)
+    _, _, errors = validate_batch_columns(as_columns(rows), 30, 90)
+    assert errors == row_errors
+
+
+def test_numpy_columns_validate_like_rows(rows):
+    clean = [row for row in rows if not validate_batch_inputs([row])[2]]
+    columns = {name: np.array(values) for name, values in as_columns(clean).items()}
+    columns['age'][3] = 150.0
+    columns['A2_Score'][5] = 4
+    expected = [{**row} for row in clean]
+    expected[3]['age'], expected[5]['A2_Score'] = 150.0, 4
+    _, _, row_errors = validate_batch_inputs(expected)
+    indices, _, errors = validate_batch_columns(columns, 0, len(clean))
+    assert errors == row_errors and sorted(errors) == [3, 5]
+    assert len(indices) == len(clean) - 2
+
+
+def test_optional_columns_take_the_model_defaults(rows):
+    columns = as_columns(rows[200:210])
+    for name in ('ethnicity', 'used_app_before', 'result'):
+        del columns[name]
+    _, values, _ = ColumnarValidator(ScreeningInput).validate(columns)
+    assert set(values['ethnicity']) == {'?'} and set(values['used_app_before']) == {'no'}
+    assert set(values['result']) == {0}
+
+
+def test_unusable_payloads_are_rejected():
+    validator = ColumnarValidator(ScreeningInput)
+    with pytest.raises(ColumnarError, match='Missing required'):
+        validator.count_rows({'age': [30]})
+    with pytest.raises(ColumnarError, match='different lengths'):
+        validator.count_rows({**{name: [0] for name in INPUT_COLUMNS}, 'age': [30, 40]})
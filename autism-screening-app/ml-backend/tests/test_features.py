@@ -0,0 +1,42 @@
+"""FeatureEncoder against the pandas feature pipeline used for training"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import FeatureEncoder
+from train import engineer_features, get_feature_columns
+
+TRAIN_CSV = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'dataset', 'train.csv')
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    """(training rows as input dicts, engineer_features matrix)"""
+    df = pd.read_csv(TRAIN_CSV)
+    return df.to_dict('records'), engineer_features(df)[get_feature_columns()].values
+
+
+def test_encode_matches_engineer_features_row_by_row(dataset):
+    records, expected = dataset
+    encoder = FeatureEncoder(get_feature_columns())
+    for record, row in zip(records, expected):
+        encoded = encoder.encode(record)
+        assert encoded.dtype == expected.dtype
+        assert np.array_equal(encoded, row)
+
+
+def test_encode_values_and_encode_many_match(dataset):
+    records, expected = dataset
+    encoder = FeatureEncoder(get_feature_columns())
+    assert np.array_equal(encoder.encode_many(records), expected)
+    assert np.array_equal(np.array([encoder.encode_values(record) for record in records]), expected)
+
+
+def test_encode_columns_matches(dataset):
+    records, expected = dataset
+    encoder = FeatureEncoder(get_feature_columns())
+    columns = {name: np.array([record[name] for record in records]) for name in records[0]}
+    assert np.array_equal(encoder.encode_columns(columns), expected)
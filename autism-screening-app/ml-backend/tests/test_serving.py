@@ -0,0 +1,63 @@
+"""Contributing factors returned by the serving paths"""
+
+import os
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from features import FeatureEncoder
+from serving import get_contributing_factors, predict_many
+from train import engineer_features, get_feature_columns
+
+TRAIN_CSV = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'dataset', 'train.csv')
+FACTOR_KEYS = {'feature', 'question', 'value', 'importance', 'direction', 'effect'}
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    """(training rows as input dicts, model_artifacts for a model trained like train.py)"""
+    df = pd.read_csv(TRAIN_CSV)
+    feature_cols = get_feature_columns()
+    X = engineer_features(df)[feature_cols].values.astype(np.float64)
+    scaler = StandardScaler().fit(X)
+    model = lgb.LGBMClassifier(n_estimators=50, max_depth=5, learning_rate=0.1, class_weight='balanced',
+                               random_state=42, verbose=-1)
+    model.fit(scaler.transform(X), df['Class/ASD'])
+    artifacts = {
+        'model': model,
+        'scaler': scaler,
+        'feature_cols': feature_cols,
+        'feature_importance': dict(zip(feature_cols, model.feature_importances_.astype(float))),
+        'encoder': FeatureEncoder(feature_cols),
+    }
+    return df.drop(columns=['Class/ASD']).head(20).to_dict('records'), artifacts
+
+
+def test_global_fallback_factors_have_the_per_sample_keys(dataset):
+    records, artifacts = dataset
+    X = artifacts['encoder'].encode_many(records)
+    for factors in get_contributing_factors(artifacts, X):
+        assert factors
+        for factor in factors:
+            assert FACTOR_KEYS <= set(factor)
+            assert factor['direction'] == 'neutral'
+
+
+class ConstantTable:
+    """Score table stand-in that has every row in its grid"""
+
+    def lookup(self, X: np.ndarray):
+        return np.full(len(X), 0.25), np.ones(len(X), dtype=bool)
+
+
+def test_score_table_keeps_per_sample_factors(dataset):
+    records, artifacts = dataset
+    live = predict_many(artifacts, records)
+    tabled = predict_many({**artifacts, 'score_table': ConstantTable()}, records)
+    for live_result, table_result in zip(live, tabled):
+        assert table_result['probability'] == 0.25
+        assert table_result['contributing_factors'] == live_result['contributing_factors']
+        assert all('contribution' in factor for factor in table_result['contributing_factors'])
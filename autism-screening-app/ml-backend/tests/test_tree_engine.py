@@ -0,0 +1,83 @@
+"""Compiled tree evaluator against LightGBM, bit for bit"""
+
+import os
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from train import engineer_features, get_feature_columns
+from tree_engine import CompiledModel, CompiledTrees
+
+TRAIN_CSV = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'dataset', 'train.csv')
+
+
+@pytest.fixture(scope='module')
+def fitted():
+    """(X, model, scaler) trained like train.py on the repo's training data"""
+    df = pd.read_csv(TRAIN_CSV)
+    X = engineer_features(df)[get_feature_columns()].values.astype(np.float64)
+    scaler = StandardScaler().fit(X)
+    model = lgb.LGBMClassifier(n_estimators=100, max_depth=5, learning_rate=0.1, class_weight='balanced',
+                               random_state=42, verbose=-1)
+    model.fit(scaler.transform(X), df['Class/ASD'])
+    return X, model, scaler
+
+
+def expected(fitted, rows: np.ndarray) -> np.ndarray:
+    _, model, scaler = fitted
+    return model.predict_proba(scaler.transform(rows))
+
+
+def test_training_and_perturbed_rows_match(fitted):
+    X, model, scaler = fitted
+    compiled = CompiledModel(model.booster_, scaler)
+    rng = np.random.default_rng(0)
+    rows = np.vstack([X, X + rng.normal(0, 0.5, X.shape), rng.normal(X.mean(axis=0), 4 * X.std(axis=0) + 1, X.shape)])
+    assert np.array_equal(compiled.predict_proba(rows), expected(fitted, rows))
+
+
+def test_rows_with_nan_match(fitted):
+    X, model, scaler = fitted
+    compiled = CompiledModel(model.booster_, scaler)
+    rows = X.copy()
+    rows[np.random.default_rng(1).random(X.shape) < 0.1] = np.nan
+    rows[0] = np.nan
+    assert np.array_equal(compiled.predict_proba(rows), expected(fitted, rows))
+
+
+def test_values_at_every_folded_threshold_match(fitted):
+    X, model, scaler = fitted
+    trees = CompiledTrees.from_booster(model.booster_, scaler)
+    split = np.isfinite(trees.threshold)
+    rows = []
+    for feature, threshold in zip(trees.feature[split], trees.threshold[split]):
+        for value in (np.nextafter(threshold, -np.inf), threshold, np.nextafter(threshold, np.inf)):
+            row = X[0].copy()
+            row[feature] = value
+            rows.append(row)
+    rows = np.array(rows)
+    assert np.array_equal(trees.predict_proba(rows), expected(fitted, rows))
+
+
+def test_traversal_without_tables_matches(fitted):
+    X, model, scaler = fitted
+    trees = CompiledTrees.from_booster(model.booster_, scaler)
+    walked = CompiledTrees(trees.feature, trees.threshold, trees.left, trees.right, trees.value, trees.roots,
+                           trees.max_depth, trees.n_features, trees.nan_fill, tables=None, build_tables=False)
+    rows = X.copy()
+    rows[::7, 0] = np.nan
+    assert walked.tables is None
+    assert np.array_equal(walked.leaf_values(rows), trees.leaf_values(rows))
+    assert np.array_equal(walked.predict_proba(rows), expected(fitted, rows))
+
+
+def test_saved_trees_load_with_the_same_results(fitted, tmp_path):
+    X, model, scaler = fitted
+    trees = CompiledTrees.from_booster(model.booster_, scaler)
+    trees.save(str(tmp_path), 'sha')
+    loaded, meta = CompiledTrees.load(str(tmp_path))
+    assert meta['source_sha256'] == 'sha'
+    assert np.array_equal(loaded.predict_proba(X), expected(fitted, X))
@@ -0,0 +1,144 @@
+"""Video jobs shared by several API processes through one SQLite store"""
+
+import asyncio
+import io
+import os
+import sqlite3
+import time
+
+from starlette.datastructures import UploadFile
+
+from video_jobs import JobStore, VideoJobQueue
+
+
+def make_store(tmp_path, n_jobs: int = 1) -> JobStore:
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    for i in range(n_jobs):
+        store.create(f'job{i}', str(tmp_path / f'job{i}.upload'), 'video/mp4', 1)
+    return store
+
+
+def test_a_job_is_claimed_by_one_process(tmp_path):
+    first, second = make_store(tmp_path), JobStore(str(tmp_path / 'jobs.sqlite3'))
+    job = first.claim('a', lease_seconds=60)
+    assert job['id'] == 'job0' and job['status'] == 'running' and job['owner'] == 'a'
+    assert second.claim('b', lease_seconds=60) is None
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    first, second = make_store(tmp_path), JobStore(str(tmp_path / 'jobs.sqlite3'))
+    first.claim('a', lease_seconds=-1)
+    job = second.claim('b', lease_seconds=60)
+    assert job['id'] == 'job0' and job['owner'] == 'b'
+    # The first owner lost it, so it can no longer renew
+    assert not first.renew('job0', 'a', 60)
+    assert second.renew('job0', 'b', 60)
+
+
+def test_release_queues_running_jobs_again(tmp_path):
+    store = make_store(tmp_path, n_jobs=2)
+    store.claim('a', lease_seconds=60)
+    assert store.queued() == 1
+    assert store.release('a') == 1
+    assert store.queued() == 2
+    assert store.claim('b', lease_seconds=60)['id'] == 'job0'
+
+
+def test_store_without_lease_columns_is_migrated(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    db = sqlite3.connect(path)
+    db.execute("""
+        CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT NOT NULL, file_path TEXT,
+                           mime_type TEXT, size INTEGER, result TEXT, error TEXT, status_code INTEGER,
+                           created_at REAL NOT NULL, updated_at REAL NOT NULL)
+    """)
+    db.execute("INSERT INTO jobs VALUES ('old', 'running', 'analyzing', 'x', 'video/mp4', 1, NULL, NULL, NULL, 0, 0)")
+    db.commit()
+    db.close()
+    # A job left running by the previous version has no lease, so it is taken over at once
+    assert JobStore(path).claim('a', lease_seconds=60)['id'] == 'old'
+
+
+def test_job_submitted_to_one_queue_runs_on_another(tmp_path):
+    ran = []
+
+    async def analyze(upload, mime_type, set_stage):
+        await set_stage('analyzing')
+        ran.append(await upload.read())
+        return {'ok': True}
+
+    async def scenario():
+        submitter = VideoJobQueue(str(tmp_path), analyze, workers=0)
+        runner = VideoJobQueue(str(tmp_path), analyze, workers=1, poll_seconds=0.05)
+        submitter.start()
+        runner.start()
+        try:
+            job = await submitter.submit(UploadFile(file=io.BytesIO(b'clip')), 'video/mp4')
+            for _ in range(100):
+                if (await submitter.get(job['job_id']))['status'] == 'done':
+                    break
+                await asyncio.sleep(0.02)
+            return await submitter.get(job['job_id'])
+        finally:
+            await submitter.shutdown()
+            await runner.shutdown()
+
+    job = asyncio.run(scenario())
+    assert job['status'] == 'done' and job['result'] == {'ok': True}
+    assert ran == [b'clip']
+
+
+def test_job_whose_lease_is_lost_is_abandoned(tmp_path):
+    started, cancelled = asyncio.Event(), []
+
+    async def analyze(upload, mime_type, set_stage):
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return {'ok': True}
+
+    async def scenario():
+        queue = VideoJobQueue(str(tmp_path), analyze, workers=1, lease_seconds=0.3, poll_seconds=0.05)
+        queue.start()
+        try:
+            job = await queue.submit(UploadFile(file=io.BytesIO(b'clip')), 'video/mp4')
+            await asyncio.wait_for(started.wait(), timeout=5)
+            # Another process takes the job over, as if this one had stalled past its lease
+            db = sqlite3.connect(str(tmp_path / 'jobs.sqlite3'))
+            db.execute("UPDATE jobs SET owner = 'thief', lease_until = ? WHERE id = ?",
+                       (time.time() + 60, job['job_id']))
+            db.commit()
+            db.close()
+            for _ in range(100):
+                if queue.abandoned:
+                    break
+                await asyncio.sleep(0.02)
+            return queue.abandoned, queue.store.get(job['job_id'])
+        finally:
+            await queue.shutdown()
+
+    abandoned, row = asyncio.run(scenario())
+    assert abandoned == 1 and cancelled == [True]
+    # The new owner's row and upload are untouched
+    assert row['owner'] == 'thief' and row['status'] == 'running' and row['result'] is None
+    assert os.path.exists(row['file_path'])
+
+
+def test_purge_removes_old_jobs_and_stray_uploads(tmp_path):
+    queue = VideoJobQueue(str(tmp_path), None, workers=0, retention_hours=1)
+    queue.store = make_store(tmp_path, n_jobs=2)
+    queue.store.update('job0', status='done', stage='done')
+    old = time.time() - 7200
+    queue.store._db.execute("UPDATE jobs SET updated_at = ?", (old,))
+    for name in ('job0', 'job1', 'stray'):
+        path = tmp_path / f'{name}.upload'
+        path.write_bytes(b'clip')
+        os.utime(path, (old, old))
+
+    assert queue._purge() == 1
+    # The queued job keeps its row and upload
+    assert queue.store.get('job0') is None and queue.store.get('job1') is not None
+    assert sorted(p.name for p in tmp_path.glob('*.upload')) == ['job1.upload']
@@ -0,0 +1,91 @@
+"""/analyze-video uploads streamed through the API to benchmarks/stub_provider.py"""
+
+import base64
+import os
+import socket
+import subprocess
+import sys
+
+import httpx
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(BACKEND_DIR, 'benchmarks')
+sys.path.insert(0, BENCH_DIR)
+
+from bench_video_upload import make_video, multipart_body, wait_for  # noqa: E402
+
+MAX_MB = 4
+BOUNDARY = 'testvideoboundary'
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope='module')
+def servers(tmp_path_factory):
+    """(API base URL, stub provider base URL), with the cache and job store in a temporary directory"""
+    tmp = tmp_path_factory.mktemp('video')
+    api_port, stub_port = free_port(), free_port()
+    env = dict(
+        os.environ, AIPIPE_API_KEY='test', AI_PROVIDER_BASE_URL=f'http://127.0.0.1:{stub_port}',
+        VIDEO_MAX_MB=str(MAX_MB), VIDEO_CACHE_DIR=str(tmp / 'cache'), VIDEO_JOBS_DIR=str(tmp / 'jobs'),
+    )
+    stub = subprocess.Popen([sys.executable, 'stub_provider.py', '--port', str(stub_port)], cwd=BENCH_DIR,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    api = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(api_port),
+                            '--log-level', 'warning'],
+                           cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(f'http://127.0.0.1:{stub_port}/stats', 30)
+        wait_for(f'http://127.0.0.1:{api_port}/health', 60)
+        yield f'http://127.0.0.1:{api_port}', f'http://127.0.0.1:{stub_port}'
+    finally:
+        for process in (api, stub):
+            process.terminate()
+            process.wait()
+
+
+def upload(base: str, path: str) -> httpx.Response:
+    return httpx.post(f'{base}/analyze-video', content=multipart_body(path, BOUNDARY),
+                      headers={'Content-Type': f'multipart/form-data; boundary={BOUNDARY}'}, timeout=60)
+
+
+def test_upload_is_streamed_to_the_provider(servers, tmp_path):
+    base, stub = servers
+    path = str(tmp_path / 'video.mp4')
+    make_video(path, MAX_MB - 1)
+
+    response = upload(base, path)
+    assert response.status_code == 200, response.text
+    assert response.json()['physical_score'] == 42 and response.json()['speech_score'] == 17
+    # The whole video reached the provider, base64-encoded inside the JSON request
+    encoded_size = len(base64.b64encode(b'\0' * os.path.getsize(path)))
+    provider = httpx.get(f'{stub}/stats').json()
+    assert encoded_size <= provider['last_body_bytes'] < encoded_size + 64 * 1024
+
+    # The same bytes again are answered from the cache
+    assert upload(base, path).json() == response.json()
+    assert httpx.get(f'{stub}/stats').json()['requests'] == provider['requests']
+
+
+def test_oversized_upload_is_rejected(servers, tmp_path):
+    base, stub = servers
+    path = str(tmp_path / 'video.mp4')
+    make_video(path, MAX_MB + 1)
+    requests = httpx.get(f'{stub}/stats').json()['requests']
+    assert upload(base, path).status_code == 413
+    assert httpx.get(f'{stub}/stats').json()['requests'] == requests
+
+
+def test_malformed_uploads_are_bad_requests(servers):
+    base, _ = servers
+    assert httpx.post(f'{base}/analyze-video', json={'file': 'x'}).status_code == 400
+    assert httpx.post(f'{base}/analyze-video', content=b'--nope\r\n',
+                      headers={'Content-Type': 'multipart/form-data'}).status_code == 400
+    no_file = f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="note"\r\n\r\nhi\r\n--{BOUNDARY}--\r\n'
+    assert httpx.post(f'{base}/analyze-video', content=no_file.encode(),
+                      headers={'Content-Type': f'multipart/form-data; boundary={BOUNDARY}'}).status_code == 400
@@ -0,0 +1,44 @@
+"""State that serve.py workers share: metrics snapshots and the video result cache"""
+
+from metrics import Registry, WorkerMetrics
+from video_cache import VideoResultCache
+
+
+def worker_registry(requests: int) -> Registry:
+    registry = Registry()
+    registry.counter("asd_requests_total", "Requests", ("route",)).inc(requests, route="/predict")
+    registry.histogram("asd_seconds", "Latency", buckets=(0.1, 1.0)).observe(0.5)
+    return registry
+
+
+def test_metrics_of_every_worker_are_rendered_with_a_worker_label(tmp_path):
+    first = WorkerMetrics(worker_registry(3), str(tmp_path), "0")
+    second = WorkerMetrics(worker_registry(5), str(tmp_path), "1")
+    second.write()
+
+    text = first.render()
+    assert 'asd_requests_total{route="/predict",worker="0"} 3' in text
+    assert 'asd_requests_total{route="/predict",worker="1"} 5' in text
+    assert 'asd_seconds_bucket{worker="1",le="1"} 1' in text
+    # One HELP/TYPE header per family, however many workers report it
+    assert text.count("# TYPE asd_requests_total counter") == 1
+    assert text.count("# TYPE asd_seconds histogram") == 1
+
+
+def test_own_snapshot_is_replaced_by_live_values(tmp_path):
+    registry = worker_registry(1)
+    metrics = WorkerMetrics(registry, str(tmp_path), "0")
+    metrics.write()
+    registry.counter("asd_requests_total", "Requests", ("route",)).inc(route="/predict")
+    text = metrics.render()
+    assert 'asd_requests_total{route="/predict",worker="0"} 2' in text
+    assert text.count('asd_requests_total{') == 1
+
+
+def test_cache_reads_entries_stored_by_another_process(tmp_path):
+    reader = VideoResultCache(str(tmp_path))
+    writer = VideoResultCache(str(tmp_path))
+    writer.put("key", {"summary": "ok"})
+    assert reader.get("key") == {"summary": "ok"}
+    assert reader.stats()["entries"] == 1
+    assert reader.get("other") is None
@@ -5,7 +5,7 @@ Uses the AQ-10 questionnaire dataset from the dataset folder
 
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, cross_val_predict, StratifiedKFold
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.linear_model import LogisticRegression
 from sklearn.calibration import CalibratedClassifierCV
@@ -13,30 +13,30 @@ from sklearn.metrics import roc_auc_score, brier_score_loss, classification_repo
 import lightgbm as lgb
 import joblib
 import os
+import sys
+import copy
 import json
+import time
+import argparse
 
-# Feature columns (AQ-10 questionnaire scores)
-AQ10_FEATURES = [
-    'A1_Score', 'A2_Score', 'A3_Score', 'A4_Score', 'A5_Score',
-    'A6_Score', 'A7_Score', 'A8_Score', 'A9_Score', 'A10_Score'
-]
-
-# Additional demographic features
-DEMOGRAPHIC_FEATURES = ['age', 'gender', 'jaundice', 'austim', 'used_app_before', 'result']
-
-# AQ-10 Question descriptions for interpretability
-AQ10_QUESTIONS = {
-    'A1_Score': 'I often notice small sounds when others do not',
-    'A2_Score': 'I usually concentrate more on the whole picture, rather than small details',
-    'A3_Score': 'I find it easy to do more than one thing at once',
-    'A4_Score': 'If there is an interruption, I can switch back to what I was doing very quickly',
-    'A5_Score': 'I find it easy to read between the lines when someone is talking to me',
-    'A6_Score': 'I know how to tell if someone listening to me is getting bored',
-    'A7_Score': 'When reading a story, I find it difficult to work out the characters intentions',
-    'A8_Score': 'I like to collect information about categories of things',
-    'A9_Score': 'I find it easy to work out what someone is thinking or feeling',
-    'A10_Score': 'I find it difficult to work out peoples intentions'
-}
+from features import (
+    AQ10_FEATURES, DEMOGRAPHIC_FEATURES, AQ10_QUESTIONS,
+    SOCIAL_FEATURES, ATTENTION_FEATURES, AGE_BINS, ETHNICITY_MAP, UNKNOWN_ETHNICITY,
+    FeatureEncoder
+)
+from drift import build_profile, extend_profile, save_profile
+from model_registry import current_version, new_version, resolve_model_dir
+from serving import (
+    get_risk_level, get_encoder, rank_feature_importance, feature_label,
+    compute_contributions, get_contributing_factors, score_rows,
+    predict, predict_many, predict_batch,
+    assemble_artifacts, export_serving_artifact
+)
+
+# LightGBM settings for the trees update_model adds on top of the existing model's. A batch of new rows
+# is small, so leaves are larger and more regularized; the base fit's balanced class weights are dropped,
+# since boosting on with them made Brier worse on every split tried (benchmarks/bench_incremental.py)
+UPDATE_PARAMS = {'class_weight': None, 'min_child_samples': 10, 'reg_lambda': 10.0}
 
 
 def load_and_preprocess_data(train_path: str, test_path: str = None):
@@ -64,12 +64,10 @@ def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
     df_features['aq10_total'] = df_features[AQ10_FEATURES].sum(axis=1)
     
     # Communication/Social features (A5, A6, A7, A9, A10)
-    social_cols = ['A5_Score', 'A6_Score', 'A7_Score', 'A9_Score', 'A10_Score']
-    df_features['social_score'] = df_features[social_cols].sum(axis=1)
+    df_features['social_score'] = df_features[SOCIAL_FEATURES].sum(axis=1)
     
     # Attention/Detail features (A1, A2, A3, A4, A8)
-    attention_cols = ['A1_Score', 'A2_Score', 'A3_Score', 'A4_Score', 'A8_Score']
-    df_features['attention_score'] = df_features[attention_cols].sum(axis=1)
+    df_features['attention_score'] = df_features[ATTENTION_FEATURES].sum(axis=1)
     
     # Encode categorical variables
     # Gender
@@ -87,28 +85,23 @@ def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
     # Age group (child, teen, adult, senior)
     df_features['age_group'] = pd.cut(
         df_features['age'], 
-        bins=[0, 12, 18, 40, 100],
-        labels=[0, 1, 2, 3]
+        bins=AGE_BINS,
+        labels=list(range(len(AGE_BINS) - 1))
     ).astype(int)
     
     # Ethnicity encoding (simplified)
-    ethnicity_map = {
-        'White-European': 0,
-        'Asian': 1,
-        'Middle Eastern ': 2,
-        'South Asian': 3,
-        'Black': 4,
-        'Hispanic': 5,
-        'Pasifika': 6,
-        'Turkish': 7,
-        'Others': 8,
-        '?': 9
-    }
-    df_features['ethnicity_encoded'] = df_features['ethnicity'].map(ethnicity_map).fillna(9).astype(int)
+    df_features['ethnicity_encoded'] = df_features['ethnicity'].map(ETHNICITY_MAP).fillna(UNKNOWN_ETHNICITY).astype(int)
     
     return df_features
 
 
+def ensure_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Engineer features unless the frame already holds them (e.g. loaded from feature_cache)"""
+    if set(get_feature_columns()).issubset(df.columns):
+        return df
+    return engineer_features(df)
+
+
 def get_feature_columns():
     """Get the list of feature columns for the model"""
     return (
@@ -123,7 +116,7 @@ def train_model(train_df: pd.DataFrame, model_type: str = 'lightgbm'):
     """Train the ASD screening model"""
     
     # Engineer features
-    train_features = engineer_features(train_df)
+    train_features = ensure_features(train_df)
     
     # Get feature columns
     feature_cols = get_feature_columns()
@@ -208,6 +201,9 @@ def train_model(train_df: pd.DataFrame, model_type: str = 'lightgbm'):
         'scaler': scaler,
         'feature_cols': feature_cols,
         'feature_importance': feature_importance,
+        'ranked_importance': rank_feature_importance(feature_importance),
+        # Live inputs are compared with every row; live probabilities with the validation split's
+        'drift_profile': build_profile(X, feature_cols, y_pred_proba),
         'metrics': {
             'auc_roc': auc,
             'brier_score': brier
@@ -215,78 +211,231 @@ def train_model(train_df: pd.DataFrame, model_type: str = 'lightgbm'):
     }
 
 
-def predict(model_artifacts: dict, input_data: dict) -> dict:
-    """Make a prediction for a single sample"""
+def train_model_cv(train_df: pd.DataFrame, model_type: str = 'lightgbm', strategy: str = 'random',
+                   n_trials: int = 24, n_folds: int = 5, workers: int = None, seed: int = 42,
+                   cache_dir: str = None):
+    """Train with a cross-validated hyperparameter search, then refit the best config on all rows"""
+    from tuning import search, make_model, calibrate
+
+    train_features = ensure_features(train_df)
+    feature_cols = get_feature_columns()
+    X = train_features[feature_cols].values
+    y = train_features['Class/ASD'].values
+
+    print(f"{strategy} search: {n_trials} configs x {n_folds}-fold CV, {workers or os.cpu_count()} workers")
+    result = search(
+        X, y, model_type=model_type, strategy=strategy, n_trials=n_trials, n_folds=n_folds,
+        workers=workers, seed=seed, cache_dir=cache_dir
+    )
+    best = result['best']
     
-    model = model_artifacts['model']
-    scaler = model_artifacts['scaler']
+    print(f"\nBest CV AUC-ROC: {best['auc_mean']:.4f} +/- {best['auc_std']:.4f}")
+    print(f"Best CV Brier Score: {best['brier_mean']:.4f}")
+    print(f"Best params: {best['params']}")
+    print(f"Search took {result['wall_seconds']:.1f}s wall-clock for {result['trial_seconds']:.1f}s of trials: "
+          f"{result['speedup']:.2f}x on {result['workers']} workers ({result['cpu_count']} cores)")
+
+    # Refit on every row; trees stop at the mean early-stopping point across folds
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    if model_type == 'lightgbm':
+        model = make_model(model_type, best['params'], n_estimators=best['best_iteration'] or best['n_estimators'], seed=seed)
+        model.set_params(n_jobs=-1)
+        model.fit(X_scaled, y)
+        feature_importance = dict(zip(feature_cols, model.feature_importances_))
+    else:
+        base_model = make_model(model_type, best['params'], seed=seed)
+        model = calibrate(base_model, n_folds)
+        model.fit(X_scaled, y)
+        feature_importance = dict(zip(
+            feature_cols, np.mean([np.abs(c.estimator.coef_[0]) for c in model.calibrated_classifiers_], axis=0)
+        ))
+    
+    # The refit saw every row, so the drift profile's probabilities come from out-of-fold predictions
+    folds = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    oof_probabilities = cross_val_predict(model, X_scaled, y, cv=folds, method='predict_proba')[:, 1]
+
+    return {
+        'model': model,
+        'scaler': scaler,
+        'feature_cols': feature_cols,
+        'feature_importance': feature_importance,
+        'ranked_importance': rank_feature_importance(feature_importance),
+        'drift_profile': build_profile(X, feature_cols, oof_probabilities),
+        'metrics': {
+            'auc_roc': best['auc_mean'],
+            'brier_score': best['brier_mean'],
+            'cv': {
+                'auc_std': best['auc_std'],
+                'n_folds': n_folds,
+                'strategy': strategy,
+                'params': best['params'],
+                'n_estimators': best['best_iteration'] or best['n_estimators'],
+                'trials': len(result['trials']),
+                'workers': result['workers'],
+                'wall_seconds': result['wall_seconds'],
+                'speedup': result['speedup'],
+            }
+        }
+    }
+
+
+def rescale_booster(booster, old_scaler, new_scaler):
+    """
+    Copy of booster whose trees make the same decisions on features scaled by
+    new_scaler as booster makes on features scaled by old_scaler.
+
+    Every split threshold is mapped back to the raw feature value it stands
+    for (exactly, see tree_engine.fold_thresholds) and scaled again with the
+    new statistics; standardization is monotonic, so the split order holds.
+    """
+    from tree_engine import fold_thresholds
+
+    old_mean = np.asarray(old_scaler.mean_, dtype=np.float64)
+    old_scale = np.asarray(old_scaler.scale_, dtype=np.float64)
+    new_mean = np.asarray(new_scaler.mean_, dtype=np.float64)
+    new_scale = np.asarray(new_scaler.scale_, dtype=np.float64)
+    
+    lines = booster.model_to_string().split('\n')
+    split_feature = None
+    for i, line in enumerate(lines):
+        key, _, values = line.partition('=')
+        if key == 'split_feature':
+            split_feature = np.array(values.split(), dtype=np.intp)
+        elif key == 'decision_type':
+            decision_type = np.array(values.split(), dtype=np.int64)
+            # Bit 0: categorical split; bits 2-3: missing type, 1 = zeros treated as missing
+            if (decision_type & 1).any() or ((decision_type >> 2) & 3 == 1).any():
+                raise ValueError("Cannot rescale categorical or zero-as-missing splits")
+        elif key == 'threshold' and split_feature is not None:
+            threshold = np.array(values.split(), dtype=np.float64)
+            raw = fold_thresholds(split_feature, threshold, old_mean, old_scale)
+            rescaled = (raw - new_mean[split_feature]) / new_scale[split_feature]
+            lines[i] = 'threshold=' + ' '.join(map(repr, rescaled.tolist()))
+    
+    # tree_sizes holds each tree's length in bytes, which the new thresholds change; without it trees are read in order
+    lines = [line for line in lines if not line.startswith('tree_sizes=')]
+    return lgb.Booster(model_str='\n'.join(lines))
+
+
+def evaluate(model, scaler, X: np.ndarray, y: np.ndarray) -> dict:
+    """AUC-ROC (None when y has a single class) and Brier score of model on raw features X"""
+    proba = model.predict_proba(scaler.transform(X))[:, 1]
+    return {
+        'auc_roc': float(roc_auc_score(y, proba)) if len(np.unique(y)) > 1 else None,
+        'brier_score': float(brier_score_loss(y, proba)),
+        'n': int(len(y))
+    }
+
+
+def update_model(model_artifacts: dict, new_df: pd.DataFrame, reference_df: pd.DataFrame = None,
+                 rounds: int = 20, learning_rate: float = 0.05, holdout: float = 0.2,
+                 auc_tolerance: float = 0.0, brier_tolerance: float = 0.0, params: dict = None,
+                 seed: int = 42) -> dict:
+    """
+    Continue boosting a trained LightGBM model on newly labeled rows.
+
+    A stratified `holdout` share of new_df is kept back; the rest updates the
+    scaler statistics (StandardScaler.partial_fit, merged with everything it
+    has seen so far) and trains `rounds` more trees (UPDATE_PARAMS unless
+    params is given) on top of the existing ones, rescaled to the updated
+    statistics. Both models are then scored on the held-back rows and on
+    reference_df (e.g. the original validation split), and
+    metrics['incremental']['accepted'] is False when the update lowers AUC
+    by more than auc_tolerance or raises Brier by more than brier_tolerance
+    on either set.
+    """
+    base_model = model_artifacts['model']
+    if not hasattr(base_model, 'booster_'):
+        raise ValueError("Incremental updates need a LightGBM model")
+    
+    start = time.perf_counter()
     feature_cols = model_artifacts['feature_cols']
-    feature_importance = model_artifacts['feature_importance']
-    
-    # Create a dataframe from input
-    df = pd.DataFrame([input_data])
-    
-    # Engineer features
-    df_features = engineer_features(df)
-    
-    # Get features
-    X = df_features[feature_cols].values
+    new_features = ensure_features(new_df)
+    X_new = new_features[feature_cols].values
+    y_new = new_features['Class/ASD'].values
+    if np.bincount(y_new, minlength=2).min() < 2:
+        raise ValueError("New rows need at least two labeled examples of each class")
+    X_update, X_holdout, y_update, y_holdout = train_test_split(
+        X_new, y_new, test_size=holdout, stratify=y_new, random_state=seed
+    )
     
-    # Scale
-    X_scaled = scaler.transform(X)
+    validation = {'new_holdout': (X_holdout, y_holdout)}
+    if reference_df is not None:
+        reference_features = ensure_features(reference_df)
+        validation['reference'] = (reference_features[feature_cols].values, reference_features['Class/ASD'].values)
+    
+    base_scaler = model_artifacts['scaler']
+    scaler = copy.deepcopy(base_scaler)
+    scaler.partial_fit(X_update)
+    
+    model_params = base_model.get_params()
+    model_params.update(UPDATE_PARAMS if params is None else params)
+    model_params.update(n_estimators=rounds, learning_rate=learning_rate)
+    model = lgb.LGBMClassifier(**model_params)
+    model.fit(
+        scaler.transform(X_update), y_update,
+        init_model=rescale_booster(base_model.booster_, base_scaler, scaler)
+    )
     
-    # Predict
-    probability = model.predict_proba(X_scaled)[0, 1]
-    prediction = int(probability >= 0.5)
-    
-    # Get risk level
-    if probability < 0.3:
-        risk_level = "Low"
-    elif probability < 0.6:
-        risk_level = "Medium"
-    else:
-        risk_level = "High"
-    
-    # Normalize feature importance to percentages (sum to 100%)
-    total_importance = sum(feature_importance.values())
-    normalized_importance = {k: (v / total_importance) * 100 for k, v in feature_importance.items()}
-    
-    # Get contributing factors
-    contributing_factors = []
-    for feat, imp in sorted(normalized_importance.items(), key=lambda x: x[1], reverse=True)[:5]:
-        if feat in AQ10_FEATURES:
-            question = AQ10_QUESTIONS.get(feat, feat)
-            value = input_data.get(feat, 0)
-            contributing_factors.append({
-                'feature': feat,
-                'question': question,
-                'value': value,
-                'importance': float(imp)
-            })
-        else:
-            value = df_features[feat].values[0]
-            contributing_factors.append({
-                'feature': feat,
-                'question': feat.replace('_', ' ').title(),
-                'value': float(value),
-                'importance': float(imp)
-            })
+    results, regressions = {}, []
+    for name, (X_val, y_val) in validation.items():
+        before = evaluate(base_model, base_scaler, X_val, y_val)
+        after = evaluate(model, scaler, X_val, y_val)
+        results[name] = {'current': before, 'updated': after}
+        if before['auc_roc'] is not None and after['auc_roc'] < before['auc_roc'] - auc_tolerance:
+            regressions.append(f"{name} AUC-ROC {before['auc_roc']:.4f} -> {after['auc_roc']:.4f}")
+        if after['brier_score'] > before['brier_score'] + brier_tolerance:
+            regressions.append(f"{name} Brier {before['brier_score']:.4f} -> {after['brier_score']:.4f}")
+    
+    X_val = np.concatenate([X for X, _ in validation.values()])
+    y_val = np.concatenate([y for _, y in validation.values()])
+    combined = evaluate(model, scaler, X_val, y_val)
+    feature_importance = dict(zip(feature_cols, model.feature_importances_))
+    
+    # The reference inputs grow by the update rows; the probability reference stays the base model's
+    drift_profile = copy.deepcopy(model_artifacts.get('drift_profile'))
+    if drift_profile is not None:
+        extend_profile(drift_profile, X_update)
     
     return {
-        'prediction': prediction,
-        'probability': float(probability),
-        'risk_level': risk_level,
-        'contributing_factors': contributing_factors,
-        'aq10_total': int(df_features['aq10_total'].values[0]),
-        'social_score': int(df_features['social_score'].values[0]),
-        'attention_score': int(df_features['attention_score'].values[0])
+        'model': model,
+        'scaler': scaler,
+        'feature_cols': feature_cols,
+        'feature_importance': feature_importance,
+        'ranked_importance': rank_feature_importance(feature_importance),
+        'drift_profile': drift_profile,
+        'metrics': {
+            'auc_roc': combined['auc_roc'],
+            'brier_score': combined['brier_score'],
+            'incremental': {
+                'accepted': not regressions,
+                'regressions': regressions,
+                'validation': results,
+                'new_rows': int(len(y_new)),
+                'update_rows': int(len(y_update)),
+                'rounds': rounds,
+                'learning_rate': learning_rate,
+                'n_trees': model.booster_.num_trees(),
+                'scaler_samples': int(scaler.n_samples_seen_),
+                'seconds': time.perf_counter() - start
+            }
+        }
     }
 
 
-def save_model(model_artifacts: dict, output_dir: str):
-    """Save the trained model and artifacts"""
+def save_model(model_artifacts: dict, models_dir: str, activate: bool = True) -> str:
+    """Save the trained model and artifacts as a new version under models_dir/versions, returning its name"""
     
-    os.makedirs(output_dir, exist_ok=True)
+    with new_version(models_dir, activate=activate) as (version, output_dir):
+        write_artifacts(model_artifacts, output_dir)
+    
+    print(f"Model saved to {models_dir} as version {version}" + ("" if activate else " (not activated)"))
+    return version
+
+
+def write_artifacts(model_artifacts: dict, output_dir: str):
+    """Write the model, scaler, feature metadata, metrics and serving artifact into output_dir"""
     
     # Save model
     joblib.dump(model_artifacts['model'], os.path.join(output_dir, 'model.pkl'))
@@ -309,45 +458,105 @@ def save_model(model_artifacts: dict, output_dir: str):
     with open(os.path.join(output_dir, 'metrics.json'), 'w') as f:
         json.dump(model_artifacts['metrics'], f)
     
-    print(f"Model saved to {output_dir}")
+    # Save the reference distributions live traffic is compared with (drift.py)
+    if model_artifacts.get('drift_profile') is not None:
+        save_profile(model_artifacts['drift_profile'], output_dir)
+    
+    # Save the serving-only artifact (model text + scaler arrays)
+    export_serving_artifact(model_artifacts, output_dir)
 
 
-def load_model(model_dir: str) -> dict:
-    """Load trained model and artifacts"""
+def load_model(model_dir: str, use_score_table: bool = False, score_table_tolerance: float = 0.05) -> dict:
+    """Load trained model and artifacts (optionally with the precomputed score table)"""
     
+    model_dir = resolve_model_dir(model_dir)
     model = joblib.load(os.path.join(model_dir, 'model.pkl'))
     scaler = joblib.load(os.path.join(model_dir, 'scaler.pkl'))
     
-    with open(os.path.join(model_dir, 'feature_cols.json'), 'r') as f:
-        feature_cols = json.load(f)
-    
-    with open(os.path.join(model_dir, 'feature_importance.json'), 'r') as f:
-        feature_importance = json.load(f)
-    
-    return {
-        'model': model,
-        'scaler': scaler,
-        'feature_cols': feature_cols,
-        'feature_importance': feature_importance
-    }
+    return assemble_artifacts(
+        model, scaler, model_dir,
+        use_score_table=use_score_table, score_table_tolerance=score_table_tolerance
+    )
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the ASD screening model')
+    parser.add_argument('--model-type', choices=['lightgbm', 'logistic'], default='lightgbm')
+    parser.add_argument('--search', choices=['none', 'random', 'halving'], default='none',
+                        help='Cross-validated hyperparameter search instead of a single 80/20 split')
+    parser.add_argument('--trials', type=int, default=24)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help='Search processes (default: all cores)')
+    parser.add_argument('--no-feature-cache', action='store_true',
+                        help='Parse the CSV and engineer features from scratch instead of using models/feature_cache')
+    parser.add_argument('--no-activate', action='store_true',
+                        help='Save the new version without pointing models/CURRENT at it (e.g. to shadow-score it first)')
+    parser.add_argument('--update', metavar='CSV',
+                        help='Continue boosting the current model on newly labeled rows (train.csv columns) '
+                             'instead of retraining')
+    parser.add_argument('--rounds', type=int, default=20, help='Trees added by --update')
+    parser.add_argument('--learning-rate', type=float, default=0.05, help='Learning rate of the trees added by --update')
+    parser.add_argument('--auc-tolerance', type=float, default=0.0,
+                        help='AUC-ROC drop --update accepts on either validation set')
+    parser.add_argument('--brier-tolerance', type=float, default=0.0,
+                        help='Brier score rise --update accepts on either validation set')
+    args = parser.parse_args()
+
     # Train the model
     # Dataset is in the parent hackathon folder: AI WARS 24 HACKATHON/dataset/
     data_dir = '../../dataset'
     train_path = os.path.join(data_dir, 'train.csv')
     
-    train_df, _ = load_and_preprocess_data(train_path)
+    if args.update:
+        # The original validation split doubles as a check that the update does not forget old rows
+        reference_df = None
+        if os.path.exists(train_path):
+            base_df = pd.read_csv(train_path)
+            _, reference_df = train_test_split(
+                base_df, test_size=0.2, stratify=base_df['Class/ASD'], random_state=42
+            )
+        base_version = current_version('models')
+        print(f"Updating model {base_version or 'models/'} with {args.update}")
+        model_artifacts = update_model(
+            load_model('models'), pd.read_csv(args.update), reference_df,
+            rounds=args.rounds, learning_rate=args.learning_rate,
+            auc_tolerance=args.auc_tolerance, brier_tolerance=args.brier_tolerance
+        )
+        report = model_artifacts['metrics']['incremental']
+        report['base_version'] = base_version
+        for name, result in report['validation'].items():
+            for label in ('current', 'updated'):
+                auc = result[label]['auc_roc']
+                print(f"  {name:<12} {label:<8} n={result[label]['n']:<6} "
+                      f"AUC-ROC {'n/a' if auc is None else f'{auc:.4f}'}  Brier {result[label]['brier_score']:.4f}")
+        print(f"{report['update_rows']} rows, {report['rounds']} rounds, {report['seconds']:.2f}s")
+        if not report['accepted']:
+            print("Update rejected: " + "; ".join(report['regressions']))
+            sys.exit(1)
+        save_model(model_artifacts, 'models', activate=not args.no_activate)
+        sys.exit(0)
+    
+    if args.no_feature_cache:
+        train_df, _ = load_and_preprocess_data(train_path)
+    else:
+        from feature_cache import load_features
+        train_df = load_features(train_path)
+        print(f"Loaded training features: {train_df.shape[0]} samples")
     
     # Train LightGBM model
     print("=" * 50)
-    print("Training LightGBM Model")
+    print("Training LightGBM Model" if args.model_type == 'lightgbm' else "Training Logistic Regression Model")
     print("=" * 50)
-    model_artifacts = train_model(train_df, model_type='lightgbm')
+    if args.search == 'none':
+        model_artifacts = train_model(train_df, model_type=args.model_type)
+    else:
+        model_artifacts = train_model_cv(
+            train_df, model_type=args.model_type, strategy=args.search,
+            n_trials=args.trials, n_folds=args.folds, workers=args.workers
+        )
     
     # Save model
-    save_model(model_artifacts, 'models')
+    save_model(model_artifacts, 'models', activate=not args.no_activate)
     
     # Test prediction
     print("\n" + "=" * 50)
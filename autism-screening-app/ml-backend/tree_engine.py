@@ -0,0 +1,334 @@
+"""
+Compiled tree-ensemble evaluator for the LightGBM screening model
+Flattens the booster's trees into numpy arrays (feature, threshold, left and
+right child, leaf value) with the StandardScaler folded into the split
+thresholds, then turns each tree into a leaf table indexed by which of its
+thresholds a row exceeds, so a batch is scored with one comparison, one small
+matmul and one gather, bit for bit equal to LightGBM. The arrays can be
+saved as .npy files and memory-mapped read-only, so every process serving
+the same model shares one copy
+"""
+
+import json
+import logging
+import math
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Largest total leaf-table size compiled (entries); bigger models use tree traversal instead
+MAX_TABLE_ENTRIES = 1 << 22
+
+# Saved CompiledTrees: one .npy per array plus a metadata file, under the model directory
+ARRAYS_DIR = 'compiled'
+META_FILE = 'compiled.json'
+NODE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'value', 'roots', 'nan_fill')
+TABLE_ARRAYS = ('condition_features', 'condition_thresholds', 'strides', 'offsets', 'leaf_values')
+
+
+def fold_thresholds(feature: np.ndarray, threshold: np.ndarray, mean: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    """
+    Raw-feature thresholds t with x <= t exactly when (x - mean) / scale <= threshold.
+
+    thr * scale + mean is only the nearest guess; it is nudged one ulp at a
+    time until it is the largest double that still scales to <= threshold,
+    so decisions match scaling first and comparing after, bit for bit.
+    """
+    m, s = mean[feature], scale[feature]
+
+    def scaled(t):
+        return (t - m) / s
+
+    folded = threshold * s + m
+    while True:
+        over = scaled(folded) > threshold
+        if not over.any():
+            break
+        folded[over] = np.nextafter(folded[over], -np.inf)
+    while True:
+        up = np.nextafter(folded, np.inf)
+        fits = scaled(up) <= threshold
+        if not fits.any():
+            break
+        folded[fits] = up[fits]
+    return folded
+
+
+class CompiledTrees:
+    """
+    All trees of a binary LightGBM model as flat node arrays, plus leaf tables.
+
+    Leaves are nodes that point to themselves with an infinite threshold.
+    For the tables, every distinct (feature, threshold) split becomes one
+    condition x > threshold. Within a tree, the conditions it uses on a
+    feature count up to that feature's bin, and the bins index a dense
+    table of leaf values, so a row's table offset in every tree is the
+    product of its condition vector with a (conditions x trees) stride
+    matrix.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, max_depth: int, n_features: int, nan_fill: np.ndarray,
+                 tables: tuple = None, build_tables: bool = True):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        # LightGBM reads NaN as 0.0 after scaling; in raw units that is the feature mean
+        self.nan_fill = nan_fill
+        self.tables = self._build_tables() if build_tables else tables
+
+    @classmethod
+    def from_booster(cls, booster, scaler=None) -> 'CompiledTrees':
+        """Compile a binary booster; scaler (mean_/scale_) is folded into the thresholds"""
+        dump = booster.dump_model()
+        if dump['objective'].split()[0] != 'binary' or dump['num_tree_per_iteration'] != 1:
+            raise ValueError(f"Only binary models can be compiled, got '{dump['objective']}'")
+
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        max_depth = 0
+
+        def add(node: dict, depth: int) -> int:
+            nonlocal max_depth
+            index = len(feature)
+            feature.append(0)
+            threshold.append(np.inf)
+            left.append(index)
+            right.append(index)
+            value.append(0.0)
+            if 'split_index' not in node:
+                value[index] = node['leaf_value']
+                max_depth = max(max_depth, depth)
+                return index
+            if node['decision_type'] != '<=' or node['missing_type'] != 'None':
+                raise ValueError(
+                    f"Unsupported split (decision {node['decision_type']}, missing {node['missing_type']})"
+                )
+            feature[index] = node['split_feature']
+            threshold[index] = node['threshold']
+            left[index] = add(node['left_child'], depth + 1)
+            right[index] = add(node['right_child'], depth + 1)
+            return index
+
+        for tree in dump['tree_info']:
+            roots.append(add(tree['tree_structure'], 0))
+
+        n_features = dump['max_feature_idx'] + 1
+        feature = np.array(feature, dtype=np.intp)
+        threshold = np.array(threshold, dtype=np.float64)
+        nan_fill = np.zeros(n_features)
+        if scaler is not None:
+            mean = np.asarray(scaler.mean_, dtype=np.float64)
+            split = np.isfinite(threshold)
+            threshold[split] = fold_thresholds(
+                feature[split], threshold[split], mean, np.asarray(scaler.scale_, dtype=np.float64)
+            )
+            nan_fill = mean.copy()
+        return cls(
+            feature, threshold, np.array(left, dtype=np.intp), np.array(right, dtype=np.intp),
+            np.array(value, dtype=np.float64), np.array(roots, dtype=np.intp), max_depth, n_features, nan_fill
+        )
+
+    def save(self, directory: str, source_sha256: str):
+        """Write every array as .npy (then the metadata, so a complete set is what readers find)"""
+        arrays_dir = os.path.join(directory, ARRAYS_DIR)
+        os.makedirs(arrays_dir, exist_ok=True)
+        arrays = {name: getattr(self, name) for name in NODE_ARRAYS}
+        if self.tables is not None:
+            arrays.update(zip(TABLE_ARRAYS, self.tables))
+        for name, array in arrays.items():
+            path = os.path.join(arrays_dir, f'{name}.npy')
+            # Write-then-rename: another process may be mapping the previous file
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, array, allow_pickle=False)
+            os.replace(path + '.tmp', path)
+        meta = {
+            'source_sha256': source_sha256, 'max_depth': self.max_depth, 'n_features': self.n_features,
+            'tables': self.tables is not None, 'max_table_entries': MAX_TABLE_ENTRIES
+        }
+        meta_path = os.path.join(arrays_dir, META_FILE)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> tuple:
+        """(CompiledTrees, metadata) from save(); arrays are read-only memory maps unless mmap=False"""
+        arrays_dir = os.path.join(directory, ARRAYS_DIR)
+        with open(os.path.join(arrays_dir, META_FILE), 'r') as f:
+            meta = json.load(f)
+
+        def read(name: str) -> np.ndarray:
+            return np.load(os.path.join(arrays_dir, f'{name}.npy'), mmap_mode='r' if mmap else None,
+                           allow_pickle=False)
+
+        nodes = {name: read(name) for name in NODE_ARRAYS}
+        tables = tuple(read(name) for name in TABLE_ARRAYS) if meta['tables'] else None
+        trees = cls(**nodes, max_depth=meta['max_depth'], n_features=meta['n_features'],
+                    tables=tables, build_tables=False)
+        return trees, meta
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def _is_leaf(self, node: int) -> bool:
+        return self.left[node] == node
+
+    def _build_tables(self):
+        """(condition features, thresholds, strides, offsets, leaf values), or None past MAX_TABLE_ENTRIES"""
+        split = np.isfinite(self.threshold)
+        conditions = sorted(set(zip(self.feature[split].tolist(), self.threshold[split].tolist())))
+        condition_index = {c: i for i, c in enumerate(conditions)}
+        # float32 is exact here: offsets are integers below MAX_TABLE_ENTRIES < 2**24
+        strides = np.zeros((len(conditions), self.n_trees), dtype=np.float32)
+        offsets = np.zeros(self.n_trees, dtype=np.intp)
+        tables, total = [], 0
+
+        for tree, root in enumerate(self.roots):
+            used, stack = {}, [root]
+            while stack:
+                node = stack.pop()
+                if not self._is_leaf(node):
+                    used.setdefault(int(self.feature[node]), set()).add(float(self.threshold[node]))
+                    stack += [self.left[node], self.right[node]]
+            features = sorted(used)
+            bins = {f: sorted(used[f]) for f in features}
+            shape = [len(bins[f]) + 1 for f in features]
+            size = int(np.prod(shape))
+            total += size
+            if total > MAX_TABLE_ENTRIES:
+                return None
+
+            table = np.empty(shape, dtype=np.float64)
+            stride = 1
+            for axis in reversed(range(len(features))):
+                f = features[axis]
+                for t in bins[f]:
+                    strides[condition_index[(f, t)], tree] = stride
+                stride *= shape[axis]
+
+            # Each split cuts its box of bins in two along the split feature's axis
+            def fill(node: int, box: list):
+                if self._is_leaf(node):
+                    table[tuple(box)] = self.value[node]
+                    return
+                f = int(self.feature[node])
+                axis, cut = features.index(f), bins[f].index(float(self.threshold[node])) + 1
+                span = box[axis]
+                left_box, right_box = list(box), list(box)
+                left_box[axis] = slice(span.start, min(span.stop, cut))
+                right_box[axis] = slice(max(span.start, cut), span.stop)
+                fill(self.left[node], left_box)
+                fill(self.right[node], right_box)
+
+            fill(root, [slice(0, n) for n in shape])
+            offsets[tree] = total - size
+            tables.append(table.ravel())
+
+        condition_features = np.array([c[0] for c in conditions], dtype=np.intp)
+        condition_thresholds = np.array([c[1] for c in conditions], dtype=np.float64)
+        leaf_values = np.concatenate(tables) if tables else np.zeros(0)
+        return condition_features, condition_thresholds, strides, offsets, leaf_values
+
+    def _check(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected shape (n, {self.n_features}), got {X.shape}")
+        if np.isnan(X).any():
+            X = np.where(np.isnan(X), self.nan_fill, X)
+        return X
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """(n_rows, n_trees) leaf value each row lands on in each tree"""
+        X = self._check(X)
+        if self.tables is None:
+            return self.traverse(X)
+        condition_features, condition_thresholds, strides, offsets, leaf_values = self.tables
+        exceeded = (X[:, condition_features] > condition_thresholds).astype(np.float32)
+        return leaf_values[(exceeded @ strides).astype(np.intp) + offsets]
+
+    def traverse(self, X: np.ndarray) -> np.ndarray:
+        """leaf_values by walking every tree one level at a time (no tables needed)"""
+        X = self._check(X)
+        rows = np.arange(len(X))[:, None]
+        node = np.tile(self.roots, (len(X), 1))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node]
+
+    def raw_score(self, X: np.ndarray) -> np.ndarray:
+        """Sum of leaf values per row, added tree by tree in order like LightGBM"""
+        values = self.leaf_values(X)
+        if not self.n_trees:
+            return np.zeros(len(values))
+        # cumsum adds left to right, the same order (and rounding) as LightGBM's loop over trees
+        return np.cumsum(values, axis=1)[:, -1]
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        raw = self.raw_score(X)
+        # libm exp like LightGBM's sigmoid; numpy's SIMD exp can differ in the last bit
+        probability = 1.0 / (1.0 + np.fromiter(map(math.exp, -raw), dtype=np.float64, count=len(raw)))
+        return np.vstack((1.0 - probability, probability)).transpose()
+
+
+class FoldedScaler:
+    """Stands in for the scaler once it is folded into the trees: rows pass through unscaled"""
+
+    def __init__(self, scaler):
+        self.scaler = scaler
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return np.asarray(X, dtype=np.float64)
+
+
+class CompiledModel:
+    """
+    predict_proba on raw (unscaled) feature rows through CompiledTrees.
+
+    Contributions still come from the LightGBM booster (pred_contrib needs
+    the tree covers), so predict(pred_contrib=True) scales its rows first.
+    """
+
+    def __init__(self, booster, scaler, trees: CompiledTrees = None):
+        self.booster_ = booster
+        self.scaler = scaler
+        self.trees = trees if trees is not None else CompiledTrees.from_booster(booster, scaler)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        return self.trees.predict_proba(X)
+
+    def predict(self, X: np.ndarray, pred_contrib: bool = False) -> np.ndarray:
+        if pred_contrib:
+            return self.booster_.predict(self.scaler.transform(X), pred_contrib=True)
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+
+def load_or_compile(booster, scaler, directory: str, source_sha256: str, mmap: bool = True) -> CompiledTrees:
+    """
+    CompiledTrees saved under directory if they were compiled from the same
+    model (source_sha256 covers the booster and scaler files), else compile
+    and save them. Saved arrays are memory-mapped read-only, so processes
+    serving the same model share the page cache instead of holding a copy each
+    """
+    try:
+        trees, meta = CompiledTrees.load(directory, mmap=mmap)
+        if meta['source_sha256'] == source_sha256 and meta['max_table_entries'] == MAX_TABLE_ENTRIES:
+            return trees
+    except (OSError, ValueError, KeyError):
+        pass
+
+    trees = CompiledTrees.from_booster(booster, scaler)
+    try:
+        trees.save(directory, source_sha256)
+    except OSError as e:
+        logger.warning("Could not save the compiled trees: %s", e)
+        return trees
+    return CompiledTrees.load(directory, mmap=mmap)[0] if mmap else trees
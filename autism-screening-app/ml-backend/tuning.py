@@ -0,0 +1,222 @@
+"""
+Cross-validated hyperparameter search for the screening model
+Stratified k-fold splits and their scaled feature arrays are built once and
+cached on disk, trials (random search or successive halving) run across a
+process pool, LightGBM trials early-stop on a slice of each fold's training
+part (so the held-out part only scores), logistic trials are calibrated
+like the saved model, and the best configuration is refit on all rows for
+save_model
+"""
+
+import hashlib
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+FOLD_CACHE_DIR = 'cv_cache'
+EARLY_STOPPING_ROUNDS = 50
+# Share of each fold's training part held back to pick the LightGBM trial's stopping iteration
+EARLY_STOPPING_FRACTION = 0.2
+
+# Folds held by each pool worker (loaded once per worker from the fold cache)
+_worker_folds = None
+
+
+def sample_params(rng: np.random.Generator, model_type: str) -> dict:
+    """Draw one hyperparameter configuration"""
+    if model_type == 'logistic':
+        return {'C': float(10 ** rng.uniform(-3, 2))}
+    return {
+        'learning_rate': float(10 ** rng.uniform(-2.3, -0.7)),
+        'num_leaves': int(rng.integers(4, 64)),
+        'max_depth': int(rng.choice([-1, 3, 4, 5, 6, 8])),
+        'min_child_samples': int(rng.integers(5, 60)),
+        'subsample': float(rng.uniform(0.6, 1.0)),
+        'subsample_freq': 1,
+        'colsample_bytree': float(rng.uniform(0.5, 1.0)),
+        'reg_lambda': float(10 ** rng.uniform(-3, 1)),
+    }
+
+
+def build_folds(X: np.ndarray, y: np.ndarray, n_folds: int, seed: int) -> dict:
+    """Stratified folds with a scaler fit on each training part, as flat arrays"""
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.preprocessing import StandardScaler
+
+    arrays = {'n_folds': np.array(n_folds)}
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=seed)
+    for k, (train_idx, val_idx) in enumerate(splitter.split(X, y)):
+        scaler = StandardScaler().fit(X[train_idx])
+        arrays[f'X_train_{k}'] = scaler.transform(X[train_idx])
+        arrays[f'X_val_{k}'] = scaler.transform(X[val_idx])
+        arrays[f'y_train_{k}'] = y[train_idx]
+        arrays[f'y_val_{k}'] = y[val_idx]
+    return arrays
+
+
+def fold_cache_path(cache_dir: str, X: np.ndarray, y: np.ndarray, n_folds: int, seed: int) -> str:
+    """Cache file named after the data, fold count and seed it was built from"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(f'{n_folds}:{seed}'.encode())
+    return os.path.join(cache_dir, f'folds-{digest.hexdigest()[:16]}.npz')
+
+
+def prepare_folds(X: np.ndarray, y: np.ndarray, n_folds: int, seed: int, cache_dir: str) -> str:
+    """Build the fold arrays unless an identical cache file already exists; return its path"""
+    path = fold_cache_path(cache_dir, X, y, n_folds, seed)
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, **build_folds(X, y, n_folds, seed))
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def load_folds(path: str) -> list:
+    with np.load(path) as data:
+        return [
+            (data[f'X_train_{k}'], data[f'y_train_{k}'], data[f'X_val_{k}'], data[f'y_val_{k}'])
+            for k in range(int(data['n_folds']))
+        ]
+
+
+def _init_worker(folds_path: str):
+    global _worker_folds
+    _worker_folds = load_folds(folds_path)
+
+
+def make_model(model_type: str, params: dict, n_estimators: int = 100, seed: int = 42):
+    if model_type == 'logistic':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(class_weight='balanced', solver='liblinear', max_iter=200,
+                                  random_state=seed, **params)
+    import lightgbm as lgb
+    return lgb.LGBMClassifier(n_estimators=n_estimators, class_weight='balanced', random_state=seed,
+                              n_jobs=1, verbose=-1, **params)
+
+
+def calibrate(model, n_folds: int):
+    """Isotonic calibration, as train.py saves logistic regression models"""
+    from sklearn.calibration import CalibratedClassifierCV
+    return CalibratedClassifierCV(model, method='isotonic', cv=n_folds)
+
+
+def evaluate_trial(model_type: str, params: dict, n_estimators: int, folds: list = None) -> dict:
+    """Fit one configuration on every fold, return its mean/std CV metrics"""
+    import lightgbm as lgb
+    from sklearn.metrics import roc_auc_score, brier_score_loss
+    from sklearn.model_selection import train_test_split
+
+    start = time.perf_counter()
+    folds = folds if folds is not None else _worker_folds
+    aucs, briers, iterations = [], [], []
+    for X_train, y_train, X_val, y_val in folds:
+        model = make_model(model_type, params, n_estimators)
+        if model_type == 'logistic':
+            model = calibrate(model, len(folds))
+            model.fit(X_train, y_train)
+        else:
+            # The same split for every trial, so their stopping points are comparable
+            X_fit, X_stop, y_fit, y_stop = train_test_split(
+                X_train, y_train, test_size=EARLY_STOPPING_FRACTION, stratify=y_train, random_state=0
+            )
+            model.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)], eval_metric='auc',
+                      callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+            iterations.append(model.best_iteration_ or n_estimators)
+        proba = model.predict_proba(X_val)[:, 1]
+        aucs.append(roc_auc_score(y_val, proba))
+        briers.append(brier_score_loss(y_val, proba))
+    return {
+        'params': params,
+        'n_estimators': n_estimators,
+        'auc_mean': float(np.mean(aucs)),
+        'auc_std': float(np.std(aucs)),
+        'brier_mean': float(np.mean(briers)),
+        'best_iteration': int(np.mean(iterations)) if iterations else None,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def run_trials(pool, model_type: str, configs: list, n_estimators: int, folds: list) -> list:
+    if pool is None:
+        return [evaluate_trial(model_type, params, n_estimators, folds) for params in configs]
+    return list(pool.map(evaluate_trial, [model_type] * len(configs), configs,
+                         [n_estimators] * len(configs)))
+
+
+def search(X: np.ndarray, y: np.ndarray, model_type: str = 'lightgbm', strategy: str = 'random',
+           n_trials: int = 24, n_folds: int = 5, workers: int = None, max_estimators: int = 1000,
+           eta: int = 3, seed: int = 42, cache_dir: str = None) -> dict:
+    """
+    Run the search and return the best trial, every trial and timing.
+
+    'random' evaluates n_trials configurations with up to max_estimators
+    trees each. 'halving' starts all of them at max_estimators / eta**rungs
+    trees and keeps the best 1/eta on each rung, multiplying the tree
+    budget by eta, until one rung runs at max_estimators. Logistic
+    regression has no tree budget, so halving behaves like random search.
+    """
+    if strategy not in ('random', 'halving'):
+        raise ValueError(f"Unknown search strategy: {strategy}")
+    workers = workers or os.cpu_count() or 1
+    cache_dir = cache_dir or os.path.join('models', FOLD_CACHE_DIR)
+    rng = np.random.default_rng(seed)
+    configs = [sample_params(rng, model_type) for _ in range(n_trials)]
+
+    start = time.perf_counter()
+    folds_path = prepare_folds(X, y, n_folds, seed, cache_dir)
+    folds = load_folds(folds_path)
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker, initargs=(folds_path,)
+        )
+    trials = []
+    try:
+        if strategy == 'random' or model_type == 'logistic':
+            trials = run_trials(pool, model_type, configs, max_estimators, folds)
+            survivors = trials
+        else:
+            rungs = max(0, math.floor(math.log(n_trials, eta)))
+            budget = max(10, max_estimators // eta ** rungs)
+            survivors = configs
+            for rung in range(rungs + 1):
+                results = run_trials(pool, model_type, survivors, budget, folds)
+                for result in results:
+                    result['rung'] = rung
+                trials.extend(results)
+                results.sort(key=lambda r: r['auc_mean'], reverse=True)
+                print(f"  rung {rung}: {len(results)} configs at {budget} trees, "
+                      f"best AUC {results[0]['auc_mean']:.4f}")
+                if rung == rungs:
+                    survivors = results
+                    break
+                survivors = [r['params'] for r in results[:max(1, len(results) // eta)]]
+                budget = min(max_estimators, budget * eta)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    wall_seconds = time.perf_counter() - start
+
+    best = max(survivors, key=lambda r: r['auc_mean'])
+    trial_seconds = sum(t['seconds'] for t in trials)
+    return {
+        'best': best,
+        'trials': trials,
+        'strategy': strategy,
+        'n_folds': n_folds,
+        'workers': workers,
+        'cpu_count': os.cpu_count(),
+        'wall_seconds': wall_seconds,
+        'trial_seconds': trial_seconds,
+        # Serial trial time over wall-clock time: how much the pool actually bought
+        'speedup': trial_seconds / wall_seconds if wall_seconds else 0.0,
+    }
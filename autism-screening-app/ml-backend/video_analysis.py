@@ -0,0 +1,195 @@
+"""
+Video analysis helpers for the /analyze-video endpoint
+Spools the multipart upload to disk while enforcing a size cap, and streams
+the provider request body (JSON with the video base64-encoded on the fly),
+so memory stays flat no matter how large the video is
+"""
+
+import base64
+import hashlib
+import json
+import re
+import time
+
+from fastapi import Request
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+
+# Read/encode granularity; a multiple of 3 so base64 chunks concatenate cleanly
+ENCODE_CHUNK_SIZE = 3 * 256 * 1024
+# Text fields allowed next to the uploaded file
+MAX_FORM_FIELDS = 16
+
+# Bump when ANALYSIS_PROMPT or the parsing changes so cached results are not reused
+PROMPT_VERSION = "2"
+
+ANALYSIS_PROMPT = """
+        You are an expert clinical autism specialist.
+
+    Use the following CLINICAL KNOWLEDGE BASE to guide your analysis:
+    \"\"\"
+    {knowledge_base_content}
+    \"\"\"
+
+    Analyze the video for TWO distinct modalities based on the knowledge base:
+    1. **Physical Behavior**: Facial expressions, eye contact (or lack thereof), hand flapping, rocking, body language.
+    2. **Speech & Audio**: Tone fairness, prosody (monotone vs expressive), speech rate, response latency, echolalia.
+
+    Provide EXACTLY four outputs:
+    1. **Physical Score**: Risk score 1-100 based on VISUALS (1=typical, 100=high autism traits).
+    2. **Physical Reason**: Concise explanation of the visual signs, referencing terms from the Knowledge Base (e.g. "visual stimming", "ocular behaviors").
+    3. **Speech Score**: Risk score 1-100 based on AUDIO (1=typical, 100=high autism traits).
+    4. **Speech Reason**: Concise explanation of the auditory signs, referencing terms from the Knowledge Base (e.g. "monotone prosody", "echolalia").
+
+    Format your response exactly like this:
+    Physical Score: [Number]
+    Physical Reason: [Text]
+    Speech Score: [Number]
+    Speech Reason: [Text]
+
+    If the video is unclear or no person/audio is present, return 0 for scores and "Unable to analyze" for reasons.
+    """
+
+
+def build_analysis_prompt(knowledge_base_content: str) -> str:
+    """ANALYSIS_PROMPT with the retrieved knowledge base passages filled in"""
+    return ANALYSIS_PROMPT.replace("{knowledge_base_content}", knowledge_base_content)
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    """Short hash of the exact prompt text, for cache keys"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class UploadTooLarge(Exception):
+    """Raised as soon as an upload exceeds the configured size cap"""
+
+
+async def _limited_stream(request: Request, max_bytes: int):
+    """Yield the raw request body, failing once it grows past max_bytes"""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+        yield chunk
+
+
+async def spool_video_upload(request: Request, max_bytes: int, field: str = "file") -> UploadFile:
+    """
+    Parse the multipart body incrementally, spooling the video part to a
+    temporary file; the size cap is enforced on the wire, before the body
+    has been fully read
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise UploadTooLarge(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise ValueError("Expected a multipart/form-data upload")
+    # Text fields sent next to the video (client metadata) are accepted and ignored
+    parser = MultiPartParser(request.headers, _limited_stream(request, max_bytes), max_files=1,
+                             max_fields=MAX_FORM_FIELDS)
+    try:
+        form = await parser.parse()
+    except MultiPartException as e:
+        # Malformed body or boundary, a second file, or too many fields
+        raise ValueError(f"Invalid multipart upload: {e.message}")
+    upload = form.get(field)
+    if not isinstance(upload, UploadFile):
+        await form.close()
+        raise ValueError(f"Missing '{field}' file field in multipart upload")
+    return upload
+
+
+def upload_size(upload: UploadFile) -> int:
+    """Size of a spooled upload in bytes"""
+    if upload.size is not None:
+        return upload.size
+    position = upload.file.tell()
+    upload.file.seek(0, 2)
+    size = upload.file.tell()
+    upload.file.seek(position)
+    return size
+
+
+async def upload_sha256(upload: UploadFile) -> str:
+    """SHA-256 of the spooled upload, read back in chunks"""
+    digest = hashlib.sha256()
+    await upload.seek(0)
+    while True:
+        chunk = await upload.read(ENCODE_CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VideoRequestBody:
+    """
+    Provider request body with the video inlined as base64, produced in
+    chunks. The exact Content-Length is known up front and chunks() can be
+    iterated again (e.g. on retry) because it re-reads the spooled file.
+    encode_seconds adds up the time spent reading it back and encoding.
+    """
+
+    def __init__(self, prompt: str, mime_type: str, upload: UploadFile, size: int = None):
+        self.upload = upload
+        self.size = upload_size(upload) if size is None else size
+        self.prefix = (
+            '{"contents": [{"parts": [{"text": ' + json.dumps(prompt) + '}, '
+            '{"inline_data": {"mime_type": ' + json.dumps(mime_type) + ', "data": "'
+        ).encode("utf-8")
+        self.suffix = b'"}}]}]}'
+        self.encode_seconds = 0.0
+
+    @property
+    def content_length(self) -> int:
+        return len(self.prefix) + 4 * ((self.size + 2) // 3) + len(self.suffix)
+
+    async def chunks(self):
+        yield self.prefix
+        await self.upload.seek(0)
+        while True:
+            start = time.perf_counter()
+            chunk = await self.upload.read(ENCODE_CHUNK_SIZE)
+            if not chunk:
+                break
+            encoded = base64.b64encode(chunk)
+            self.encode_seconds += time.perf_counter() - start
+            yield encoded
+        yield self.suffix
+
+
+def parse_analysis_text(analysis_text: str) -> dict:
+    """Extract the physical/speech scores and reasons from the model's text response"""
+
+    # Robust parsing with Regex
+    data = {
+        "physical_score": 0,
+        "physical_reason": "Analysis failed to extract physical reason.",
+        "speech_score": 0,
+        "speech_reason": "Analysis failed to extract speech reason."
+    }
+
+    # Regex patterns (case insensitive)
+    # Matches: "Physical Score: 50" or "**Physical Score**: 50" or "1. Physical Score: 50"
+    p_score = re.search(r"physical\s+score\**\s*:\s*(\d+)", analysis_text, re.IGNORECASE)
+    s_score = re.search(r"speech\s+score\**\s*:\s*(\d+)", analysis_text, re.IGNORECASE)
+
+    if p_score:
+        data["physical_score"] = int(p_score.group(1))
+
+    if s_score:
+        data["speech_score"] = int(s_score.group(1))
+
+    # Extract reasons (capture everything after "Reason:" until next line or end)
+    p_reason = re.search(r"physical\s+reason\**\s*:\s*(.+?)(?=\n|speech|$)", analysis_text, re.IGNORECASE | re.DOTALL)
+    s_reason = re.search(r"speech\s+reason\**\s*:\s*(.+?)(?=$)", analysis_text, re.IGNORECASE | re.DOTALL)
+
+    if p_reason:
+        data["physical_reason"] = p_reason.group(1).strip()
+    if s_reason:
+        data["speech_reason"] = s_reason.group(1).strip()
+
+    return data
@@ -0,0 +1,193 @@
+"""
+Content-addressed cache of /analyze-video results
+Entries are keyed on the SHA-256 of the video bytes plus the provider model
+and prompt version, stored as one JSON file each (written atomically),
+bounded by entry count with LRU eviction and expired after a TTL.
+Concurrent requests for the same key share a single provider call
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+ENTRY_SUFFIX = '.json'
+
+
+def cache_key(video_sha256: str, model_name: str, prompt_version: str) -> str:
+    """Key for one (video, model, prompt) combination"""
+    return hashlib.sha256(f"{video_sha256}:{model_name}:{prompt_version}".encode()).hexdigest()
+
+
+class VideoResultCache:
+    """
+    Disk-backed LRU/TTL cache with an in-memory index.
+
+    Recency is the entry file's mtime, so the LRU order survives restarts.
+    Keys missing from the index are looked up on disk, so processes sharing
+    the directory (serve.py workers) see each other's entries.
+    Files in the directory that are not <key>.json (e.g. older .txt
+    summaries) are left alone.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 1000, ttl_seconds: float = 7 * 24 * 3600):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._index = OrderedDict()  # key -> created_at, least recently used first
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+        self.stores = 0
+        self._load_index()
+
+    @classmethod
+    def from_env(cls, model_dir: str) -> 'VideoResultCache':
+        """Build a cache from VIDEO_CACHE_* environment variables"""
+        return cls(
+            directory=os.getenv("VIDEO_CACHE_DIR", os.path.join(model_dir, "llm_cache")),
+            max_entries=int(os.getenv("VIDEO_CACHE_MAX_ENTRIES", "1000")),
+            ttl_seconds=float(os.getenv("VIDEO_CACHE_TTL_HOURS", "168")) * 3600,
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def _load_index(self):
+        if not os.path.isdir(self.directory):
+            return
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r') as f:
+                    created_at = json.load(f)['created_at']
+                mtime = os.path.getmtime(os.path.join(self.directory, name))
+            except (OSError, ValueError, KeyError):
+                continue
+            entries.append((mtime, name[:-len(ENTRY_SUFFIX)], created_at))
+        for _, key, created_at in sorted(entries):
+            self._index[key] = created_at
+        self._evict()
+
+    def _remove(self, key: str):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while len(self._index) > self.max_entries:
+            key = next(iter(self._index))
+            self._remove(key)
+            self.evictions += 1
+
+    def _read_created_at(self, key: str):
+        """created_at of an entry this index does not know, e.g. one stored by another worker"""
+        try:
+            with open(self._path(key), 'r') as f:
+                return json.load(f)['created_at']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get(self, key: str):
+        """Cached result for key, or None if missing or expired"""
+        created_at = self._index.get(key)
+        if created_at is None:
+            created_at = self._read_created_at(key)
+            if created_at is None:
+                return None
+            self._index[key] = created_at
+        if time.time() - created_at > self.ttl:
+            self._remove(key)
+            self.expired += 1
+            return None
+        try:
+            with open(self._path(key), 'r') as f:
+                entry = json.load(f)
+            os.utime(self._path(key))
+        except (OSError, ValueError):
+            self._index.pop(key, None)
+            return None
+        self._index.move_to_end(key)
+        return entry['result']
+
+    def put(self, key: str, result: dict, **metadata):
+        """Store result atomically (temp file + rename), evicting the least recently used"""
+        os.makedirs(self.directory, exist_ok=True)
+        created_at = time.time()
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'created_at': created_at, 'result': result, **metadata}, f)
+        os.replace(tmp_path, path)
+        self._index[key] = created_at
+        self._index.move_to_end(key)
+        self.stores += 1
+        self._evict()
+
+    async def get_or_compute(self, key: str, compute, **metadata):
+        """
+        Return the cached result, or await compute() once per key no matter
+        how many callers ask concurrently. compute returns (result, cacheable);
+        failures and uncacheable results are shared with waiters but not stored.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The request doing the work went away; take over unless we were cancelled ourselves
+                if not inflight.cancelled():
+                    raise
+                return await self.get_or_compute(key, compute, **metadata)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result, cacheable = await compute()
+            if cacheable:
+                self.put(key, result, **metadata)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody waited for is not logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "directory": self.directory,
+            "entries": len(self._index),
+            "max_entries": self.max_entries,
+            "ttl_hours": self.ttl / 3600,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "inflight": len(self._inflight),
+        }
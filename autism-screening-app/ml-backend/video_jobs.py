@@ -0,0 +1,422 @@
+"""
+Asynchronous job mode for video analysis
+Uploads are written to a jobs directory and recorded in SQLite, a bounded
+pool of asyncio workers processes them, and job state (stage, result,
+error) survives restarts. Workers claim jobs in SQLite under a renewed
+lease, so any number of API processes can share one store: a job left
+running by a process that died is picked up once its lease expires
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import socket
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.datastructures import Headers, UploadFile
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('done', 'failed')
+COPY_CHUNK_SIZE = 1 << 20
+
+
+def _copy_to(source, path: str) -> int:
+    """Copy a file object to path in chunks, returning the byte count"""
+    source.seek(0)
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
+        return f.tell()
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are waiting and new uploads should be shed"""
+
+
+class JobStore:
+    """SQLite-backed job records (one row per job)"""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Several processes write to the store; wait for their transactions instead of failing
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                file_path TEXT,
+                mime_type TEXT,
+                size INTEGER,
+                result TEXT,
+                error TEXT,
+                status_code INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT,
+                lease_until REAL
+            )
+        """)
+        # Stores created before jobs were claimed under a lease; one write transaction, since every
+        # serve.py worker opens the store at the same moment
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            columns = {row['name'] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (('owner', 'TEXT'), ('lease_until', 'REAL')):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        finally:
+            self._db.execute("COMMIT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def create(self, job_id: str, file_path: str, mime_type: str, size: int):
+        now = time.time()
+        self._db.execute(
+            "INSERT INTO jobs (id, status, stage, file_path, mime_type, size, created_at, updated_at) "
+            "VALUES (?, 'queued', 'queued', ?, ?, ?, ?, ?)",
+            (job_id, file_path, mime_type, size, now, now)
+        )
+
+    def update(self, job_id: str, owner: str = None, **fields) -> bool:
+        """Set fields on a job; with owner, only while it is running under owner's lease"""
+        if 'result' in fields and fields['result'] is not None:
+            fields['result'] = json.dumps(fields['result'])
+        fields['updated_at'] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        query, params = f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id)
+        if owner is not None:
+            query, params = query + " AND owner = ? AND status = 'running'", (*params, owner)
+        return self._db.execute(query, params).rowcount == 1
+
+    def get(self, job_id: str):
+        row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def claim(self, owner: str, lease_seconds: float):
+        """
+        Mark the oldest queued job, or running job whose lease has expired,
+        as running under owner and return it (None when there is none).
+        The UPDATE re-checks the condition, so of several processes racing
+        for a job exactly one gets it
+        """
+        claimable = "(status = 'queued' OR (status = 'running' AND (lease_until IS NULL OR lease_until < :now)))"
+        while True:
+            now = time.time()
+            row = self._db.execute(
+                f"SELECT id FROM jobs WHERE {claimable} ORDER BY created_at LIMIT 1", {'now': now}
+            ).fetchone()
+            if row is None:
+                return None
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'running', stage = 'starting', owner = :owner, "
+                f"lease_until = :lease, updated_at = :now WHERE id = :id AND {claimable}",
+                {'owner': owner, 'lease': now + lease_seconds, 'now': now, 'id': row['id']}
+            )
+            if cursor.rowcount == 1:
+                return self.get(row['id'])
+
+    def renew(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Extend owner's lease on a running job; False once the job is no longer owner's"""
+        cursor = self._db.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? AND status = 'running'",
+            (time.time() + lease_seconds, job_id, owner)
+        )
+        return cursor.rowcount == 1
+
+    def release(self, owner: str) -> int:
+        """Queue owner's running jobs again (on shutdown), so another process need not wait out the lease"""
+        cursor = self._db.execute(
+            "UPDATE jobs SET status = 'queued', stage = 'queued', owner = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE owner = ? AND status = 'running'",
+            (time.time(), owner)
+        )
+        return cursor.rowcount
+
+    def queued(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs last updated before the given timestamp"""
+        cursor = self._db.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (older_than,)
+        )
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        rows = self._db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    def close(self):
+        self._db.close()
+
+
+def job_view(job: dict) -> dict:
+    """Public representation of a job record"""
+    view = {
+        "job_id": job['id'],
+        "status": job['status'],
+        "stage": job['stage'],
+        "created_at": job['created_at'],
+        "updated_at": job['updated_at'],
+    }
+    if job['result'] is not None:
+        view["result"] = json.loads(job['result'])
+    if job['error'] is not None:
+        view["error"] = job['error']
+        view["status_code"] = job['status_code']
+    return view
+
+
+class VideoJobQueue:
+    """
+    Runs analyze(upload, mime_type, set_stage) for queued jobs on at most
+    `workers` concurrent tasks; analyze awaits set_stage(stage) to record
+    progress. At most max_pending jobs may wait; beyond
+    that submit raises JobQueueFull.
+
+    Jobs are handed out by JobStore.claim rather than an in-process queue:
+    idle workers poll the store every poll_seconds (and wake at once for
+    jobs submitted here), and a running job's lease is renewed every third
+    of lease_seconds while it runs. A job whose lease was lost to another
+    process is abandoned: its analysis is cancelled and its row and upload
+    are left to the new owner. Finished jobs and stray uploads older than
+    retention_hours are purged every purge_seconds.
+
+    Store calls run on one dedicated thread, so a write waiting on another
+    process's lock never blocks the event loop.
+    """
+
+    def __init__(self, directory: str, analyze, workers: int = 2, max_pending: int = 100,
+                 retention_hours: float = 24.0, lease_seconds: float = 60.0, poll_seconds: float = 1.0,
+                 purge_seconds: float = 3600.0):
+        self.directory = directory
+        self.analyze = analyze
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retention = retention_hours * 3600
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.purge_seconds = purge_seconds
+        self.owner = None
+        self.store = None
+        self._executor = None
+        self._wake = None
+        self._next_purge = 0.0
+        self._tasks = []
+        self._listeners = {}
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.abandoned = 0
+
+    @classmethod
+    def from_env(cls, model_dir: str, analyze) -> 'VideoJobQueue':
+        """Build a queue from VIDEO_JOB_* environment variables"""
+        return cls(
+            directory=os.getenv("VIDEO_JOBS_DIR", os.path.join(model_dir, "video_jobs")),
+            analyze=analyze,
+            workers=int(os.getenv("VIDEO_JOB_WORKERS", "2")),
+            max_pending=int(os.getenv("VIDEO_JOB_MAX_PENDING", "100")),
+            retention_hours=float(os.getenv("VIDEO_JOB_RETENTION_HOURS", "24")),
+            lease_seconds=float(os.getenv("VIDEO_JOB_LEASE_SECONDS", "60")),
+            poll_seconds=float(os.getenv("VIDEO_JOB_POLL_SECONDS", "1")),
+            purge_seconds=float(os.getenv("VIDEO_JOB_PURGE_SECONDS", "3600")),
+        )
+
+    def start(self):
+        """Open the store and start the workers (queued and expired jobs are claimed from it)"""
+        os.makedirs(self.directory, exist_ok=True)
+        # Per process and start: a restarted process must not renew its predecessor's leases
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="video-jobs")
+        self.store = JobStore(os.path.join(self.directory, "jobs.sqlite3"))
+        # The first worker to run purges, then one every purge_seconds
+        self._next_purge = 0.0
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.store is not None:
+            # Interrupted jobs go back to the queue for whichever process starts (or is running) next
+            await self._call(self.store.release, self.owner)
+            await self._call(self.store.close)
+            self.store = None
+            self._executor.shutdown()
+            self._executor = None
+
+    async def _call(self, method, *args, **kwargs):
+        """Run a store method on the store's thread"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(method, *args, **kwargs)
+        )
+
+    def pending(self) -> int:
+        """Queued jobs, blocking until the store's thread answers (call it off the event loop)"""
+        if self.store is None:
+            return 0
+        return self._executor.submit(self.store.queued).result()
+
+    async def stats(self) -> dict:
+        pending, counts = 0, {}
+        if self.store is not None:
+            pending = await self._call(self.store.queued)
+            counts = await self._call(self.store.counts)
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "abandoned": self.abandoned,
+            "jobs_by_status": counts,
+        }
+
+    async def submit(self, upload: UploadFile, mime_type: str) -> dict:
+        """Persist the upload as a new job and queue it"""
+        pending = await self._call(self.store.queued)
+        if pending >= self.max_pending:
+            self.rejected += 1
+            raise JobQueueFull(f"Video job queue is full ({pending} pending)")
+
+        job_id = uuid.uuid4().hex
+        file_path = os.path.join(self.directory, f"{job_id}.upload")
+        size = await asyncio.to_thread(_copy_to, upload.file, file_path)
+        await self._call(self.store.create, job_id, file_path, mime_type, size)
+        self._wake.set()
+        return await self.get(job_id)
+
+    async def get(self, job_id: str):
+        job = await self._call(self.store.get, job_id)
+        return job_view(job) if job is not None else None
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """
+        Queue receiving the job's view on every state change made by this
+        process; changes made by other processes are only in the store
+        """
+        listener = asyncio.Queue()
+        self._listeners.setdefault(job_id, set()).add(listener)
+        return listener
+
+    def unsubscribe(self, job_id: str, listener: asyncio.Queue):
+        listeners = self._listeners.get(job_id)
+        if listeners is not None:
+            listeners.discard(listener)
+            if not listeners:
+                del self._listeners[job_id]
+
+    async def _notify(self, job_id: str):
+        if not self._listeners.get(job_id):
+            return
+        view = await self.get(job_id)
+        for listener in self._listeners.get(job_id, ()):
+            listener.put_nowait(view)
+
+    async def _update(self, job_id: str, **fields) -> bool:
+        """Update a job this process runs; False, changing nothing, once its lease is lost"""
+        updated = await self._call(self.store.update, job_id, owner=self.owner, **fields)
+        if updated:
+            await self._notify(job_id)
+        return updated
+
+    def _purge(self) -> int:
+        """Delete finished jobs past retention, and uploads as old that no unfinished job needs"""
+        cutoff = time.time() - self.retention
+        purged = self.store.purge(cutoff)
+        for name in os.listdir(self.directory):
+            if not name.endswith(".upload"):
+                continue
+            path = os.path.join(self.directory, name)
+            job = self.store.get(name[:-len(".upload")])
+            try:
+                if (job is None or job['status'] in TERMINAL_STATUSES) and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+        return purged
+
+    async def _worker(self):
+        while True:
+            if time.time() >= self._next_purge:
+                self._next_purge = time.time() + self.purge_seconds
+                await self._call(self._purge)
+            job = await self._call(self.store.claim, self.owner, self.lease_seconds)
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _renew(self, job_id: str, analysis: asyncio.Task):
+        """Keep the job's lease while it runs; once it is lost, cancel the analysis and return"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await self._call(self.store.renew, job_id, self.owner, self.lease_seconds):
+                analysis.cancel()
+                return
+
+    async def _run(self, job: dict):
+        job_id = job['id']
+        await self._notify(job_id)
+        try:
+            file = open(job['file_path'], 'rb')
+        except OSError as e:
+            if await self._update(job_id, status='failed', stage='failed', lease_until=None,
+                                  error=f"Upload is gone: {e}", status_code=500):
+                self.failed += 1
+            return
+
+        upload = UploadFile(file=file, size=job['size'], headers=Headers({"content-type": job['mime_type']}))
+        analysis = asyncio.create_task(self.analyze(
+            upload, job['mime_type'], lambda stage: self._update(job_id, stage=stage)
+        ))
+        renew = asyncio.create_task(self._renew(job_id, analysis))
+        try:
+            result = await analysis
+        except asyncio.CancelledError:
+            # Only a lost lease (renew returned) is handled here; shutdown cancels this task too
+            if not renew.done() or renew.cancelled():
+                raise
+            finished = False
+        except Exception as e:
+            finished = await self._update(
+                job_id, status='failed', stage='failed', lease_until=None,
+                error=str(getattr(e, 'detail', e)), status_code=getattr(e, 'status_code', 500)
+            )
+            if finished:
+                self.failed += 1
+        else:
+            finished = await self._update(job_id, status='done', stage='done', lease_until=None, result=result)
+            if finished:
+                self.completed += 1
+        finally:
+            renew.cancel()
+            await upload.close()
+
+        if not finished:
+            # Another process holds the job now; its row and upload are that process's
+            self.abandoned += 1
+            logger.warning("Lost the lease on a video job, abandoning it", extra={"job_id": job_id, "owner": self.owner})
+            return
+
+        # The upload is only needed until the job finishes
+        try:
+            os.remove(job['file_path'])
+        except FileNotFoundError:
+            pass
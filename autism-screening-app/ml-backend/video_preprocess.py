@@ -0,0 +1,247 @@
+"""
+Optional local preprocessing of uploaded videos before they go to the provider
+One ffmpeg pass samples frames at a fixed rate, downscales them to JPEG and
+extracts a mono Opus audio track, so the provider receives a compact set of
+images plus audio instead of the full recording
+"""
+
+import asyncio
+import base64
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+ENCODE_CHUNK_SIZE = 3 * 256 * 1024
+
+FRAME_MIME_TYPE = "image/jpeg"
+AUDIO_MIME_TYPE = "audio/ogg"
+
+
+class PreprocessingError(Exception):
+    """Raised when ffmpeg is missing or cannot decode the upload"""
+
+
+def find_ffmpeg() -> str:
+    """ffmpeg from FFMPEG_BINARY, PATH or the imageio-ffmpeg wheel, else None"""
+    configured = os.getenv("FFMPEG_BINARY")
+    if configured:
+        return configured
+    on_path = shutil.which("ffmpeg")
+    if on_path:
+        return on_path
+    try:
+        import imageio_ffmpeg
+    except ImportError:
+        return None
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+class PreprocessedVideo:
+    """Frames and audio extracted into a temporary directory (removed by cleanup())"""
+
+    def __init__(self, directory: str, frames: list, audio: str, input_bytes: int, seconds: float):
+        self.directory = directory
+        self.frames = frames
+        self.audio = audio
+        self.input_bytes = input_bytes
+        self.seconds = seconds
+
+    @property
+    def parts(self) -> list:
+        """(mime_type, path) of every inline part, frames in order then the audio"""
+        parts = [(FRAME_MIME_TYPE, path) for path in self.frames]
+        if self.audio is not None:
+            parts.append((AUDIO_MIME_TYPE, self.audio))
+        return parts
+
+    @property
+    def output_bytes(self) -> int:
+        return sum(os.path.getsize(path) for _, path in self.parts)
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class VideoPreprocessor:
+    """
+    Samples `fps` frames per second (at most max_frames), scales them so the
+    longer side is at most max_side pixels and re-encodes the audio as mono
+    16 kHz Opus at audio_bitrate.
+
+    With keyframes_only only keyframes are decoded and picked at most `fps`
+    per second, which is several times faster (phone recordings typically
+    have a keyframe every second or two); otherwise every frame is decoded
+    and sampled at exactly `fps`.
+    """
+
+    def __init__(self, fps: float = 1.0, max_side: int = 512, max_frames: int = 120,
+                 jpeg_quality: int = 5, audio_bitrate: str = "24k", keyframes_only: bool = True,
+                 ffmpeg: str = None, timeout: float = 120.0):
+        self.fps = fps
+        self.max_side = max_side
+        self.max_frames = max_frames
+        self.jpeg_quality = jpeg_quality
+        self.audio_bitrate = audio_bitrate
+        self.keyframes_only = keyframes_only
+        self.ffmpeg = ffmpeg or find_ffmpeg()
+        self.timeout = timeout
+        self.requests = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.seconds = 0.0
+
+    @classmethod
+    def from_env(cls) -> 'VideoPreprocessor':
+        """Build a preprocessor from VIDEO_PREPROCESS_* environment variables"""
+        return cls(
+            fps=float(os.getenv("VIDEO_PREPROCESS_FPS", "1")),
+            max_side=int(os.getenv("VIDEO_PREPROCESS_MAX_SIDE", "512")),
+            max_frames=int(os.getenv("VIDEO_PREPROCESS_MAX_FRAMES", "120")),
+            jpeg_quality=int(os.getenv("VIDEO_PREPROCESS_JPEG_QUALITY", "5")),
+            audio_bitrate=os.getenv("VIDEO_PREPROCESS_AUDIO_BITRATE", "24k"),
+            keyframes_only=os.getenv("VIDEO_PREPROCESS_KEYFRAMES", "1") == "1",
+        )
+
+    @property
+    def signature(self) -> str:
+        """Settings that change what the provider sees (part of the result cache key)"""
+        return (f"{'keyframes' if self.keyframes_only else 'frames'}:{self.fps}fps:{self.max_side}px"
+                f":{self.max_frames}max:q{self.jpeg_quality}:audio:{self.audio_bitrate}")
+
+    def stats(self) -> dict:
+        return {
+            "settings": self.signature,
+            "ffmpeg": self.ffmpeg,
+            "requests": self.requests,
+            "input_bytes": self.input_bytes,
+            "output_bytes": self.output_bytes,
+            "reduction": 1 - self.output_bytes / self.input_bytes if self.input_bytes else 0.0,
+            "mean_preprocess_ms": self.seconds / self.requests * 1000 if self.requests else 0.0,
+        }
+
+    def command(self, source: str, directory: str) -> list:
+        # Longer side capped at max_side, the other follows the aspect ratio (kept even)
+        side = self.max_side
+        scale = f"scale='if(gte(iw,ih),min(iw,{side}),-2)':'if(gte(iw,ih),-2,min(ih,{side}))'"
+        if self.keyframes_only:
+            decode = ["-skip_frame", "nokey"]
+            sample = f"select='isnan(prev_selected_t)+gte(t-prev_selected_t\\,{1 / self.fps})'"
+        else:
+            decode = []
+            sample = f"fps={self.fps}"
+        return [
+            self.ffmpeg, "-nostdin", "-v", "error", "-y", *decode, "-i", source,
+            "-map", "0:v:0", "-vf", f"{sample},{scale}", "-fps_mode", "vfr", "-frames:v", str(self.max_frames),
+            "-q:v", str(self.jpeg_quality), os.path.join(directory, "frame_%04d.jpg"),
+            "-map", "0:a:0?", "-vn", "-ac", "1", "-ar", "16000", "-c:a", "libopus",
+            "-b:a", self.audio_bitrate, os.path.join(directory, "audio.ogg"),
+        ]
+
+    def run(self, source: str) -> PreprocessedVideo:
+        """Extract frames and audio from the video at source (blocking)"""
+        if self.ffmpeg is None:
+            raise PreprocessingError("ffmpeg not found; install it or set FFMPEG_BINARY")
+        start = time.perf_counter()
+        directory = tempfile.mkdtemp(prefix="video-preprocess-")
+        try:
+            completed = subprocess.run(
+                self.command(source, directory), capture_output=True, timeout=self.timeout
+            )
+        except subprocess.TimeoutExpired:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise PreprocessingError(f"ffmpeg took longer than {self.timeout:.0f}s")
+        frames = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory) if name.startswith("frame_")
+        )
+        audio = os.path.join(directory, "audio.ogg")
+        audio = audio if os.path.exists(audio) and os.path.getsize(audio) > 0 else None
+        if completed.returncode != 0 or not frames:
+            shutil.rmtree(directory, ignore_errors=True)
+            message = completed.stderr.decode(errors="replace").strip().splitlines()
+            raise PreprocessingError(f"ffmpeg could not decode the video: {message[-1] if message else 'no frames'}")
+
+        video = PreprocessedVideo(directory, frames, audio, os.path.getsize(source),
+                                  time.perf_counter() - start)
+        self.requests += 1
+        self.input_bytes += video.input_bytes
+        self.output_bytes += video.output_bytes
+        self.seconds += video.seconds
+        return video
+
+    def run_upload(self, upload) -> PreprocessedVideo:
+        """Preprocess a spooled upload, copying it to a named file first if needed"""
+        path, is_copy = source_path(upload)
+        try:
+            return self.run(path)
+        finally:
+            if is_copy:
+                os.remove(path)
+
+    async def run_upload_async(self, upload) -> PreprocessedVideo:
+        return await asyncio.to_thread(self.run_upload, upload)
+
+    def prompt_note(self, video: PreprocessedVideo) -> str:
+        """Sentence appended to the prompt describing the sampled input"""
+        note = (f"\n\nThe video is provided as {len(video.frames)} frames sampled at up to {self.fps:g} "
+                f"frame(s) per second, in order")
+        if video.audio is not None:
+            note += ", followed by its audio track"
+        return note + "."
+
+
+class PartsRequestBody:
+    """
+    Provider request body with a text part followed by files inlined as
+    base64, streamed chunk by chunk with the Content-Length known up front
+    (encode_seconds adds up the time spent reading and encoding the files)
+    """
+
+    def __init__(self, prompt: str, parts: list):
+        self.parts = [(mime_type, path, os.path.getsize(path)) for mime_type, path in parts]
+        self.prefix = ('{"contents": [{"parts": [{"text": ' + json.dumps(prompt) + '}').encode("utf-8")
+        self.suffix = b']}]}'
+        self.encode_seconds = 0.0
+
+    @staticmethod
+    def _part_prefix(mime_type: str) -> bytes:
+        return (', {"inline_data": {"mime_type": ' + json.dumps(mime_type) + ', "data": "').encode("utf-8")
+
+    @property
+    def content_length(self) -> int:
+        length = len(self.prefix) + len(self.suffix)
+        for mime_type, _, size in self.parts:
+            length += len(self._part_prefix(mime_type)) + 4 * ((size + 2) // 3) + len(b'"}}')
+        return length
+
+    async def chunks(self):
+        yield self.prefix
+        for mime_type, path, _ in self.parts:
+            yield self._part_prefix(mime_type)
+            with open(path, 'rb') as f:
+                while True:
+                    start = time.perf_counter()
+                    chunk = f.read(ENCODE_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    encoded = base64.b64encode(chunk)
+                    self.encode_seconds += time.perf_counter() - start
+                    yield encoded
+            yield b'"}}'
+        yield self.suffix
+
+
+def source_path(upload) -> tuple:
+    """
+    Path ffmpeg can read for an upload: the file's own path when it has one,
+    otherwise a named temporary copy. Returns (path, is_temporary_copy).
+    """
+    name = getattr(upload.file, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name, False
+    upload.file.seek(0)
+    with tempfile.NamedTemporaryFile(prefix="video-upload-", delete=False) as f:
+        shutil.copyfileobj(upload.file, f, ENCODE_CHUNK_SIZE)
+    return f.name, True